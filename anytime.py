@@ -0,0 +1,172 @@
+"""Подбор укладки с бюджетом времени, который можно прервать в любой момент.
+
+solve_anytime - генератор: первым шагом сразу выдается жадная укладка, а
+дальше каждый раз, когда найдена укладка лучше, выдается новый шаг, пока
+не кончится бюджет или не доказана оптимальность:
+
+- локальный поиск: пачка в рюкзаке меняется на более ценную снаружи,
+  освободившееся место дополняется жадно;
+- затем точный метод: ветви и границы, которые стартуют с лучшей
+  найденной укладки и выдают каждый новый рекорд, или ДП, если его
+  таблица помещается в память (ДП промежуточных ответов не дает).
+
+У каждого шага есть верхняя оценка ценности (граница ЛП-релаксации) и
+разрыв до нее, поэтому видно, насколько далеко текущий ответ от лучшего
+возможного. Возвращает генератор итоговое решение.
+"""
+import time
+
+from knapsack import (SolveCancelled, _all_fit, _bnb_search, _density_order,
+                      _dp_pick, _finish, _greedy_fill, _prepare, _required_value, _rest_capacity,
+                      _surrogate_bound, _with_required, choose_method, mandatory, surrogate_factor)
+
+# Бюджет времени по умолчанию (с)
+DEFAULT_BUDGET = 2.0
+
+
+class AnytimeStep:
+    """Шаг подбора: лучшее найденное решение и верхняя оценка его ценности.
+
+    final - шаг последний: оптимальность доказана или кончился бюджет.
+    """
+    __slots__ = ("solution", "bound", "elapsed", "final")
+
+    def __init__(self, solution, bound, elapsed, final):
+        self.solution = solution
+        self.bound = bound
+        self.elapsed = elapsed
+        self.final = final
+
+    @property
+    def gap(self):
+        """Доля ценности, которую еще можно выиграть, в худшем случае"""
+        if self.solution.optimal or self.bound <= self.solution.value:
+            return 0.0
+        return (self.bound - self.solution.value) / self.bound
+
+    def __repr__(self):
+        return (f"AnytimeStep({self.solution!r}, bound={self.bound}, "
+                f"gap={self.gap:.2%}, elapsed={self.elapsed:.3f})")
+
+
+def solve_anytime(items, max_weight, max_volume=None, value=None, budget=DEFAULT_BUDGET,
+                  should_stop=None):
+    """Выдает AnytimeStep на каждое улучшение и возвращает итоговое Solution.
+
+    Параметры как у knapsack.solve; budget - сколько секунд искать лучшую
+    укладку. Если бюджет кончился, последний шаг содержит лучшее найденное
+    решение с optimal=False. should_stop прерывает подбор SolveCancelled.
+    """
+    started = time.perf_counter()
+    deadline = started + budget
+
+    def expired():
+        return time.perf_counter() >= deadline or (should_stop is not None and should_stop())
+
+    required = {name: data for name, data in items.items() if mandatory(data)}
+    rest_weight, rest_volume = max_weight, max_volume
+    if required:
+        rest_weight, rest_volume = _rest_capacity(required, max_weight, max_volume)
+        items_rest = {name: data for name, data in items.items() if name not in required}
+    else:
+        items_rest = items
+    extra_value = _required_value(required, value)
+    prepared, volume_cap = _prepare(items_rest, rest_weight, rest_volume, value)
+
+    def step(picked, method, optimal, bound, final):
+        solution = _finish(items_rest, prepared, picked, method, optimal)
+        if required:
+            solution = _with_required(items, required, solution, value)
+        return AnytimeStep(solution, bound + extra_value, time.perf_counter() - started, final)
+
+    if _all_fit(items_rest, prepared, rest_weight, volume_cap):
+        last = step(range(len(prepared)), "all", True, sum(p[3] for p in prepared), True)
+        yield last
+        return last.solution
+
+    factor = surrogate_factor(prepared, rest_weight, volume_cap)
+    # Ценности целые, поэтому дробную часть границы можно отбросить
+    bound = int(_surrogate_bound(prepared, rest_weight, volume_cap, factor))
+
+    picked = _greedy_fill(prepared, _density_order(prepared, rest_weight, volume_cap),
+                          rest_weight, volume_cap)
+    best = sum(prepared[i][3] for i in picked)
+    method = "greedy"
+    if best >= bound:
+        last = step(picked, method, True, best, True)
+        yield last
+        return last.solution
+    yield step(picked, method, False, bound, False)
+
+    optimal = False
+    try:
+        for picked in _swap_search(prepared, picked, rest_weight, volume_cap, expired):
+            method = "local"
+            yield step(picked, method, False, bound, False)
+        if expired():
+            raise SolveCancelled()
+        if choose_method(prepared, rest_weight, volume_cap) == "dp":
+            picked = _dp_pick(prepared, rest_weight, volume_cap, expired)
+            method, optimal = "dp", True
+        else:
+            search = _bnb_search(prepared, rest_weight, volume_cap, should_stop=expired, incumbent=picked)
+            while True:
+                try:
+                    picked = next(search)
+                except StopIteration as stop:
+                    picked, optimal = stop.value
+                    if optimal:
+                        method = "bnb"
+                    break
+                method = "bnb"
+                yield step(picked, method, False, bound, False)
+    except SolveCancelled:
+        if should_stop is not None and should_stop():
+            raise
+    if optimal:
+        bound = sum(prepared[i][3] for i in picked)
+    last = step(picked, method, optimal, bound, True)
+    yield last
+    return last.solution
+
+
+def _swap_search(prepared, picked, max_weight, volume_cap, expired):
+    """Локальный поиск обменом одной пачки на более ценную; выдает набор
+    индексов prepared после каждого улучшения и заканчивается, когда
+    обменов больше нет или expired() вернул True"""
+    chosen = set(picked)
+    rem_w = max_weight - sum(prepared[i][1] for i in chosen)
+    rem_v = (volume_cap or 0) - sum(prepared[i][2] for i in chosen)
+    order = _density_order(prepared, max_weight, volume_cap)
+    while True:
+        improved = False
+        inside = sorted(chosen, key=lambda i: prepared[i][3])
+        outside = sorted((j for j in range(len(prepared)) if j not in chosen),
+                         key=lambda j: -prepared[j][3])
+        for j in outside:
+            if expired():
+                return
+            _, wj, vj, valj, _ = prepared[j]
+            for i in inside:
+                _, wi, vi, vali, _ = prepared[i]
+                if vali >= valj:
+                    # Дальше в рюкзаке только пачки не дешевле j
+                    break
+                if wj - wi <= rem_w and (volume_cap is None or vj - vi <= rem_v):
+                    chosen.remove(i)
+                    chosen.add(j)
+                    rem_w -= wj - wi
+                    rem_v -= vj - vi
+                    improved = True
+                    break
+            if improved:
+                break
+        if not improved:
+            return
+        for k in order:
+            _, w, v, _, _ = prepared[k]
+            if k not in chosen and w <= rem_w and (volume_cap is None or v <= rem_v):
+                chosen.add(k)
+                rem_w -= w
+                rem_v -= v
+        yield sorted(chosen)
@@ -1,27 +1,62 @@
+import time
+# Засекаем время до импорта Qt, чтобы --profile-startup учитывал и его
+STARTUP_STARTED = time.perf_counter()
 import sys
 import json
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                            QListWidget, QMessageBox, QSpinBox, QComboBox,
+                            QListWidget, QListView, QMessageBox, QSpinBox, QComboBox,
                             QMenuBar, QMenu, QFileDialog, QDialog, QGridLayout,
-                            QButtonGroup, QFrame, QDoubleSpinBox)
-from PyQt6.QtCore import Qt, QSize
+                            QButtonGroup, QFrame, QDoubleSpinBox, QProgressDialog,
+                            QTableWidget, QTableWidgetItem, QCheckBox)
+from PyQt6.QtCore import Qt, QSize, QTimer, QRect, QRectF, QPointF, QObject, pyqtSignal
 from PyQt6.QtGui import QAction, QKeySequence, QIcon, QPixmap, QPainter, QColor, QPen
 import os
-from register_extension import register_file_type
+import knapsack
+import multibag
+import perf
+from pareto import ParetoExplorer
+from warm_start import WarmStartSolver
+import anytime
+from solver_worker import BackgroundSolver
+from solver_cache import SolverCache, default_cache_file, fingerprint
+from inventory import Inventory
+from undo import UndoLog
+from journal import JournalWriter, apply_records, read_journal
+from bpc_loader import BpcLoader
+from item_models import (InventoryListModel, CatalogListModel, ItemSortFilterProxyModel,
+                         NameRole, DataRole, counted_name)
+from catalog import PresetCatalog, read_catalog_file
+from search_index import SearchIndex, build_index, search_all
+
+# Задержка поиска после последнего нажатия клавиши (мс)
+SEARCH_DEBOUNCE = 100
+# Период автосохранения журнала (мс)
+AUTOSAVE_INTERVAL = 30000
+# После стольких записей журнал сжимается в сам файл .bpc
+COMPACT_RECORDS = 500
+# Период обновления таблицы замеров (мс)
+PERF_REFRESH_INTERVAL = 1000
+PERF_COLUMNS = ["Участок", "Вызовов", "Среднее", "p50", "p95", "p99", "Макс."]
+# Наибольший бюджет времени подбора укладки (с)
+MAX_SOLVE_BUDGET = 60
+# Промежуточные укладки показываются не чаще раза за столько мс
+PROGRESS_INTERVAL = 100
 
 def check_first_run():
     settings_file = os.path.join(os.path.dirname(__file__), "settings.json")
     if not os.path.exists(settings_file):
-        # Первый запуск
-        register_file_type()
+        # Первый запуск; модуль реестра нужен только здесь и только в Windows
+        if sys.platform == "win32":
+            from register_extension import register_file_type
+            register_file_type()
         # Создаем файл настроек
         with open(settings_file, 'w') as f:
             json.dump({"first_run": False}, f)
         return True
     return False
 
-class CustomListWidget(QListWidget):
+class CustomListView(QListView):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
@@ -35,7 +70,8 @@ class CustomListWidget(QListWidget):
             super().keyPressEvent(event)
 
 class EditItemDialog(QDialog):
-    def __init__(self, parent=None, item_name="", item_weight=0, item_volume=0):
+    def __init__(self, parent=None, item_name="", item_weight=0, item_volume=0, item_count=1,
+                 item_priority=1, item_mandatory=False):
         super().__init__(parent)
         self.setWindowTitle("Изменить предмет")
         layout = QGridLayout(self)
@@ -61,6 +97,23 @@ class EditItemDialog(QDialog):
         self.volume_spin.setValue(item_volume)
         layout.addWidget(self.volume_spin, 2, 1)
         
+        # Количество
+        layout.addWidget(QLabel("Количество:"), 3, 0)
+        self.count_spin = QSpinBox()
+        self.count_spin.setRange(1, 1000)
+        self.count_spin.setValue(item_count)
+        layout.addWidget(self.count_spin, 3, 1)
+        
+        # Приоритет и обязательность
+        layout.addWidget(QLabel("Приоритет:"), 4, 0)
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(0, 1000)
+        self.priority_spin.setValue(item_priority)
+        layout.addWidget(self.priority_spin, 4, 1)
+        self.mandatory_check = QCheckBox("Обязательный")
+        self.mandatory_check.setChecked(item_mandatory)
+        layout.addWidget(self.mandatory_check, 5, 1)
+        
         # Кнопки
         buttons_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
@@ -70,10 +123,11 @@ class EditItemDialog(QDialog):
         
         buttons_layout.addWidget(ok_button)
         buttons_layout.addWidget(cancel_button)
-        layout.addLayout(buttons_layout, 3, 0, 1, 2)
+        layout.addLayout(buttons_layout, 6, 0, 1, 2)
 
     def get_data(self):
-        return self.name_edit.text().strip(), self.weight_spin.value(), self.volume_spin.value()
+        return (self.name_edit.text().strip(), self.weight_spin.value(), self.volume_spin.value(),
+                self.count_spin.value(), self.priority_spin.value(), self.mandatory_check.isChecked())
 
 class AboutDialog(QDialog):
     def __init__(self, parent=None):
@@ -116,7 +170,116 @@ class AboutDialog(QDialog):
         close_button.clicked.connect(self.accept)
         layout.addWidget(close_button)
 
+class CapacitySweepDialog(QDialog):
+    """Таблица лучших укладок сразу для диапазона емкостей рюкзака"""
+    def __init__(self, parent, items, weight_range, volume_range, current_weight, current_volume):
+        super().__init__(parent)
+        self.setWindowTitle("Подбор емкости рюкзака")
+        self.setMinimumSize(600, 400)
+        self.items = items
+        self.selected = None
+        layout = QVBoxLayout(self)
+        
+        # Диапазоны емкостей
+        ranges_layout = QGridLayout()
+        ranges_layout.addWidget(QLabel("Вес (кг): от"), 0, 0)
+        self.weight_from = QSpinBox()
+        self.weight_from.setRange(*weight_range)
+        self.weight_from.setValue(max(weight_range[0], current_weight - 3))
+        ranges_layout.addWidget(self.weight_from, 0, 1)
+        ranges_layout.addWidget(QLabel("до"), 0, 2)
+        self.weight_to = QSpinBox()
+        self.weight_to.setRange(*weight_range)
+        self.weight_to.setValue(min(weight_range[1], current_weight + 3))
+        ranges_layout.addWidget(self.weight_to, 0, 3)
+        
+        ranges_layout.addWidget(QLabel("Объем (л): от"), 1, 0)
+        self.volume_from = QSpinBox()
+        self.volume_from.setRange(*volume_range)
+        self.volume_from.setValue(current_volume)
+        ranges_layout.addWidget(self.volume_from, 1, 1)
+        ranges_layout.addWidget(QLabel("до"), 1, 2)
+        self.volume_to = QSpinBox()
+        self.volume_to.setRange(*volume_range)
+        self.volume_to.setValue(current_volume)
+        ranges_layout.addWidget(self.volume_to, 1, 3)
+        ranges_layout.addWidget(QLabel("шаг"), 1, 4)
+        self.volume_step = QSpinBox()
+        self.volume_step.setRange(1, 20)
+        self.volume_step.setValue(5)
+        ranges_layout.addWidget(self.volume_step, 1, 5)
+        
+        calculate_button = QPushButton("Рассчитать")
+        calculate_button.clicked.connect(self.calculate)
+        ranges_layout.addWidget(calculate_button, 0, 5)
+        layout.addLayout(ranges_layout)
+        
+        # Строки - вес, столбцы - объем
+        self.table = QTableWidget()
+        self.table.cellDoubleClicked.connect(self.choose_capacity)
+        layout.addWidget(self.table)
+        
+        self.status_label = QLabel("Двойной щелчок по ячейке применяет емкость к рюкзаку")
+        layout.addWidget(self.status_label)
+        
+        # Одна таблица ДП отвечает сразу на все емкости, считаем ее в фоне
+        self.solver = BackgroundSolver(self)
+        self.solver.solved.connect(self.show_results)
+        self.solver.failed.connect(lambda message: self.status_label.setText(f"Ошибка: {message}"))
+        self.calculate()
+
+    def capacities(self):
+        weights = list(range(self.weight_from.value(), max(self.weight_from.value(), self.weight_to.value()) + 1))
+        volumes = list(range(self.volume_from.value(), max(self.volume_from.value(), self.volume_to.value()) + 1,
+                             self.volume_step.value()))
+        return weights, volumes
+
+    def calculate(self):
+        weights, volumes = self.capacities()
+        self.requested = (weights, volumes)
+        self.status_label.setText("Расчет...")
+        self.solver.submit(knapsack.capacity_sweep, self.items, [w * 1000 for w in weights], volumes)
+
+    def show_results(self, results):
+        weights, volumes = self.requested
+        self.table.clear()
+        self.table.setRowCount(len(weights))
+        self.table.setColumnCount(len(volumes))
+        self.table.setVerticalHeaderLabels([f"{w} кг" for w in weights])
+        self.table.setHorizontalHeaderLabels([f"{v} л" for v in volumes])
+        for row, weight in enumerate(weights):
+            for column, volume in enumerate(volumes):
+                solution = results.get((weight * 1000, volume))
+                if solution is None:
+                    continue
+                cell = QTableWidgetItem(
+                    f"{solution.total_count} предм., {solution.weight / 1000:.1f} кг, {solution.volume:.1f} л"
+                )
+                cell.setToolTip("\n".join(counted_name(name, count)
+                                          for name, count in solution.counts.items()))
+                cell.setData(Qt.ItemDataRole.UserRole, (weight, volume))
+                cell.setFlags(cell.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                self.table.setItem(row, column, cell)
+        self.table.resizeColumnsToContents()
+        self.status_label.setText("Двойной щелчок по ячейке применяет емкость к рюкзаку")
+
+    def choose_capacity(self, row, column):
+        cell = self.table.item(row, column)
+        if cell is not None:
+            self.selected = cell.data(Qt.ItemDataRole.UserRole)
+            self.accept()
+
+    def done(self, result):
+        self.solver.shutdown()
+        super().done(result)
+
 class BackpackVisualizer(QFrame):
+    FRAME_OK_COLOR = QColor(0, 150, 0)
+    FRAME_OVER_COLOR = QColor(255, 0, 0)
+    FILL_OK_COLOR = QColor(200, 255, 200)  # Светло-зеленый при нормальном весе и объеме
+    FILL_OVER_COLOR = QColor(255, 200, 200)  # Светло-красный при перевесе и переполнении
+    FILL_PACKED_COLOR = QColor(150, 220, 150)  # Зеленый: сколько займет найденная укладка
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumWidth(120)
@@ -125,76 +288,98 @@ class BackpackVisualizer(QFrame):
         self.max_weight = 20000  # По умолчанию 20 кг в граммах
         self.current_volume = 0
         self.max_volume = 40  # По умолчанию 40 литров
+        self.packed = None  # (вес, объем) найденной укладки при перевесе или переполнении
+        # Рамки, подписи и предупреждения не зависят от уровня заполнения,
+        # поэтому рисуются один раз на размер и состояние
+        self._overlay_cache = {}
         
     def set_weights(self, current_weight, max_weight, current_volume, max_volume):
+        state = (current_weight, max_weight, current_volume, max_volume)
+        if state == (self.current_weight, self.max_weight, self.current_volume, self.max_volume):
+            return
+        old_flags = self._flags()
+        old_fills = self._fill_rects()
         self.current_weight = current_weight
         self.max_weight = max_weight
         self.current_volume = current_volume
         self.max_volume = max_volume
+        if self._flags() != old_flags:
+            # Сменились цвета и предупреждения - перерисовываем все
+            self.update()
+            return
+        # Иначе перерисовываем только полосы, у которых изменилась высота
+        for old, new in zip(old_fills, self._fill_rects()):
+            if old != new:
+                self.update(old.united(new))
+    
+    def set_packed(self, weight, volume):
+        """Показывает поверх заполнения вес и объем найденной укладки; None - скрыть"""
+        packed = None if weight is None else (weight, volume)
+        if packed == self.packed:
+            return
+        self.packed = packed
         self.update()
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        rect = self.rect()
-        
+    
+    def _flags(self):
+        """(перевес, переполнение)"""
+        return self.current_weight > self.max_weight, self.current_volume > self.max_volume
+    
+    def _columns(self):
         # Делим область на две части
+        rect = self.rect()
         weight_rect = rect.adjusted(1, 1, -rect.width()//2, -1)
         volume_rect = rect.adjusted(rect.width()//2, 1, -1, -1)
-        
-        # Определяем цвета для рамок в зависимости от состояния
-        weight_frame_color = QColor(255, 0, 0) if self.current_weight > self.max_weight else QColor(0, 150, 0)
-        volume_frame_color = QColor(255, 0, 0) if self.current_volume > self.max_volume else QColor(0, 150, 0)
-        
-        # Рисуем рамки с соответствующими цветами
-        pen = QPen(weight_frame_color)
+        return weight_rect, volume_rect
+    
+    @staticmethod
+    def _fill_rect(column_rect, current, maximum):
+        """Область заполнения столбца (пустой QRect, если заполнять нечего)"""
+        if maximum <= 0:
+            return QRect()
+        height = min(int((current / maximum) * column_rect.height()), column_rect.height())
+        if height <= 3:
+            return QRect()
+        return QRect(column_rect.x() + 2, column_rect.bottom() - height + 2,
+                     column_rect.width() - 3, height - 3)
+    
+    def _fill_rects(self):
+        weight_rect, volume_rect = self._columns()
+        return (self._fill_rect(weight_rect, self.current_weight, self.max_weight),
+                self._fill_rect(volume_rect, self.current_volume, self.max_volume))
+    
+    def resizeEvent(self, event):
+        self._overlay_cache.clear()
+        super().resizeEvent(event)
+    
+    def _overlay(self):
+        """Прозрачный слой с рамками, подписями и предупреждениями из кэша"""
+        ratio = self.devicePixelRatioF()
+        overweight, overflow = self._flags()
+        key = (self.width(), self.height(), ratio, overweight, overflow)
+        pixmap = self._overlay_cache.get(key)
+        if pixmap is None:
+            pixmap = self._draw_overlay(ratio, overweight, overflow)
+            self._overlay_cache[key] = pixmap
+        return pixmap
+    
+    def _draw_overlay(self, ratio, overweight, overflow):
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(self.font())
+        weight_rect, volume_rect = self._columns()
+        
+        # Рисуем рамки с цветами в зависимости от состояния
+        pen = QPen(self.FRAME_OVER_COLOR if overweight else self.FRAME_OK_COLOR)
         pen.setWidth(2)
         painter.setPen(pen)
         painter.drawRect(weight_rect)
         
-        pen.setColor(volume_frame_color)
+        pen.setColor(self.FRAME_OVER_COLOR if overflow else self.FRAME_OK_COLOR)
         painter.setPen(pen)
         painter.drawRect(volume_rect)
         
-        # Вычисляем высоту заполнения для веса
-        if self.max_weight > 0:
-            weight_height = int((self.current_weight / self.max_weight) * weight_rect.height())
-            weight_height = min(weight_height, weight_rect.height())
-            
-            # Определяем цвет заполнения для веса
-            if self.current_weight > self.max_weight:
-                weight_color = QColor(255, 200, 200)  # Светло-красный при перевесе
-            else:
-                weight_color = QColor(200, 255, 200)  # Светло-зеленый при нормальном весе
-            
-            # Рисуем заполнение для веса
-            painter.fillRect(
-                weight_rect.x() + 2,
-                weight_rect.bottom() - weight_height + 2,
-                weight_rect.width() - 3,
-                weight_height - 3,
-                weight_color
-            )
-        
-        # Вычисляем высоту заполнения для объема
-        if self.max_volume > 0:
-            volume_height = int((self.current_volume / self.max_volume) * volume_rect.height())
-            volume_height = min(volume_height, volume_rect.height())
-            
-            # Определяем цвет заполнения для объема
-            if self.current_volume > self.max_volume:
-                volume_color = QColor(255, 200, 200)  # Светло-красный при переполнении
-            else:
-                volume_color = QColor(200, 255, 200)  # Светло-зеленый при нормальном объеме
-            
-            # Рисуем заполнение для объема
-            painter.fillRect(
-                volume_rect.x() + 2,
-                volume_rect.bottom() - volume_height + 2,
-                volume_rect.width() - 3,
-                volume_height - 3,
-                volume_color
-            )
-        
         # Добавляем подписи
         painter.setPen(QColor(0, 0, 0))  # Черный цвет для текста
         painter.drawText(weight_rect, Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignHCenter, "Вес")
@@ -206,26 +391,409 @@ class BackpackVisualizer(QFrame):
         painter.setFont(font)
         
         # Если есть перевес или переполнение, пишем предупреждения по центру
-        if self.current_weight > self.max_weight:
+        for flag, column_rect, text in ((overweight, weight_rect, "Перевес"),
+                                        (overflow, volume_rect, "Переполнен")):
+            if not flag:
+                continue
             painter.save()
-            painter.translate(weight_rect.center())
+            painter.translate(column_rect.center())
             painter.rotate(-90)
-            text_rect = painter.fontMetrics().boundingRect("Перевес")
-            painter.drawText(-text_rect.width()//2, 0, "Перевес")
-            painter.restore()
-            
-        if self.current_volume > self.max_volume:
-            painter.save()
-            painter.translate(volume_rect.center())
-            painter.rotate(-90)
-            text_rect = painter.fontMetrics().boundingRect("Переполнен")
-            painter.drawText(-text_rect.width()//2, 0, "Переполнен")
+            text_rect = painter.fontMetrics().boundingRect(text)
+            painter.drawText(-text_rect.width()//2, 0, text)
             painter.restore()
+        painter.end()
+        return pixmap
+        
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        damaged = event.rect()
+        overweight, overflow = self._flags()
+        
+        # Заполнение рисуется только в пределах перерисовываемой области
+        weight_fill, volume_fill = self._fill_rects()
+        for fill, over in ((weight_fill, overweight), (volume_fill, overflow)):
+            area = fill.intersected(damaged)
+            if not area.isEmpty():
+                painter.fillRect(area, self.FILL_OVER_COLOR if over else self.FILL_OK_COLOR)
+        
+        # Поверх - уровень укладки, которую нашел решатель
+        if self.packed is not None and (overweight or overflow):
+            weight_rect, volume_rect = self._columns()
+            for column_rect, current, maximum in ((weight_rect, self.packed[0], self.max_weight),
+                                                  (volume_rect, self.packed[1], self.max_volume)):
+                area = self._fill_rect(column_rect, current, maximum).intersected(damaged)
+                if not area.isEmpty():
+                    painter.fillRect(area, self.FILL_PACKED_COLOR)
+        
+        # Статический слой копируется из кэша той же областью
+        ratio = self.devicePixelRatioF()
+        source = QRectF(damaged.x() * ratio, damaged.y() * ratio,
+                        damaged.width() * ratio, damaged.height() * ratio)
+        painter.drawPixmap(QRectF(damaged), self._overlay(), source)
+
+class MultiBagDialog(QDialog):
+    """Распределение предметов по рюкзакам нескольких участников"""
+    def __init__(self, parent, items, bags):
+        super().__init__(parent)
+        self.setWindowTitle("Распределение по участникам")
+        self.setMinimumSize(700, 500)
+        self.items = items
+        layout = QVBoxLayout(self)
+        
+        # Участники и емкости их рюкзаков
+        self.bags_table = QTableWidget(0, 3)
+        self.bags_table.setHorizontalHeaderLabels(["Участник", "Вес, кг", "Объем, л"])
+        self.bags_table.setMaximumHeight(150)
+        for bag in bags:
+            self.add_bag(bag)
+        layout.addWidget(self.bags_table)
+        
+        buttons_layout = QHBoxLayout()
+        add_button = QPushButton("Добавить участника")
+        add_button.clicked.connect(lambda: self.add_bag(
+            {"name": f"Участник {self.bags_table.rowCount() + 1}", "max_weight": 12, "max_volume": 40}))
+        buttons_layout.addWidget(add_button)
+        remove_button = QPushButton("Удалить участника")
+        remove_button.clicked.connect(self.remove_bag)
+        buttons_layout.addWidget(remove_button)
+        calculate_button = QPushButton("Распределить")
+        calculate_button.clicked.connect(self.calculate)
+        buttons_layout.addWidget(calculate_button)
+        layout.addLayout(buttons_layout)
+        
+        # По визуализатору и списку предметов на каждого участника
+        self.results_layout = QHBoxLayout()
+        layout.addLayout(self.results_layout)
+        
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
+        
+        self.solver = BackgroundSolver(self)
+        self.solver.solved.connect(self.show_results)
+        self.solver.failed.connect(lambda message: self.status_label.setText(f"Ошибка: {message}"))
+        self.requested = []
+        self.calculate()
+
+    def add_bag(self, bag):
+        row = self.bags_table.rowCount()
+        self.bags_table.insertRow(row)
+        for column, value in enumerate((bag["name"], bag["max_weight"], bag["max_volume"])):
+            self.bags_table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def remove_bag(self):
+        row = self.bags_table.currentRow()
+        if row >= 0:
+            self.bags_table.removeRow(row)
+
+    def bags(self):
+        """Рюкзаки из таблицы в формате .bpc; ValueError при неверных числах"""
+        bags = []
+        for row in range(self.bags_table.rowCount()):
+            cells = [self.bags_table.item(row, column) for column in range(3)]
+            name, weight, volume = (cell.text().strip() if cell else "" for cell in cells)
+            bags.append({
+                "name": name or f"Участник {row + 1}",
+                "max_weight": float(weight.replace(",", ".")),
+                "max_volume": float(volume.replace(",", ".")),
+            })
+        return bags
+
+    def calculate(self):
+        try:
+            bags = self.bags()
+        except ValueError:
+            self.status_label.setText("Вес и объем должны быть числами")
+            return
+        if not bags:
+            self.status_label.setText("Добавьте хотя бы одного участника")
+            return
+        self.requested = bags
+        self.status_label.setText("Расчет...")
+        self.solver.submit(multibag.solve_multibag, self.items,
+                           [multibag.BagSpec.from_dict(bag) for bag in bags])
+
+    def clear_results(self):
+        while self.results_layout.count():
+            item = self.results_layout.takeAt(0)
+            widget = item.widget()
+            if widget is not None:
+                widget.deleteLater()
+
+    def add_result_column(self, title, counts, visualizer=None):
+        column = QWidget()
+        column_layout = QVBoxLayout(column)
+        column_layout.setContentsMargins(0, 0, 0, 0)
+        column_layout.addWidget(QLabel(title))
+        if visualizer is not None:
+            visualizer.setMinimumHeight(120)
+            column_layout.addWidget(visualizer)
+        names_list = QListWidget()
+        names_list.addItems(counted_name(name, count) for name, count in counts.items())
+        column_layout.addWidget(names_list)
+        self.results_layout.addWidget(column)
+
+    def show_results(self, solution):
+        self.clear_results()
+        for bag, counts, weight, volume in zip(self.requested, solution.counts,
+                                               solution.weights, solution.volumes):
+            visualizer = BackpackVisualizer()
+            visualizer.set_weights(weight, bag["max_weight"] * 1000, volume, bag["max_volume"])
+            self.add_result_column(f"{bag['name']}: {weight / 1000:.1f} кг, {volume:.1f} л",
+                                   counts, visualizer)
+        left_out = sum(solution.unassigned_counts.values())
+        if left_out:
+            self.add_result_column(f"Не поместилось: {left_out}", solution.unassigned_counts)
+        quality = "оптимально" if solution.optimal else "эвристика"
+        self.status_label.setText(f"Распределено ({quality}), не поместилось предметов: {left_out}")
+
+    def done(self, result):
+        self.solver.shutdown()
+        super().done(result)
+
+class ParetoPlot(QWidget):
+    """Точечная диаграмма фронта Парето: вес по горизонтали, объем по вертикали,
+    чем темнее точка, тем выше суммарный приоритет"""
+    point_selected = pyqtSignal(object)
+    
+    MARGIN = 40
+    POINT_RADIUS = 4
+    # Насколько далеко от точки можно щелкнуть, чтобы выбрать ее (пикс.)
+    PICK_DISTANCE = 10
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumSize(450, 320)
+        self.points = []
+        self.max_weight = 1
+        self.max_volume = 1
+        self.selected = None
+    
+    def set_points(self, points, max_weight, max_volume):
+        """Новый фронт; выбор сохраняется, если такая точка на нем осталась"""
+        self.points = points
+        self.max_weight = max_weight or 1
+        self.max_volume = max_volume or 1
+        if self.selected is not None:
+            key = (self.selected.weight, self.selected.volume, self.selected.priority)
+            self.selected = next((point for point in points
+                                  if (point.weight, point.volume, point.priority) == key), None)
+        self.update()
+    
+    def _plot_rect(self):
+        return QRectF(self.rect()).adjusted(self.MARGIN, 10, -10, -self.MARGIN)
+    
+    def _position(self, point, plot):
+        x = plot.left() + plot.width() * point.weight / self.max_weight
+        y = plot.bottom() - plot.height() * point.volume / self.max_volume
+        return QPointF(x, y)
+    
+    def _color(self, point, low, high):
+        share = (point.priority - low) / (high - low) if high > low else 1.0
+        shade = int(200 - 170 * share)
+        return QColor(shade, shade, 255)
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        plot = self._plot_rect()
+        painter.setPen(QPen(QColor(0, 0, 0), 1))
+        painter.drawLine(plot.bottomLeft(), plot.bottomRight())
+        painter.drawLine(plot.bottomLeft(), plot.topLeft())
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 5, plot.width(), 20),
+                         Qt.AlignmentFlag.AlignCenter,
+                         f"Вес, кг (до {self.max_weight / 1000:.1f})")
+        painter.save()
+        painter.translate(plot.left() - 25, plot.center().y())
+        painter.rotate(-90)
+        painter.drawText(QRectF(-plot.height() / 2, -10, plot.height(), 20),
+                         Qt.AlignmentFlag.AlignCenter, f"Объем, л (до {self.max_volume:.0f})")
+        painter.restore()
+        if not self.points:
+            return
+        low = min(point.priority for point in self.points)
+        high = max(point.priority for point in self.points)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for point in self.points:
+            painter.setBrush(self._color(point, low, high))
+            painter.drawEllipse(self._position(point, plot), self.POINT_RADIUS, self.POINT_RADIUS)
+        if self.selected is not None:
+            painter.setPen(QPen(QColor(220, 0, 0), 2))
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawEllipse(self._position(self.selected, plot),
+                                self.POINT_RADIUS + 3, self.POINT_RADIUS + 3)
+    
+    def mousePressEvent(self, event):
+        plot = self._plot_rect()
+        pos = event.position()
+        best, best_distance = None, self.PICK_DISTANCE ** 2
+        for point in self.points:
+            center = self._position(point, plot)
+            distance = (center.x() - pos.x()) ** 2 + (center.y() - pos.y()) ** 2
+            if distance <= best_distance:
+                best, best_distance = point, distance
+        if best is not None:
+            self.selected = best
+            self.update()
+            self.point_selected.emit(best)
+
+class ParetoDialog(QDialog):
+    """Фронт Парето укладок; обновляется вслед за списком предметов"""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("Фронт Парето: вес, объем и приоритет")
+        layout = QVBoxLayout(self)
+        
+        self.plot = ParetoPlot()
+        self.plot.point_selected.connect(self.show_point)
+        layout.addWidget(self.plot)
+        
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.point_label = QLabel("Щелкните по точке, чтобы посмотреть набор")
+        self.point_label.setWordWrap(True)
+        layout.addWidget(self.point_label)
+        
+        buttons_layout = QHBoxLayout()
+        self.apply_button = QPushButton("Применить к списку")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(lambda: parent.apply_pareto_point(self.plot.selected))
+        buttons_layout.addWidget(self.apply_button)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_button)
+        layout.addLayout(buttons_layout)
+        
+        # Фронт хранится в главном окне, поэтому пересчет идет только
+        # по изменившимся предметам, в том числе между открытиями окна
+        self.solver = BackgroundSolver(self)
+        self.solver.solved.connect(self.show_front)
+        self.solver.failed.connect(lambda message: self.status_label.setText(f"Ошибка: {message}"))
+        self.requested = None
+        self.refresh()
+    
+    def refresh(self):
+        parent = self.parent()
+        self.requested = (parent.weight_input.value() * 1000, parent.volume_spin.value())
+        self.status_label.setText("Расчет фронта...")
+        self.solver.submit(parent.pareto.update, parent.items.snapshot(), *self.requested)
+    
+    def show_front(self, points):
+        self.plot.set_points(points, *self.requested)
+        self.status_label.setText(f"Вариантов укладки на фронте: {len(points)}")
+        self.show_point(self.plot.selected)
+    
+    def show_point(self, point):
+        self.apply_button.setEnabled(point is not None)
+        if point is None:
+            self.point_label.setText("Щелкните по точке, чтобы посмотреть набор")
+            return
+        counts = point.counts
+        self.point_label.setText(
+            f"{point.weight} гр., {point.volume:.1f} л, приоритет {point.priority}: "
+            + ", ".join(counted_name(name, count) for name, count in counts.items())
+        )
+    
+    def done(self, result):
+        self.solver.shutdown()
+        self.parent().pareto_dialog = None
+        super().done(result)
+
+class PerfDialog(QDialog):
+    """Замеры времени горячих путей: процентили по участкам и выгрузка трассы"""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("Замеры производительности")
+        self.setMinimumSize(640, 320)
+        layout = QVBoxLayout(self)
+        
+        self.enabled_check = QCheckBox("Замерять время (выключенные замеры не замедляют программу)")
+        self.enabled_check.setChecked(perf.is_enabled())
+        self.enabled_check.toggled.connect(self.set_enabled)
+        layout.addWidget(self.enabled_check)
+        
+        self.table = QTableWidget(0, len(PERF_COLUMNS))
+        self.table.setHorizontalHeaderLabels(PERF_COLUMNS)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        
+        buttons_layout = QHBoxLayout()
+        clear_button = QPushButton("Очистить")
+        clear_button.clicked.connect(self.clear)
+        buttons_layout.addWidget(clear_button)
+        export_button = QPushButton("Сохранить трассу...")
+        export_button.clicked.connect(self.export_trace)
+        buttons_layout.addWidget(export_button)
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_button)
+        layout.addLayout(buttons_layout)
+        
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(PERF_REFRESH_INTERVAL)
+        self.refresh()
+    
+    def set_enabled(self, enabled):
+        if enabled:
+            perf.enable()
+        else:
+            perf.disable()
+        self.refresh()
+    
+    def clear(self):
+        perf.clear()
+        self.refresh()
+    
+    def refresh(self):
+        stats = perf.stats()
+        self.table.setRowCount(len(stats))
+        for row, (label, values) in enumerate(stats.items()):
+            cells = [label, str(values["count"])] + [
+                f"{values[key]:.2f} мс" for key in ("mean", "p50", "p95", "p99", "max")]
+            for column, text in enumerate(cells):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+        state = "включены" if perf.is_enabled() else "выключены"
+        self.status_label.setText(f"Замеры {state}; в буфере {min(perf.buffer.total, perf.buffer.size)} "
+                                  f"из {perf.buffer.size} последних вызовов")
+    
+    def export_trace(self):
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить трассу", "backpack_trace.json", "Trace Event JSON (*.json)")
+        if not file_name:
+            return
+        try:
+            perf.export_chrome_trace(file_name)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить трассу: {e}")
+            return
+        self.status_label.setText(f"Трасса сохранена: {file_name} (открывается в chrome://tracing или Perfetto)")
+    
+    def done(self, result):
+        self.timer.stop()
+        self.parent().perf_dialog = None
+        super().done(result)
+
+class JournalSignals(QObject):
+    """Переносит уведомления потока записи журнала в поток интерфейса"""
+    saved = pyqtSignal(str, object)
 
 class BackpackCalculator(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_file = None  # Добавляем отслеживание текущего файла
+        self.current_binary = False  # Текущий файл в двоичном формате
+        self.saving_files = {}  # Файлы, запись которых еще идет -> (двоичный ли, прежний файл)
+        self.bags = []  # Рюкзаки участников из файла для распределения снаряжения
+        self.loader = None  # Текущая фоновая загрузка файла
+        self.about_dialog = None  # Создается при первом открытии
+        self.load_progress = None
         self.update_window_title()
         self.setMinimumSize(700, 500)  # Увеличиваем минимальный размер окна
         
@@ -237,82 +805,101 @@ class BackpackCalculator(QMainWindow):
         # Создание меню
         self.create_menu()
         
-        # Предустановленные наборы снаряжения
-        self.preset_items = {
-            "Базовое снаряжение": {
-                "Документы, билеты, деньги": {"вес": 100, "объем": 0.2},
-                "Чехол от дождя для рюкзака": {"вес": 200, "объем": 0.3},
-                "Спальный мешок -10°C": {"вес": 1800, "объем": 8.0},
-                "Средства личной гигиены": {"вес": 400, "объем": 1.5},
-                "Крем от солнца SF 70-110": {"вес": 150, "объем": 0.2},
-                "Гигиеническая помада SF": {"вес": 20, "объем": 0.1},
-                "Фонарик налобный": {"вес": 150, "объем": 0.3},
-                "Очки солнцезащитные": {"вес": 150, "объем": 0.5},
-                "Треккинговые палки": {"вес": 500, "объем": 1.0}
-            },
-            "Одежда": {
-                "Треккинговые ботинки": {"вес": 1200, "объем": 4.0},
-                "Кроссовки легкие": {"вес": 800, "объем": 3.0},
-                "Пуховка": {"вес": 800, "объем": 4.0},
-                "Штормовка": {"вес": 400, "объем": 2.0},
-                "Футболка": {"вес": 150, "объем": 0.5},
-                "Носки треккинговые (2 пары)": {"вес": 200, "объем": 0.4},
-                "Носки обычные (2 пары)": {"вес": 150, "объем": 0.3},
-                "Нижнее бельё (комплект)": {"вес": 200, "объем": 0.5},
-                "Флисовая кофта": {"вес": 400, "объем": 2.0},
-                "Термобелье верх": {"вес": 250, "объем": 0.8},
-                "Термобелье низ": {"вес": 250, "объем": 0.8},
-                "Штаны ходовые": {"вес": 400, "объем": 1.5},
-                "Шорты": {"вес": 200, "объем": 0.7},
-                "Шапка тёплая": {"вес": 100, "объем": 0.3},
-                "Панамка": {"вес": 100, "объем": 0.3},
-                "Перчатки флисовые": {"вес": 150, "объем": 0.3},
-                "Перчатки виндстопер": {"вес": 100, "объем": 0.3},
-                "Баф": {"вес": 50, "объем": 0.2},
-                "Дождевик": {"вес": 300, "объем": 1.0}
-            },
-            "Электроника": {
-                "Телефон": {"вес": 200, "объем": 0.3},
-                "Зарядное устройство": {"вес": 150, "объем": 0.2},
-                "Повербанк": {"вес": 350, "объем": 0.4},
-                "GPS навигатор": {"вес": 250, "объем": 0.3},
-                "Рация": {"вес": 300, "объем": 0.4},
-                "Запасные батарейки": {"вес": 100, "объем": 0.2}
-            }
-        }
-        
-        # Словарь для хранения предметов, их веса и объема
-        self.items = {}
+        # Каталог готового снаряжения открывается после первой отрисовки окна
+        self.catalog = None
+        
+        # Словарь для хранения предметов, их веса и объема с готовыми итогами
+        self.items = Inventory()
+        
+        # История правок для отмены и повтора
+        self.undo_log = UndoLog(self.items)
+        
+        # Журнал правок рядом с файлом и сохранение - в отдельном потоке
+        self.journal_signals = JournalSignals(self)
+        self.journal_signals.saved.connect(self.on_file_saved)
+        self.journal = JournalWriter(on_saved=self.journal_signals.saved.emit)
+        self.journal.follow(self.items)
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(AUTOSAVE_INTERVAL)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start()
+        
+        # Поисковые индексы: рюкзак обновляется по событиям Inventory,
+        # каталог строится в фоне после его открытия
+        inventory_index = SearchIndex()
+        inventory_index.follow(self.items)
+        self.search_indexes = {"catalog": SearchIndex(), "inventory": inventory_index}
+        self.search_catalog = {}  # название -> данные из каталога (или None) для результатов поиска
+        self.index_builder = BackgroundSolver(self)
+        self.index_builder.solved.connect(self.on_catalog_index_built)
+        
+        # Подбор оптимальной укладки выполняется в фоновом потоке; решатель
+        # помнит прошлую таблицу ДП и оптимум, поэтому правка одного
+        # предмета не пересчитывает задачу целиком. Пул решателя однопоточный,
+        # так что состояние warm_solver меняется только из одного потока
+        self.warm_solver = WarmStartSolver()
+        self.solver = BackgroundSolver(self)
+        self.solver.started.connect(self.on_solve_started)
+        self.solver.progress.connect(self.on_solve_progress)
+        self.solver.solved.connect(self.on_solve_finished)
+        self.solver.failed.connect(self.on_solve_failed)
+        # Подбор с бюджетом времени присылает все более хорошие укладки;
+        # частые улучшения склеиваются, чтобы не загружать поток интерфейса
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setSingleShot(True)
+        self.progress_timer.setInterval(PROGRESS_INTERVAL)
+        self.progress_timer.timeout.connect(self.show_pending_step)
+        self.pending_step = None
+        self.solve_gap = None
+        
+        # Кэш решений сохраняется между запусками рядом с settings.json
+        self.solver_cache = SolverCache(file_name=default_cache_file())
+        self.solve_key = None
+        
+        # Фронт Парето по весу, объему и приоритету; слои переиспользуются между пересчетами
+        self.pareto = ParetoExplorer()
+        self.pareto_dialog = None
+        self.perf_dialog = None
+        
+        # Оптимизация списка по приоритету: результат применяется после подтверждения
+        self.optimizer = BackgroundSolver(self)
+        self.optimizer.solved.connect(self.on_optimized)
+        self.optimizer.failed.connect(
+            lambda message: QMessageBox.warning(self, "Оптимизация", f"Не удалось подобрать набор: {message}"))
+        self.optimize_key = None
         
         # Создание центрального виджета
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
         
-        # Создание кнопок категорий
-        categories_layout = QHBoxLayout()
+        # Кнопки категорий создаются по каталогу в update_categories
+        self.categories_layout = QHBoxLayout()
         self.category_buttons = QButtonGroup(self)
         self.category_buttons.setExclusive(True)
-        
-        for category in self.preset_items.keys():
-            button = QPushButton(category)
-            button.setCheckable(True)
-            self.category_buttons.addButton(button)
-            categories_layout.addWidget(button)
-            if category == "Базовое снаряжение":  # По умолчанию выбираем первую категорию
-                button.setChecked(True)
-        
-        self.category_buttons.buttonClicked.connect(self.update_items_list)
-        layout.addLayout(categories_layout)
+        self.category_buttons.buttonClicked.connect(lambda button: self.update_items_list(button))
+        layout.addLayout(self.categories_layout)
         
         # Создание трехколоночного layout
         main_content_layout = QHBoxLayout()
         
         # Левая колонка - список доступных предметов
         left_panel = QVBoxLayout()
-        self.available_items_list = QListWidget()
+        self.available_items_model = CatalogListModel(parent=self)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по каталогу и рюкзаку")
+        self.search_input.setClearButtonEnabled(True)
+        left_panel.addWidget(self.search_input)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        
+        self.available_items_list = QListView()
+        self.available_items_list.setModel(self.available_items_model)
+        self.available_items_list.setUniformItemSizes(True)
         self.available_items_list.setMinimumWidth(250)
-        self.update_items_list()  # Заполняем список предметами первой категории
         left_panel.addWidget(self.available_items_list)
         
         add_selected_button = QPushButton("Добавить выбранный предмет")
@@ -345,6 +932,25 @@ class BackpackCalculator(QMainWindow):
         volume_layout.addWidget(self.item_volume)
         left_panel.addLayout(volume_layout)
         
+        count_layout = QHBoxLayout()
+        count_layout.addWidget(QLabel("Количество:"))
+        self.item_count = QSpinBox()
+        self.item_count.setRange(1, 1000)
+        self.item_count.setSuffix(" шт.")
+        self.item_count.setValue(1)
+        count_layout.addWidget(self.item_count)
+        left_panel.addLayout(count_layout)
+        
+        priority_layout = QHBoxLayout()
+        priority_layout.addWidget(QLabel("Приоритет:"))
+        self.item_priority = QSpinBox()
+        self.item_priority.setRange(0, 1000)
+        self.item_priority.setValue(1)
+        priority_layout.addWidget(self.item_priority)
+        self.item_mandatory = QCheckBox("Обязательный")
+        priority_layout.addWidget(self.item_mandatory)
+        left_panel.addLayout(priority_layout)
+        
         add_custom_button = QPushButton("Добавить свой предмет")
         add_custom_button.clicked.connect(self.add_item)
         left_panel.addWidget(add_custom_button)
@@ -354,7 +960,32 @@ class BackpackCalculator(QMainWindow):
         # Центральная колонка - список добавленных предметов
         center_panel = QVBoxLayout()
         center_panel.addWidget(QLabel("Добавленные предметы:"))
-        self.items_list = CustomListWidget(self)
+        
+        # Сортировка и фильтр списка добавленных предметов
+        view_options_layout = QHBoxLayout()
+        self.items_filter = QLineEdit()
+        self.items_filter.setPlaceholderText("Фильтр по названию")
+        view_options_layout.addWidget(self.items_filter)
+        self.items_sort = QComboBox()
+        self.items_sort.addItem("По порядку добавления", None)
+        self.items_sort.addItem("По названию", "name")
+        self.items_sort.addItem("По весу", "weight")
+        self.items_sort.addItem("По объему", "volume")
+        self.items_sort.addItem("По приоритету", "priority")
+        view_options_layout.addWidget(self.items_sort)
+        center_panel.addLayout(view_options_layout)
+        
+        self.items_model = InventoryListModel(self.items, self)
+        self.items_proxy = ItemSortFilterProxyModel(self)
+        self.items_proxy.setSourceModel(self.items_model)
+        self.items_filter.textChanged.connect(self.items_proxy.setFilterFixedString)
+        self.items_sort.currentIndexChanged.connect(
+            lambda: self.items_proxy.sort_by(self.items_sort.currentData())
+        )
+        
+        self.items_list = CustomListView(self)
+        self.items_list.setModel(self.items_proxy)
+        self.items_list.setUniformItemSizes(True)
         self.items_list.setMinimumWidth(300)
         self.setup_context_menu()
         center_panel.addWidget(self.items_list)
@@ -395,6 +1026,9 @@ class BackpackCalculator(QMainWindow):
         self.weight_input.setRange(5, 25)
         self.weight_input.setValue(12)
         self.weight_input.setSuffix(" кг")
+        # Метод берется в момент вызова, чтобы включенные замеры perf его видели
+        self.weight_input.valueChanged.connect(lambda: self.update_backpack_state())
+        self.weight_input.valueChanged.connect(lambda value: self.record_settings(max_weight=value))
         weight_layout.addWidget(self.weight_input)
         
         set_weight_button = QPushButton("Подтвердить")
@@ -412,6 +1046,8 @@ class BackpackCalculator(QMainWindow):
         self.volume_spin.setRange(20, 80)
         self.volume_spin.setValue(40)
         self.volume_spin.setSuffix(" л")
+        self.volume_spin.valueChanged.connect(lambda: self.update_backpack_state())
+        self.volume_spin.valueChanged.connect(lambda value: self.record_settings(max_volume=value))
         volume_layout.addWidget(self.volume_spin)
         
         set_volume_button = QPushButton("Подтвердить")
@@ -419,12 +1055,45 @@ class BackpackCalculator(QMainWindow):
         volume_layout.addWidget(set_volume_button)
         
         params_layout.addLayout(volume_layout)
+        params_layout.addSpacing(20)
+        
+        # Что максимизировать и точность приближенного решения
+        params_layout.addWidget(QLabel("Цель:"))
+        self.goal_combo = QComboBox()
+        self.goal_combo.addItem("Максимум веса", "weight")
+        self.goal_combo.addItem("Максимум приоритета", "priority")
+        self.goal_combo.currentIndexChanged.connect(lambda: self.update_backpack_state())
+        params_layout.addWidget(self.goal_combo)
+        
+        params_layout.addWidget(QLabel("Точность:"))
+        self.eps_spin = QDoubleSpinBox()
+        self.eps_spin.setRange(0, 0.5)
+        self.eps_spin.setDecimals(2)
+        self.eps_spin.setSingleStep(0.05)
+        self.eps_spin.setSpecialValueText("точно")
+        self.eps_spin.setValue(knapsack.FPTAS_EPSILON)
+        self.eps_spin.setToolTip("Допустимая доля потери ценности, если точный расчет слишком долгий:\n"
+                                 "больше - быстрее, 0 - всегда точное решение")
+        self.eps_spin.valueChanged.connect(lambda: self.update_backpack_state())
+        params_layout.addWidget(self.eps_spin)
+        
+        params_layout.addWidget(QLabel("Время:"))
+        self.budget_spin = QDoubleSpinBox()
+        self.budget_spin.setRange(0, MAX_SOLVE_BUDGET)
+        self.budget_spin.setDecimals(1)
+        self.budget_spin.setSingleStep(0.5)
+        self.budget_spin.setSuffix(" с")
+        self.budget_spin.setSpecialValueText("не ограничено")
+        self.budget_spin.setToolTip("Сколько искать лучшую укладку: сразу показывается жадная,\n"
+                                    "затем все лучше, пока не кончится время или не найден оптимум")
+        self.budget_spin.valueChanged.connect(lambda: self.update_backpack_state())
+        params_layout.addWidget(self.budget_spin)
         params_layout.addStretch()
         layout.addLayout(params_layout)
         
         # Результаты
         self.result_list = QListWidget()
-        self.result_list.setFixedHeight(75)  # Устанавливаем фиксированную высоту для трех строк
+        self.result_list.setFixedHeight(100)  # Устанавливаем фиксированную высоту для четырех строк
         self.result_list.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)  # Отключаем полосу прокрутки
         layout.addWidget(self.result_list)
 
@@ -444,7 +1113,7 @@ class BackpackCalculator(QMainWindow):
         
         open_action = QAction("Открыть", self)
         open_action.setShortcut("Ctrl+O")
-        open_action.triggered.connect(self.open_file)
+        open_action.triggered.connect(lambda: self.open_file())
         file_menu.addAction(open_action)
         
         save_action = QAction("Сохранить", self)
@@ -459,11 +1128,62 @@ class BackpackCalculator(QMainWindow):
         
         file_menu.addSeparator()
         
+        import_catalog_action = QAction("Импорт каталога...", self)
+        import_catalog_action.triggered.connect(self.import_catalog)
+        file_menu.addAction(import_catalog_action)
+        
+        file_menu.addSeparator()
+        
         exit_action = QAction("Выход", self)
         exit_action.setShortcut("Alt+F4")
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # Меню Правка
+        edit_menu = menubar.addMenu("Правка")
+        
+        self.undo_action = QAction("Отменить", self)
+        self.undo_action.setShortcuts(QKeySequence.StandardKey.Undo)
+        self.undo_action.triggered.connect(self.undo)
+        self.undo_action.setEnabled(False)
+        edit_menu.addAction(self.undo_action)
+        
+        self.redo_action = QAction("Повторить", self)
+        redo_keys = QKeySequence.keyBindings(QKeySequence.StandardKey.Redo)
+        if QKeySequence("Ctrl+Y") not in redo_keys:
+            redo_keys.insert(0, QKeySequence("Ctrl+Y"))
+        self.redo_action.setShortcuts(redo_keys)
+        self.redo_action.triggered.connect(self.redo)
+        self.redo_action.setEnabled(False)
+        edit_menu.addAction(self.redo_action)
+        
+        # Меню Расчет
+        calc_menu = menubar.addMenu("Расчет")
+        
+        sweep_action = QAction("Подбор емкости...", self)
+        sweep_action.triggered.connect(self.show_capacity_sweep)
+        calc_menu.addAction(sweep_action)
+        
+        multibag_action = QAction("Распределить по участникам...", self)
+        multibag_action.triggered.connect(self.show_multibag)
+        calc_menu.addAction(multibag_action)
+        
+        pareto_action = QAction("Фронт Парето...", self)
+        pareto_action.triggered.connect(self.show_pareto)
+        calc_menu.addAction(pareto_action)
+        
+        optimize_action = QAction("Оставить лучший набор по приоритету", self)
+        optimize_action.triggered.connect(self.optimize_items)
+        calc_menu.addAction(optimize_action)
+        
+        cache_stats_action = QAction("Статистика кэша решений", self)
+        cache_stats_action.triggered.connect(self.show_cache_stats)
+        calc_menu.addAction(cache_stats_action)
+        
+        perf_action = QAction("Замеры производительности...", self)
+        perf_action.triggered.connect(self.show_perf)
+        calc_menu.addAction(perf_action)
+        
         # Меню Справка
         help_menu = menubar.addMenu("Справка")
         
@@ -480,29 +1200,135 @@ class BackpackCalculator(QMainWindow):
             "Файлы рюкзака (*.bpc);;Все файлы (*.*)"
         )
         if file_name:
+            self.load_file(file_name)
+
+    def load_file(self, file_name):
+        """Загружает файл по частям, не блокируя окно, и показывает прогресс"""
+        self.cancel_loading()
+        try:
+            loader = BpcLoader(file_name, self)
+        except OSError as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось открыть файл: {str(e)}")
+            return
+        
+        # Очистка записывается в историю целиком, пачки из файла - нет,
+        # поэтому открытие файла отменяется одним шагом. В журнал прежнего
+        # файла загрузка нового не попадает
+        self.journal.paused = True
+        self.items.clear()
+        self.undo_log.paused = True
+        
+        self.load_progress = QProgressDialog("Загрузка файла...", "Отмена", 0, 100, self)
+        self.load_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.load_progress.setMinimumDuration(300)
+        self.load_progress.canceled.connect(self.cancel_loading)
+        
+        loader.batch_loaded.connect(self.on_items_batch_loaded)
+        loader.progress.connect(self.load_progress.setValue)
+        loader.finished.connect(lambda reader: self.on_file_loaded(file_name, loader.binary, reader))
+        loader.failed.connect(self.on_file_load_failed)
+        self.loader = loader
+        loader.start()
+
+    def cancel_loading(self):
+        """Прерывает загрузку; уже прочитанные предметы отбрасываются и
+        возвращается список, который был до нее"""
+        if self.loader is None:
+            return
+        self.loader.cancel()
+        self.loader.deleteLater()
+        self.loader = None
+        self.close_load_progress()
+        # Журнал еще приостановлен, поэтому в журнал прежнего файла ничего не попадет
+        self.undo_log.rollback()
+        self.undo_log.paused = False
+        self.journal.paused = False
+        self.update_backpack_state()
+
+    def close_load_progress(self):
+        if self.load_progress is not None:
+            self.load_progress.canceled.disconnect(self.cancel_loading)
+            self.load_progress.close()
+            self.load_progress.deleteLater()
+            self.load_progress = None
+
+    def on_items_batch_loaded(self, batch):
+        """Добавляет очередную пачку предметов из загружаемого файла"""
+        try:
+            self.items.extend(batch)
+        except KeyError as e:
+            self.on_file_load_failed(f"повторяется предмет {e}")
+
+    def on_file_loaded(self, file_name, binary, reader):
+        if self.loader is None:
+            # Загрузку уже отменили (например, из-за повторяющегося предмета)
+            return
+        self.loader.deleteLater()
+        self.loader = None
+        self.close_load_progress()
+        self.undo_log.paused = False
+        # Загружаем максимальный вес и объем, если они есть в файле
+        if reader.has_limits():
+            self.weight_input.setValue(reader.header["max_weight"])
+            self.volume_spin.setValue(reader.header["max_volume"])
+        self.bags = reader.header.get("bags") or []
+        self.restore_journal(file_name)
+        self.journal.paused = False
+        self.current_file = file_name
+        self.current_binary = binary
+        self.update_window_title()
+        self.update_backpack_state()
+
+    def restore_journal(self, file_name):
+        """Повторяет несохраненные правки из журнала файла после сбоя"""
+        records = read_journal(file_name)
+        if records:
             try:
-                with open(file_name, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    
-                    # Загружаем максимальный вес и объем, если они есть в файле
-                    if isinstance(data, dict) and "max_weight" in data and "max_volume" in data:
-                        self.weight_input.setValue(data["max_weight"])
-                        self.volume_spin.setValue(data["max_volume"])
-                        items_data = data["items"]
-                    else:
-                        # Для обратной совместимости со старым форматом
-                        items_data = data
-                    
-                    self.items.clear()
-                    self.items_list.clear()
-                    for item_name, item_data in items_data.items():
-                        self.items[item_name] = item_data
-                        self.items_list.addItem(f"{item_name} = {item_data['вес']} гр., {item_data['объем']} л")
-                    self.current_file = file_name
-                    self.update_window_title()
-                    self.update_backpack_state()
-            except Exception as e:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось открыть файл: {str(e)}")
+                settings = apply_records(records, self.items)
+            except (KeyError, TypeError, ValueError) as e:
+                QMessageBox.warning(self, "Журнал изменений",
+                                    f"Не удалось восстановить несохраненные изменения: {str(e)}")
+                records = []
+            else:
+                if "max_weight" in settings:
+                    self.weight_input.setValue(settings["max_weight"])
+                if "max_volume" in settings:
+                    self.volume_spin.setValue(settings["max_volume"])
+                if "bags" in settings:
+                    self.bags = settings["bags"]
+                self.statusBar().showMessage(
+                    f"Восстановлены несохраненные изменения: {len(records)}", 10000)
+        self.journal.open(file_name, len(records))
+
+    def record_settings(self, **values):
+        """Записывает в журнал изменение пределов рюкзака или участников"""
+        self.journal.record({"op": "settings", "values": values})
+
+    def autosave(self):
+        """По таймеру: журнал сбрасывается на диск, длинный журнал сжимается в файл"""
+        if self.journal.file_name is None or not self.journal.pending or self.loader is not None:
+            return
+        if self.journal.pending >= COMPACT_RECORDS:
+            self._save_to_file(self.journal.file_name)
+        else:
+            self.journal.sync()
+
+    def on_file_saved(self, file_name, error):
+        """Окно переключается на новый файл только после успешной записи"""
+        binary, previous = self.saving_files.pop(file_name, (self.current_binary, self.current_file))
+        if error is not None:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить файл: {error}")
+            return
+        if self.current_file != previous:
+            # Пока шла запись, открыли другой файл
+            return
+        self.current_file = file_name
+        self.current_binary = binary
+        self.update_window_title()
+
+    def on_file_load_failed(self, message):
+        self.cancel_loading()
+        QMessageBox.warning(self, "Ошибка", f"Не удалось открыть файл: {message}")
 
     def save_file(self):
         if self.current_file:
@@ -512,67 +1338,238 @@ class BackpackCalculator(QMainWindow):
 
     def save_file_as(self):
         default_name = "Backpack_calculation.bpc"
-        file_name, _ = QFileDialog.getSaveFileName(
+        binary_filter = "Двоичные файлы рюкзака (*.bpc)"
+        file_name, selected_filter = QFileDialog.getSaveFileName(
             self,
             "Сохранить файл",
             default_name,
-            "Файлы рюкзака (*.bpc);;Все файлы (*.*)"
+            f"Файлы рюкзака (*.bpc);;{binary_filter};;Все файлы (*.*)"
         )
         if file_name:
             # Добавляем расширение .bpc, если его нет
             if not file_name.lower().endswith('.bpc'):
                 file_name += '.bpc'
-            self._save_to_file(file_name)
+            self._save_to_file(file_name, binary=selected_filter == binary_filter)
 
-    def _save_to_file(self, file_name):
-        """Сохраняет данные в файл"""
-        try:
-            data = {
-                "max_weight": self.weight_input.value(),
-                "max_volume": self.volume_spin.value(),
-                "items": self.items
-            }
-            with open(file_name, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
-            self.current_file = file_name
-            self.update_window_title()
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить файл: {str(e)}")
+    def _save_to_file(self, file_name, binary=None):
+        """Сохраняет данные в файл; формат по умолчанию - как у текущего файла"""
+        if binary is None:
+            binary = self.current_binary
+        # Запись идет в потоке журнала атомарно; текущий файл поменяет on_file_saved
+        self.saving_files[file_name] = (binary, self.current_file)
+        self.journal.save(
+            file_name,
+            self.weight_input.value(),
+            self.volume_spin.value(),
+            self.items.snapshot(),
+            binary=binary,
+            bags=self.bags
+        )
 
     def show_about(self):
-        dialog = AboutDialog(self)
+        if self.about_dialog is None:
+            self.about_dialog = AboutDialog(self)
+        self.about_dialog.exec()
+
+    def show_capacity_sweep(self):
+        """Показывает лучшие укладки для диапазона емкостей и применяет выбранную"""
+        if not self.items:
+            QMessageBox.information(self, "Подбор емкости", "Сначала добавьте предметы!")
+            return
+        dialog = CapacitySweepDialog(
+            self,
+            self.items.snapshot(),
+            (self.weight_input.minimum(), self.weight_input.maximum()),
+            (self.volume_spin.minimum(), self.volume_spin.maximum()),
+            self.weight_input.value(),
+            self.volume_spin.value()
+        )
+        if dialog.exec() == QDialog.DialogCode.Accepted and dialog.selected:
+            weight, volume = dialog.selected
+            self.weight_input.setValue(weight)
+            self.volume_spin.setValue(volume)
+
+    def show_multibag(self):
+        """Распределяет предметы по рюкзакам участников; список участников сохраняется в файл"""
+        if not self.items:
+            QMessageBox.information(self, "Распределение по участникам", "Сначала добавьте предметы!")
+            return
+        bags = self.bags or [
+            {"name": f"Участник {k}", "max_weight": self.weight_input.value(),
+             "max_volume": self.volume_spin.value()}
+            for k in (1, 2)
+        ]
+        dialog = MultiBagDialog(self, self.items.snapshot(), bags)
         dialog.exec()
+        try:
+            bags = dialog.bags()
+        except ValueError:
+            return
+        if bags != self.bags:
+            self.bags = bags
+            self.record_settings(bags=bags)
+
+    def show_pareto(self):
+        """Открывает окно фронта Парето; оно не блокирует главное окно"""
+        if self.pareto_dialog is None:
+            self.pareto_dialog = ParetoDialog(self)
+        self.pareto_dialog.show()
+        self.pareto_dialog.raise_()
+
+    def apply_pareto_point(self, point):
+        """Отмечает в списке предметы, не вошедшие в выбранную точку фронта"""
+        if point is None:
+            return
+        packed = point.counts
+        self.items_model.set_excluded(name for name in self.items if name not in packed)
+        packed_count = sum(packed.values())
+        self.set_solver_line(
+            f"Выбранный вариант: {packed_count} {self.get_items_word(packed_count)}, "
+            f"{point.weight} гр., {point.volume:.1f} л, приоритет {point.priority}"
+        )
+
+    def optimize_items(self):
+        """Подбирает в фоне набор с наибольшим суммарным приоритетом"""
+        if not self.items:
+            QMessageBox.information(self, "Оптимизация", "Сначала добавьте предметы!")
+            return
+        snapshot = self.items.snapshot()
+        max_weight = self.weight_input.value() * 1000
+        max_volume = self.volume_spin.value()
+        self.optimize_key = fingerprint(snapshot, max_weight, max_volume)
+        self.statusBar().showMessage("Подбор лучшего набора по приоритету...")
+        self.optimizer.submit(knapsack.solve, snapshot, max_weight, max_volume, "auto",
+                              knapsack.priority_value, self.eps_spin.value())
+
+    def on_optimized(self, solution):
+        """Оставляет в списке только подобранный набор (правку можно отменить)"""
+        self.statusBar().clearMessage()
+        snapshot = self.items.snapshot()
+        if fingerprint(snapshot, self.weight_input.value() * 1000, self.volume_spin.value()) != self.optimize_key:
+            QMessageBox.information(self, "Оптимизация", "Список или емкость изменились, повторите оптимизацию")
+            return
+        removed = self.items.total_count - solution.total_count
+        if removed == 0:
+            QMessageBox.information(self, "Оптимизация", "Все предметы помещаются в рюкзак")
+            return
+        kept = solution.total_count
+        quality = "" if solution.optimal else " (приближенно)"
+        answer = QMessageBox.question(
+            self, "Оптимизация",
+            f"Оставить {kept} {self.get_items_word(kept)} с суммарным приоритетом {solution.value}{quality} "
+            f"и убрать из списка {removed}?\nПравку можно отменить."
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self.items.load((name, knapsack.with_quantity(snapshot[name], count))
+                        for name, count in solution.counts.items())
+        self.update_backpack_state()
+
+    def update_categories(self):
+        """Пересоздает кнопки категорий по каталогу, сохраняя выбранную"""
+        checked = self.category_buttons.checkedButton()
+        selected = checked.text() if checked else None
+        for button in self.category_buttons.buttons():
+            self.category_buttons.removeButton(button)
+            self.categories_layout.removeWidget(button)
+            button.deleteLater()
+        
+        categories = self.catalog.categories()
+        if selected not in categories:
+            selected = categories[0] if categories else None  # По умолчанию выбираем первую категорию
+        for category in categories:
+            button = QPushButton(category)
+            button.setCheckable(True)
+            button.setChecked(category == selected)
+            self.category_buttons.addButton(button)
+            self.categories_layout.addWidget(button)
+        self.update_items_list()
 
     def update_items_list(self, button=None):
         # Если кнопка не указана, берем текущую выбранную
         if button is None:
             button = self.category_buttons.checkedButton()
-        
-        category = button.text()
-        self.available_items_list.clear()
-        
-        # Добавляем предметы из выбранной категории
-        items = self.preset_items[category]
-        for item_name, item_data in items.items():
-            self.available_items_list.addItem(f"{item_name} ({item_data['вес']} гр., {item_data['объем']} л)")
+        if button is None:
+            return
+        if self.search_input.text():
+            # Выбор категории сбрасывает поиск
+            self.search_input.blockSignals(True)
+            self.search_input.clear()
+            self.search_input.blockSignals(False)
+            self.search_timer.stop()
+        
+        # Показываем первую страницу предметов выбранной категории, остальные
+        # подгружаются из каталога при прокрутке
+        self.available_items_model.set_query(category=button.text())
+
+    def run_search(self):
+        """Показывает в списке доступных предметов результаты поиска"""
+        text = self.search_input.text().strip()
+        if not text:
+            self.update_items_list()
+            return
+        results = search_all(self.search_indexes, text)
+        self.search_catalog = {name: sources.get("catalog") for name, sources in results}
+        rows = [(name, sources.get("inventory") or sources["catalog"]) for name, sources in results]
+        self.available_items_model.set_search_results(rows, packed=self.items)
+
+    def rebuild_catalog_index(self):
+        """Перестраивает индекс каталога в фоновом потоке"""
+        pairs = [(name, data) for _, name, data in self.catalog.iter_all()]
+        self.index_builder.submit(build_index, pairs)
+
+    def on_catalog_index_built(self, index):
+        self.search_indexes["catalog"] = index
+        if self.search_input.text().strip():
+            self.run_search()
+
+    def import_catalog(self):
+        file_name, _ = QFileDialog.getOpenFileName(
+            self,
+            "Импорт каталога",
+            "",
+            "Каталоги (*.json *.csv);;Все файлы (*.*)"
+        )
+        if not file_name or self.catalog is None:
+            return
+        try:
+            self.catalog.import_items(read_catalog_file(file_name))
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось импортировать каталог: {str(e)}")
+            return
+        self.update_categories()
+        self.rebuild_catalog_index()
+        QMessageBox.information(self, "Импорт каталога",
+                                f"В каталоге {self.catalog.count()} предметов")
 
     def add_selected_item(self):
-        current_item = self.available_items_list.currentItem()
-        if current_item:
-            text = current_item.text()
-            item_name = text[:text.rfind('(')].strip()
-            category = self.category_buttons.checkedButton().text()
-            item_data = self.preset_items[category][item_name]
+        index = self.available_items_list.currentIndex()
+        if index.isValid():
+            item_name = index.data(NameRole)
+            item_data = index.data(DataRole)
             
             if item_name not in self.items:
-                self.items[item_name] = item_data
-                self.items_list.addItem(f"{item_name} = {item_data['вес']} гр., {item_data['объем']} л")
-                self.update_backpack_state()
+                self.items.add(item_name, item_data)
+            else:
+                # Уже лежит в рюкзаке - добавляем еще столько штук, сколько в
+                # каталоге. Результат поиска показывает данные из самого рюкзака,
+                # поэтому число штук берется из каталога, а если там нет - одна
+                added = knapsack.quantity(item_data)
+                if self.search_input.text().strip() and item_name in self.search_catalog:
+                    catalog_data = self.search_catalog[item_name]
+                    added = knapsack.quantity(catalog_data) if catalog_data is not None else 1
+                packed = self.items[item_name]
+                self.items.replace(item_name, item_name, knapsack.with_quantity(
+                    packed, knapsack.quantity(packed) + added))
+            self.update_backpack_state()
 
     def add_item(self):
         name = self.item_name.text().strip()
         weight = self.item_weight.value()
         volume = self.item_volume.value()
+        count = self.item_count.value()
+        priority = self.item_priority.value()
+        required = self.item_mandatory.isChecked()
         
         if not name:
             QMessageBox.warning(self, "Ошибка", "Введите название предмета!")
@@ -582,64 +1579,108 @@ class BackpackCalculator(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Такой предмет уже существует!")
             return
             
-        self.items[name] = {"вес": weight, "объем": volume}
-        self.items_list.addItem(f"{name} = {weight} гр., {volume} л")
+        self.items.add(name, knapsack.item_data(weight, volume, count, priority, required))
         self.item_name.clear()
         self.item_weight.setValue(100)
         self.item_volume.setValue(0.5)
+        self.item_count.setValue(1)
+        self.item_priority.setValue(1)
+        self.item_mandatory.setChecked(False)
         self.update_backpack_state()
 
+    def current_item_name(self):
+        """Название выбранного предмета в списке добавленных или None"""
+        index = self.items_list.currentIndex()
+        if not index.isValid():
+            return None
+        return index.data(NameRole)
+
     def delete_item(self):
-        current_item = self.items_list.currentItem()
-        if current_item is None:
+        item_name = self.current_item_name()
+        if item_name is None:
             QMessageBox.warning(self, "Ошибка", "Выберите предмет для удаления!")
             return
-            
-        item_text = current_item.text()
-        item_name = item_text.split(" = ")[0]
         
-        del self.items[item_name]
-        self.items_list.takeItem(self.items_list.row(current_item))
+        self.items.remove(item_name)
         self.update_backpack_state()
 
     def clear_items(self):
         self.items.clear()
-        self.items_list.clear()
         self.result_list.clear()
         self.update_backpack_state()
 
+    def undo(self):
+        if self.undo_log.undo():
+            # Модели и итоги уже обновлены событиями Inventory
+            self.update_backpack_state()
+
+    def redo(self):
+        if self.undo_log.redo():
+            self.update_backpack_state()
+
+    def update_undo_actions(self):
+        self.undo_action.setEnabled(self.undo_log.can_undo())
+        self.undo_action.setText(f"Отменить {self.undo_log.undo_text()}".strip())
+        self.redo_action.setEnabled(self.undo_log.can_redo())
+        self.redo_action.setText(f"Повторить {self.undo_log.redo_text()}".strip())
+
     def update_backpack_state(self):
         """Обновляет состояние рюкзака и результаты при любых изменениях"""
+        self.update_undo_actions()
+        self.stop_progress()
+        self.available_items_model.refresh_packed()
+        if self.pareto_dialog is not None:
+            self.pareto_dialog.refresh()
         if not self.items:
+            self.solver.cancel()
+            self.items_model.set_excluded(())
             self.result_list.clear()
+            self.backpack_viz.set_packed(None, None)
             self.backpack_viz.set_weights(0, self.weight_input.value() * 1000, 0, self.volume_spin.value())
             return
             
         max_weight = self.weight_input.value() * 1000  # Перевод в граммы
         max_volume = self.volume_spin.value()  # Объем в литрах
-        remaining_weight = max_weight
-        remaining_volume = max_volume
-        sorted_items = dict(sorted(self.items.items(), key=lambda x: -x[1]['вес']))
-        
-        self.result_list.clear()
-        
-        # Первая строка: максимальные значения
-        self.result_list.addItem(f"Максимальный вес: {max_weight} гр. ({max_weight/1000:.1f} кг)     Максимальный объем: {max_volume} л")
         
-        # Подсчет общих значений
-        total_weight = sum(data['вес'] for data in self.items.values())
-        total_volume = sum(data['объем'] for data in self.items.values())
-        items_count = len(self.items)
-        
-        # Вторая строка: количество предметов
+        # Итоги поддерживаются самим списком предметов, пересчет не нужен
+        total_weight = self.items.total_weight
+        total_volume = self.items.total_volume
+        items_count = self.items.total_count
         items_word = self.get_items_word(items_count)
-        self.result_list.addItem(f"В рюкзаке {items_count} {items_word}")
         
-        # Третья строка: занято/осталось
-        self.result_list.addItem(
+        lines = [
+            # Первая строка: максимальные значения
+            f"Максимальный вес: {max_weight} гр. ({max_weight/1000:.1f} кг)     Максимальный объем: {max_volume} л",
+            # Вторая строка: количество предметов
+            f"В рюкзаке {items_count} {items_word}",
+            # Третья строка: занято/осталось
             f"Занято: {total_weight} гр. ({total_weight/1000:.1f} кг), осталось {max_weight - total_weight} гр. ({(max_weight - total_weight)/1000:.1f} кг)"
-            f"     Занято: {total_volume:.1f} л, осталось {max_volume - total_volume:.1f} л"
-        )
+            f"     Занято: {total_volume:.1f} л, осталось {max_volume - total_volume:.1f} л",
+        ]
+        
+        # Четвертая строка: оптимальная укладка, если все предметы не помещаются
+        if total_weight <= max_weight and total_volume <= max_volume:
+            self.solver.cancel()
+            self.items_model.set_excluded(())
+            self.backpack_viz.set_packed(None, None)
+            lines.append("Все предметы помещаются в рюкзак")
+            self.set_result_lines(lines)
+        else:
+            snapshot = self.items.snapshot()
+            value, eps = self.solve_options()
+            self.solve_key = fingerprint(snapshot, max_weight, max_volume,
+                                         f"auto/{self.goal_combo.currentData()}/{eps}")
+            cached = self.solver_cache.get(self.solve_key)
+            lines.append("Подбор оптимальной укладки...")
+            self.set_result_lines(lines)
+            if cached is not None:
+                self.solver.cancel()
+                self.show_solution(cached)
+            elif self.budget_spin.value():
+                self.solver.submit(anytime.solve_anytime, snapshot, max_weight, max_volume, value,
+                                   self.budget_spin.value())
+            else:
+                self.solver.submit(self.warm_solver.solve, snapshot, max_weight, max_volume, value, eps)
         
         # Обновляем визуализацию
         self.backpack_viz.set_weights(
@@ -649,22 +1690,137 @@ class BackpackCalculator(QMainWindow):
             max_volume
         )
 
+    def solve_options(self):
+        """Функция ценности и точность для решателя по выбранной цели"""
+        value = knapsack.priority_value if self.goal_combo.currentData() == "priority" else None
+        return value, self.eps_spin.value()
+
+    def set_result_lines(self, lines):
+        """Обновляет строки результатов на месте, не пересоздавая элементы списка"""
+        while self.result_list.count() > len(lines):
+            self.result_list.takeItem(self.result_list.count() - 1)
+        for row, text in enumerate(lines):
+            if row < self.result_list.count():
+                self.result_list.item(row).setText(text)
+            else:
+                self.result_list.addItem(text)
+
+    def set_solver_line(self, text):
+        """Заменяет строку с результатом подбора укладки"""
+        if self.result_list.count() >= 4:
+            self.result_list.item(3).setText(text)
+
+    def on_solve_started(self):
+        self.stop_progress()
+        self.solve_gap = None
+        self.set_solver_line("Подбор оптимальной укладки...")
+
+    def on_solve_progress(self, step):
+        """Промежуточная укладка подбора с бюджетом времени (anytime.AnytimeStep)"""
+        self.solve_gap = step.gap
+        if self.progress_timer.isActive():
+            self.pending_step = step
+            return
+        self.show_solution(step.solution, step.gap, searching=not step.final)
+        self.progress_timer.start()
+
+    def show_pending_step(self):
+        step, self.pending_step = self.pending_step, None
+        if step is not None:
+            self.show_solution(step.solution, step.gap, searching=not step.final)
+            self.progress_timer.start()
+
+    def stop_progress(self):
+        """Отбрасывает еще не показанную промежуточную укладку"""
+        self.progress_timer.stop()
+        self.pending_step = None
+
+    def on_solve_finished(self, solution):
+        """Запоминает результат фонового подбора и показывает его"""
+        self.stop_progress()
+        if solution.optimal:
+            self.solver_cache.put(self.solve_key, solution)
+        self.show_solution(solution, self.solve_gap)
+
+    def show_solution(self, solution, gap=None, searching=False):
+        """Показывает укладку в списке и строке результатов; gap - доля
+        ценности, которой ей может не хватать до оптимума"""
+        packed = solution.counts
+        self.items_model.set_excluded(name for name in self.items if name not in packed)
+        self.backpack_viz.set_packed(solution.weight, solution.volume)
+        packed_count = solution.total_count
+        left_out = self.items.total_count - packed_count
+        # Строки, из которых уложена только часть штук
+        partial = [f"{name} {count} из {knapsack.quantity(self.items[name])}"
+                   for name, count in packed.items() if count < knapsack.quantity(self.items[name])]
+        text = (f"Оптимально уложить {packed_count} {self.get_items_word(packed_count)}: "
+                f"{solution.weight} гр., {solution.volume:.1f} л; не поместится: {left_out}")
+        if self.goal_combo.currentData() == "priority":
+            text += f"; приоритет {solution.value}"
+        if not solution.optimal and gap is not None:
+            text += f" (приближенно, до оптимума не больше {gap:.1%})"
+        elif not solution.optimal:
+            text += " (приближенно)"
+        if partial:
+            text += f" (частично: {', '.join(partial)})"
+        if searching:
+            text += "; ищется лучше..."
+        self.set_solver_line(text)
+
+    def on_solve_failed(self, message):
+        self.stop_progress()
+        self.set_solver_line(f"Не удалось подобрать укладку: {message}")
+
+    def closeEvent(self, event):
+        # Несохраненные правки остаются в журнале и вернутся при открытии файла
+        self.journal.sync()
+        self.journal.close()
+        if self.pareto_dialog is not None:
+            self.pareto_dialog.close()
+        self.solver.shutdown()
+        self.optimizer.shutdown()
+        self.index_builder.shutdown()
+        try:
+            self.solver_cache.save()
+        except OSError:
+            pass
+        if self.catalog is not None:
+            self.catalog.close()
+        super().closeEvent(event)
+
+    def show_perf(self):
+        if self.perf_dialog is None:
+            self.perf_dialog = PerfDialog(self)
+        self.perf_dialog.show()
+        self.perf_dialog.raise_()
+    
+    def show_cache_stats(self):
+        stats = self.solver_cache.stats()
+        QMessageBox.information(
+            self,
+            "Кэш решений",
+            f"Попаданий: {stats['hits']}\n"
+            f"Промахов: {stats['misses']}\n"
+            f"Доля попаданий: {stats['hit_rate']:.0%}\n"
+            f"Записей: {stats['size']} из {stats['max_entries']}"
+        )
+
     def update_max_weight(self):
         """Обновляет максимальный вес и объем рюкзака"""
         self.update_backpack_state()
 
     def edit_item(self):
-        current_item = self.items_list.currentItem()
-        if current_item is None:
+        item_name = self.current_item_name()
+        if item_name is None:
             return
             
-        item_text = current_item.text()
-        item_name = item_text.split(" = ")[0]
         item_data = self.items[item_name]
         
-        dialog = EditItemDialog(self, item_name, item_data['вес'], item_data['объем'])
+        dialog = EditItemDialog(self, item_name, item_data['вес'], item_data['объем'],
+                                knapsack.quantity(item_data), knapsack.priority(item_data),
+                                knapsack.mandatory(item_data))
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            new_name, new_weight, new_volume = dialog.get_data()
+            new_name, new_weight, new_volume, new_count, new_priority, new_mandatory = dialog.get_data()
             
             if not new_name:
                 QMessageBox.warning(self, "Ошибка", "Название не может быть пустым!")
@@ -674,12 +1830,9 @@ class BackpackCalculator(QMainWindow):
                 QMessageBox.warning(self, "Ошибка", "Предмет с таким названием уже существует!")
                 return
             
-            # Удаляем старый предмет
-            del self.items[item_name]
-            
-            # Добавляем обновленный предмет
-            self.items[new_name] = {"вес": new_weight, "объем": new_volume}
-            current_item.setText(f"{new_name} = {new_weight} гр., {new_volume} л")
+            # Заменяем предмет, итоги пересчитываются только по нему
+            self.items.replace(item_name, new_name, knapsack.item_data(
+                new_weight, new_volume, new_count, new_priority, new_mandatory))
             self.update_backpack_state()
 
     def get_items_word(self, count):
@@ -697,20 +1850,19 @@ class BackpackCalculator(QMainWindow):
             return "предметов"
 
     def calculate_total_weight(self):
-        """Подсчитывает общий текущий вес всех предметов"""
-        return sum(item['вес'] for item in self.items.values())
+        """Возвращает общий текущий вес всех предметов"""
+        return self.items.total_weight
 
     def calculate_total_volume(self):
-        """Подсчитывает общий текущий объем всех предметов"""
-        return sum(item['объем'] for item in self.items.values())
+        """Возвращает общий текущий объем всех предметов"""
+        return self.items.total_volume
 
     def setup_context_menu(self):
         self.items_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.items_list.customContextMenuRequested.connect(self.show_context_menu)
 
     def show_context_menu(self, position):
-        current_item = self.items_list.currentItem()
-        if current_item is None:
+        if self.current_item_name() is None:
             return
             
         context_menu = QMenu(self)
@@ -727,10 +1879,63 @@ class BackpackCalculator(QMainWindow):
         elif action == delete_action:
             self.delete_item()
 
+    def finish_startup(self, file_name=None):
+        """Работа, отложенная до первой отрисовки окна"""
+        self.catalog = PresetCatalog.open_default()
+        self.available_items_model.catalog = self.catalog
+        self.update_categories()  # Кнопки категорий и предметы первой из них
+        self.rebuild_catalog_index()
+        check_first_run()
+        self.solver_cache.load()
+        if file_name:
+            self.load_file(file_name)
+
+def register_perf_probes():
+    """Горячие пути интерфейса и все решатели для замеров perf"""
+    perf.register(BackpackCalculator, "update_backpack_state")
+    perf.register(BackpackCalculator, "update_items_list")
+    perf.register(BackpackCalculator, "open_file")
+    perf.register(BackpackCalculator, "on_file_loaded")
+    perf.register(BackpackCalculator, "_save_to_file")
+    perf.register(BackpackVisualizer, "paintEvent")
+    perf.register(ParetoPlot, "paintEvent")
+    perf.register_solvers(knapsack)
+    perf.register(knapsack, "capacity_sweep")
+    perf.register_solvers(multibag)
+    perf.register(ParetoExplorer, "update")
+    perf.register(WarmStartSolver, "solve")
+    perf.register_solvers(anytime)
+    perf.register(BackpackCalculator, "show_solution")
+
+def report_startup(stages):
+    """Печатает время этапов запуска для --profile-startup"""
+    previous = STARTUP_STARTED
+    for stage, moment in stages:
+        print(f"{stage}: {(moment - previous) * 1000:.1f} мс", file=sys.stderr)
+        previous = moment
+    print(f"Время до первого окна: {(stages[-1][1] - STARTUP_STARTED) * 1000:.1f} мс", file=sys.stderr)
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    # Проверяем первый запуск перед созданием главного окна
-    check_first_run()
+    stages = [("Импорт модулей и запуск Qt", time.perf_counter())]
+    arguments = app.arguments()[1:]
+    profile_startup = "--profile-startup" in arguments
+    register_perf_probes()
+    if "--perf" in arguments:
+        perf.enable()
+    # Файл .bpc, переданный ассоциацией файлов как "%1"
+    files = [arg for arg in arguments if not arg.startswith("--")]
+    
     window = BackpackCalculator()
+    stages.append(("Создание окна", time.perf_counter()))
     window.show()
+    
+    def after_first_paint():
+        stages.append(("Первая отрисовка", time.perf_counter()))
+        if profile_startup:
+            report_startup(stages)
+        # Первый запуск, кэш и открытие файла - уже после появления окна
+        window.finish_startup(files[0] if files else None)
+    
+    QTimer.singleShot(0, after_first_paint)
     sys.exit(app.exec())
\ No newline at end of file
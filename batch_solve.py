@@ -0,0 +1,138 @@
+"""Пакетный подбор укладки для множества файлов .bpc без интерфейса.
+
+Пример:
+    python batch_solve.py expedition/ --max-weight 12 15 20 --jobs 8 -o result.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import knapsack
+from bpc_io import load_bpc
+
+# Значения по умолчанию, как в полях ввода окна программы
+DEFAULT_MAX_WEIGHT = 12  # кг
+DEFAULT_MAX_VOLUME = 40  # л
+
+CSV_FIELDS = [
+    "file", "max_weight", "max_volume", "items_total", "packed_count",
+    "packed_weight", "packed_volume", "method", "optimal", "seconds", "packed", "error",
+]
+
+
+def collect_files(paths):
+    """Раскрывает каталоги в отсортированный список файлов .bpc"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(".bpc"))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def solve_file(task):
+    """Решает все сценарии емкости для одного файла (выполняется в дочернем процессе)"""
+    file_name, weights, volumes, method = task
+    try:
+        header, items = load_bpc(file_name)
+    except Exception as e:
+        return [{"file": file_name, "error": str(e)}]
+
+    weights = weights or [header.get("max_weight", DEFAULT_MAX_WEIGHT)]
+    volumes = volumes or [header.get("max_volume", DEFAULT_MAX_VOLUME)]
+    rows = []
+    for max_weight in weights:
+        for max_volume in volumes:
+            started = time.perf_counter()
+            try:
+                solution = knapsack.solve(items, int(max_weight * 1000), max_volume, method=method)
+            except ValueError as e:
+                # Например, обязательные предметы не помещаются в эту емкость
+                rows.append({"file": file_name, "max_weight": max_weight,
+                             "max_volume": max_volume, "error": str(e)})
+                continue
+            rows.append({
+                "file": file_name,
+                "max_weight": max_weight,
+                "max_volume": max_volume,
+                "items_total": knapsack.total_count(items),
+                "packed_count": solution.total_count,
+                "packed_weight": solution.weight,
+                "packed_volume": round(solution.volume, 3),
+                "method": solution.method,
+                "optimal": solution.optimal,
+                "seconds": round(time.perf_counter() - started, 6),
+                "packed": solution.counts,
+            })
+    return rows
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        row = dict(row)
+        if "packed" in row:
+            # Число штук пишется, только если уложено больше одной, как в списке окна
+            row["packed"] = ";".join(name if count == 1 else f"{name}×{count}"
+                                     for name, count in row["packed"].items())
+        self.writer.writerow(row)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Пакетный подбор укладки рюкзаков")
+    parser.add_argument("paths", nargs="+", help="файлы .bpc или каталоги с ними")
+    parser.add_argument("--max-weight", type=float, nargs="+", metavar="КГ",
+                        help="максимальный вес рюкзака, можно несколько значений")
+    parser.add_argument("--max-volume", type=float, nargs="+", metavar="Л",
+                        help="максимальный объем рюкзака, можно несколько значений")
+    parser.add_argument("--method", choices=knapsack.METHODS, default="auto")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="число процессов (по умолчанию все ядра)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("-o", "--output", help="файл результатов (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = collect_files(args.paths)
+    if not files:
+        print("Не найдено ни одного файла .bpc", file=sys.stderr)
+        return 1
+
+    tasks = [(name, args.max_weight, args.max_volume, args.method) for name in files]
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    failed = 0
+    try:
+        writer = CsvWriter(output) if args.format == "csv" else JsonLinesWriter(output)
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            for rows in executor.map(solve_file, tasks):
+                for row in rows:
+                    failed += "error" in row
+                    writer.write(row)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Замеры производительности решателя и чтения/записи .bpc.
+
+Примеры:
+    python benchmark.py                       # все замеры
+    python benchmark.py --save-baseline       # сохранить результаты как эталон
+    python benchmark.py --compare             # сравнить с эталоном (код выхода 1 при регрессии)
+    python benchmark.py --filter solve --sizes 10 1000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import knapsack
+from bpc_io import load_bpc, save_bpc
+from inventory import Inventory
+from solver_cache import fingerprint
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+# Допустимое замедление относительно эталона
+DEFAULT_THRESHOLD = 0.25
+# Минимальное суммарное время на один замер (с)
+MIN_TIME = 0.2
+MAX_WEIGHT = 25000  # гр.
+MAX_VOLUME = 80  # л
+
+
+def make_items(count, seed=0):
+    """Синтетический список предметов в формате {"вес": int, "объем": float}"""
+    rng = random.Random(seed)
+    return {
+        f"Предмет {i:06d}": {"вес": rng.randint(10, 3000), "объем": rng.randint(1, 80) / 10}
+        for i in range(count)
+    }
+
+
+def bbc_greedy(items, max_weight):
+    """Жадный проход из исходного bbc.py: по убыванию веса, что влезает"""
+    remaining = max_weight
+    packed = []
+    for name, data in sorted(items.items(), key=lambda x: -x[1]["вес"]):
+        if data["вес"] <= remaining:
+            remaining -= data["вес"]
+            packed.append(name)
+    return packed
+
+
+def case_greedy(items):
+    return lambda: bbc_greedy(items, MAX_WEIGHT)
+
+
+def case_solve(method):
+    def factory(items):
+        return lambda: knapsack.solve(items, MAX_WEIGHT, MAX_VOLUME, method=method)
+    return factory
+
+
+def case_solve_dp(items):
+    """ДП на огрубленных данных (100 г, 1 л): на граммах таблица слишком велика"""
+    coarse = {
+        name: {"вес": -(-data["вес"] // 100) * 100, "объем": float(-(-data["объем"] // 1))}
+        for name, data in items.items()
+    }
+    return lambda: knapsack.solve(coarse, MAX_WEIGHT, MAX_VOLUME, method="dp")
+
+
+def case_json_roundtrip(binary):
+    def factory(items):
+        fd, file_name = tempfile.mkstemp(suffix=".bpc")
+        os.close(fd)
+
+        def run():
+            save_bpc(file_name, MAX_WEIGHT // 1000, MAX_VOLUME, items, binary=binary)
+            load_bpc(file_name)
+        run.cleanup = lambda: os.remove(file_name)
+        return run
+    return factory
+
+
+def case_update_state(items):
+    """То же, что update_backpack_state без окна: правка, итоги, ключ кэша, решение"""
+    inventory = Inventory(items)
+    name = next(iter(items))
+    state = {"weight": items[name]["вес"]}
+
+    def run():
+        state["weight"] = state["weight"] % 3000 + 1
+        inventory.replace(name, name, {"вес": state["weight"], "объем": items[name]["объем"]})
+        total_weight = inventory.total_weight
+        total_volume = inventory.total_volume
+        if total_weight > MAX_WEIGHT or total_volume > MAX_VOLUME:
+            snapshot = inventory.snapshot()
+            fingerprint(snapshot, MAX_WEIGHT, MAX_VOLUME)
+            knapsack.solve(snapshot, MAX_WEIGHT, MAX_VOLUME)
+    return run
+
+
+# Название замера -> (фабрика функции, наибольший размер списка, для которого он имеет смысл)
+CASES = {
+    "greedy_bbc": (case_greedy, 100000),
+    "solve_greedy": (case_solve("greedy"), 100000),
+    "solve_auto": (case_solve("auto"), 10000),
+    "solve_bnb": (case_solve("bnb"), 10000),
+    "solve_dp": (case_solve_dp, 100),
+    "io_json": (case_json_roundtrip(False), 100000),
+    "io_binary": (case_json_roundtrip(True), 100000),
+    "update_state": (case_update_state, 10000),
+}
+
+
+def measure(function, min_time=MIN_TIME, min_repeats=3):
+    """Медиана времени одного вызова"""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_repeats or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - t0)
+        if len(timings) >= 1000:
+            break
+    return statistics.median(timings)
+
+
+def run_benchmarks(sizes, name_filter=None, min_time=MIN_TIME):
+    results = {}
+    for size in sizes:
+        items = make_items(size)
+        for name, (factory, max_size) in CASES.items():
+            if size > max_size or (name_filter and name_filter not in name):
+                continue
+            function = factory(items)
+            try:
+                seconds = measure(function, min_time)
+            finally:
+                cleanup = getattr(function, "cleanup", None)
+                if cleanup is not None:
+                    cleanup()
+            key = f"{name}[{size}]"
+            results[key] = seconds
+            print(f"{key:<24} {seconds * 1000:12.3f} мс", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Возвращает список регрессий (ключ, эталон, текущее значение)"""
+    regressions = []
+    for key, seconds in results.items():
+        reference = baseline.get(key)
+        if reference is not None and seconds > reference * (1 + threshold):
+            regressions.append((key, reference, seconds))
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Замеры производительности Калькулятора рюкзака")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--filter", help="запускать только замеры, содержащие подстроку")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="файл эталона")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как эталон")
+    parser.add_argument("--compare", action="store_true", help="сравнить результаты с эталоном")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="допустимое замедление, доля (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.sizes, args.filter, args.min_time)
+
+    if args.compare:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, reference, seconds in regressions:
+            print(f"РЕГРЕССИЯ {key}: {reference * 1000:.3f} мс -> {seconds * 1000:.3f} мс "
+                  f"(+{(seconds / reference - 1):.0%})")
+        if regressions:
+            return 1
+        print("Регрессий нет")
+
+    if args.save_baseline:
+        # Дополняем эталон, чтобы частичный запуск не стирал остальные замеры
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as file:
+                baseline = json.load(file)["results"]
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"python": sys.version.split()[0], "results": baseline}, file, indent=4)
+        print(f"Эталон сохранен в {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
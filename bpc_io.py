@@ -0,0 +1,484 @@
+"""Чтение и запись файлов рюкзака (.bpc).
+
+Поддерживаются оба варианта JSON: текущий {"max_weight", "max_volume",
+"items"} и старый, где файл целиком является словарем предметов, а также
+компактный двоичный вариант для больших каталогов.
+"""
+import codecs
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from contextlib import contextmanager
+
+from knapsack import (MANDATORY_KEY, PRIORITY_KEY, QUANTITY_KEY, VOLUME_KEY, WEIGHT_KEY, mandatory,
+                      numpy_module, priority, quantity)
+
+# Размер блока, читаемого из файла за раз (байт)
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"\s*")
+# Символы, которыми может продолжаться число JSON
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+_DECODER = json.JSONDecoder()
+
+
+class BpcFormatError(ValueError):
+    """Файл не является файлом рюкзака"""
+
+
+class _JsonStream:
+    """Текстовый буфер над бинарным файлом с пошаговым разбором JSON"""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        if chunk:
+            text = self.decoder.decode(chunk)
+        else:
+            text = self.decoder.decode(b"", final=True)
+            self.eof = True
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+
+    def peek(self):
+        """Пропускает пробелы и возвращает следующий символ ('' в конце файла)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise BpcFormatError(f"Ожидался символ {char!r}, найден {found or 'конец файла'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Разбирает одно JSON-значение, дочитывая файл при необходимости"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            # Число на границе блока могло оборваться, в том числе сразу после
+            # "." или "e" ("1." разбирается как 1): пока за ним до конца буфера
+            # идут только символы числа, дочитываем и повторяем
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and _NUMBER_TAIL.match(self.buf, end).end() == len(self.buf)):
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def separator(self, closing):
+        """Читает ',' или закрывающую скобку; возвращает True, если объект закончился"""
+        char = self.peek()
+        if char == ",":
+            self.pos += 1
+            return False
+        if char == closing:
+            self.pos += 1
+            return True
+        raise BpcFormatError(f"Ожидался символ ',' или {closing!r}, найден {char or 'конец файла'!r}")
+
+
+class BpcStreamReader:
+    """Потоковое чтение .bpc: предметы выдаются по одному при итерации.
+
+    Поля верхнего уровня (max_weight, max_volume и др.) накапливаются
+    в header по мере чтения. Для файлов старого формата header остается
+    пустым, а legacy становится True.
+    """
+
+    def __init__(self, file_name, chunk_size=CHUNK_SIZE):
+        self.file_name = file_name
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(file_name)
+        self.header = {}
+        self.legacy = False
+        self._stream = None
+
+    @property
+    def bytes_read(self):
+        return self._stream.bytes_read if self._stream is not None else 0
+
+    @property
+    def progress(self):
+        """Доля прочитанного файла от 0.0 до 1.0"""
+        return min(self.bytes_read / self.size, 1.0) if self.size else 1.0
+
+    def has_limits(self):
+        """Есть ли в файле максимальный вес и объем (текущий формат)"""
+        return "max_weight" in self.header and "max_volume" in self.header
+
+    def __iter__(self):
+        with open(self.file_name, "rb") as file:
+            self._stream = stream = _JsonStream(file, self.chunk_size)
+            stream.expect("{")
+            if stream.peek() == "}":
+                return
+            while True:
+                key = stream.value()
+                if not isinstance(key, str):
+                    raise BpcFormatError("Неверный ключ в файле")
+                stream.expect(":")
+                if key == "items" and not self.legacy and stream.peek() == "{":
+                    yield from self._iter_items_object(stream)
+                else:
+                    value = stream.value()
+                    if isinstance(value, dict) and WEIGHT_KEY in value:
+                        self.legacy = True
+                        yield key, value
+                    else:
+                        self.header[key] = value
+                if stream.separator("}"):
+                    break
+            if stream.peek():
+                raise BpcFormatError("Лишние данные в конце файла")
+
+    def close(self):
+        """Файл закрывается по окончании итерации; метод для единообразия с BinaryBpcReader"""
+
+    def _iter_items_object(self, stream):
+        stream.expect("{")
+        if stream.peek() == "}":
+            stream.pos += 1
+            return
+        while True:
+            name = stream.value()
+            stream.expect(":")
+            data = stream.value()
+            if not isinstance(data, dict):
+                # Это был предмет старого формата с названием "items"
+                yield "items", self._finish_legacy_item(stream, name, data)
+                self.legacy = True
+                return
+            yield name, data
+            if stream.separator("}"):
+                return
+
+    def _finish_legacy_item(self, stream, first_key, first_value):
+        item = {first_key: first_value}
+        while not stream.separator("}"):
+            key = stream.value()
+            stream.expect(":")
+            item[key] = stream.value()
+        return item
+
+
+# Двоичный формат: заголовок, смещения имен (uint32[count + 1]),
+# веса (int32[count]), объемы (float32[count]), с версии 2 - количества
+# (uint32[count]), с версии 3 - приоритеты (int32[count]) и флаги предметов
+# (uint32[count], ITEM_MANDATORY), и строки имен в UTF-8.
+# Все числа little-endian, столбцы выровнены на 4 байта.
+# С флагом FLAG_BAGS после имен идет uint32 длины и JSON списка рюкзаков.
+BINARY_MAGIC = b"BPCB"
+BINARY_VERSION = 3
+# Файл пишется в самой младшей версии, вмещающей его данные, чтобы его
+# могли прочитать и прежние версии программы
+QUANTITIES_VERSION = 2
+PRIORITIES_VERSION = 3
+ITEM_MANDATORY = 1
+FLAG_BAGS = 1
+_BINARY_HEADER = struct.Struct("<4sHHIiiI")
+_BAGS_SIZE = struct.Struct("<I")
+# Точность, до которой округляется объем из float32
+VOLUME_DIGITS = 3
+_INT32_MAX = 2 ** 31 - 1
+
+
+def _little_endian_column(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _file_mode(file_name):
+    try:
+        return os.stat(file_name).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextmanager
+def atomic_write(file_name, mode="wb", encoding=None):
+    """Пишет во временный файл рядом с file_name и подменяет его целиком.
+
+    При сбое посреди записи прежний файл остается нетронутым.
+    """
+    directory = os.path.dirname(os.path.abspath(file_name))
+    fd, temp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp создает файл только для владельца - возвращаем обычные права
+        os.chmod(temp_name, _file_mode(file_name))
+        with os.fdopen(fd, mode, encoding=encoding) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_name, file_name)
+    except BaseException:
+        try:
+            os.remove(temp_name)
+        except OSError:
+            pass
+        raise
+
+
+def binary_loss(items):
+    """Описание первого предмета, данные которого двоичный формат не
+    сохранит без потерь, или None, если все сохранится"""
+    known = (WEIGHT_KEY, VOLUME_KEY, QUANTITY_KEY, PRIORITY_KEY, MANDATORY_KEY)
+    for name, data in items.items():
+        weight = data[WEIGHT_KEY]
+        if not float(weight).is_integer() or abs(weight) > _INT32_MAX:
+            return f"{name}: вес {weight} не целый"
+        volume = data.get(VOLUME_KEY, 0)
+        if round(array("f", [volume])[0], VOLUME_DIGITS) != volume:
+            return f"{name}: объем {volume} не хранится с точностью {VOLUME_DIGITS} знака"
+        extra = [key for key in data if key not in known]
+        if extra:
+            return f"{name}: поля {', '.join(map(str, extra))} не хранятся"
+    return None
+
+
+def save_bpc_binary(file_name, max_weight, max_volume, items, bags=None):
+    """Записывает предметы в двоичный .bpc; если данные сохранятся не без
+    потерь (см. binary_loss) - ValueError, файл не трогается.
+    Предмет без объема записывается с объемом 0."""
+    loss = binary_loss(items)
+    if loss is not None:
+        raise ValueError(f"Двоичный формат не подходит: {loss}")
+    names = list(items)
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = [0]
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    weights = _little_endian_column("i", (int(items[name][WEIGHT_KEY]) for name in names))
+    volumes = _little_endian_column("f", (items[name].get(VOLUME_KEY, 0) for name in names))
+    quantities = [quantity(items[name]) for name in names]
+    priorities = [priority(items[name]) for name in names]
+    item_flags = [ITEM_MANDATORY if mandatory(items[name]) else 0 for name in names]
+    if any(value != 1 for value in priorities) or any(item_flags):
+        version = PRIORITIES_VERSION
+    elif any(count != 1 for count in quantities):
+        version = QUANTITIES_VERSION
+    else:
+        version = 1
+    flags = FLAG_BAGS if bags else 0
+    with atomic_write(file_name) as file:
+        file.write(_BINARY_HEADER.pack(BINARY_MAGIC, version, flags, len(names),
+                                       int(max_weight), int(max_volume), offsets[-1]))
+        file.write(_little_endian_column("I", offsets).tobytes())
+        file.write(weights.tobytes())
+        file.write(volumes.tobytes())
+        if version >= QUANTITIES_VERSION:
+            file.write(_little_endian_column("I", quantities).tobytes())
+        if version >= PRIORITIES_VERSION:
+            file.write(_little_endian_column("i", priorities).tobytes())
+            file.write(_little_endian_column("I", item_flags).tobytes())
+        file.write(b"".join(encoded))
+        if bags:
+            raw = json.dumps(bags, ensure_ascii=False).encode("utf-8")
+            file.write(_BAGS_SIZE.pack(len(raw)))
+            file.write(raw)
+
+
+def save_bpc(file_name, max_weight, max_volume, items, binary=False, bags=None):
+    """Сохраняет рюкзак в JSON (по умолчанию) или в двоичный формат.
+
+    bags - необязательный список рюкзаков участников
+    [{"name", "max_weight", "max_volume"}], вес в кг, как max_weight.
+    Если двоичный формат потерял бы часть данных (binary_loss), файл
+    пишется в JSON: загрузка определяет формат по содержимому.
+    """
+    if binary and binary_loss(items) is None:
+        save_bpc_binary(file_name, max_weight, max_volume, items, bags)
+        return
+    data = {
+        "max_weight": max_weight,
+        "max_volume": max_volume,
+    }
+    if bags:
+        data["bags"] = bags
+    data["items"] = dict(items)
+    with atomic_write(file_name, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=4)
+
+
+def is_binary_bpc(file_name):
+    with open(file_name, "rb") as file:
+        return file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+class BinaryBpcReader:
+    """Чтение двоичного .bpc через mmap.
+
+    Столбцы weights, volumes, quantities, priorities и flags (None, если
+    в этой версии файла их нет) - представления прямо над отображенным
+    файлом без копирования (массивы NumPy, если он установлен, иначе
+    memoryview). Имена декодируются только при обращении к ним.
+    Итерация выдает пары (название, данные), как BpcStreamReader.
+    """
+
+    legacy = False
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, "rb") as file:
+            self.size = os.fstat(file.fileno()).st_size
+            if self.size < _BINARY_HEADER.size:
+                raise BpcFormatError("Файл слишком короткий")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, flags, count, max_weight, max_volume,
+         names_size) = _BINARY_HEADER.unpack_from(self._mmap, 0)
+        if magic != BINARY_MAGIC:
+            raise BpcFormatError("Это не двоичный файл рюкзака")
+        if version > BINARY_VERSION:
+            raise BpcFormatError(f"Неподдерживаемая версия файла: {version}")
+        self.count = count
+        self.header = {"max_weight": max_weight, "max_volume": max_volume}
+
+        offsets_at = _BINARY_HEADER.size
+        weights_at = offsets_at + 4 * (count + 1)
+        volumes_at = weights_at + 4 * count
+        quantities_at = volumes_at + 4 * count
+        priorities_at = quantities_at + 4 * count
+        flags_at = priorities_at + 4 * count
+        self._names_at = quantities_at
+        if version >= QUANTITIES_VERSION:
+            self._names_at += 4 * count
+        if version >= PRIORITIES_VERSION:
+            self._names_at += 8 * count
+        if self._names_at + names_size > self.size:
+            raise BpcFormatError("Файл поврежден: данные обрезаны")
+        if flags & FLAG_BAGS:
+            self.header["bags"] = self._read_bags(self._names_at + names_size)
+        self.offsets = self._column("<u4", "I", offsets_at, count + 1)
+        self.weights = self._column("<i4", "i", weights_at, count)
+        self.volumes = self._column("<f4", "f", volumes_at, count)
+        self.quantities = self.priorities = self.flags = None
+        if version >= QUANTITIES_VERSION:
+            self.quantities = self._column("<u4", "I", quantities_at, count)
+        if version >= PRIORITIES_VERSION:
+            self.priorities = self._column("<i4", "i", priorities_at, count)
+            self.flags = self._column("<u4", "I", flags_at, count)
+        self._done = 0
+
+    def _column(self, dtype, typecode, offset, count):
+        # Без NumPy столбцы читаются через memoryview
+        np = numpy_module()
+        if np is not None:
+            return np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+        view = memoryview(self._mmap)[offset:offset + 4 * count]
+        if sys.byteorder == "big":
+            column = array(typecode, view)
+            column.byteswap()
+            return column
+        return view.cast(typecode)
+
+    def _read_bags(self, offset):
+        if offset + _BAGS_SIZE.size > self.size:
+            raise BpcFormatError("Файл поврежден: нет списка рюкзаков")
+        size, = _BAGS_SIZE.unpack_from(self._mmap, offset)
+        start = offset + _BAGS_SIZE.size
+        if start + size > self.size:
+            raise BpcFormatError("Файл поврежден: список рюкзаков обрезан")
+        return json.loads(self._mmap[start:start + size].decode("utf-8"))
+
+    def name(self, i):
+        start = self._names_at + int(self.offsets[i])
+        end = self._names_at + int(self.offsets[i + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def has_limits(self):
+        return True
+
+    @property
+    def progress(self):
+        return self._done / self.count if self.count else 1.0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        names = self._mmap[self._names_at:self._names_at + int(self.offsets[self.count])]
+        offsets = self.offsets.tolist()
+        weights = self.weights.tolist()
+        volumes = self.volumes.tolist()
+        quantities = self.quantities.tolist() if self.quantities is not None else None
+        priorities = self.priorities.tolist() if self.priorities is not None else None
+        flags = self.flags.tolist() if self.flags is not None else None
+        for i in range(self.count):
+            self._done = i + 1
+            data = {
+                WEIGHT_KEY: weights[i],
+                VOLUME_KEY: round(volumes[i], VOLUME_DIGITS),
+            }
+            if quantities is not None and quantities[i] != 1:
+                data[QUANTITY_KEY] = quantities[i]
+            if priorities is not None and priorities[i] != 1:
+                data[PRIORITY_KEY] = priorities[i]
+            if flags is not None and flags[i] & ITEM_MANDATORY:
+                data[MANDATORY_KEY] = True
+            yield names[offsets[i]:offsets[i + 1]].decode("utf-8"), data
+
+    def close(self):
+        """Освобождает представления и mmap"""
+        for column in (self.offsets, self.weights, self.volumes, self.quantities,
+                       self.priorities, self.flags):
+            if isinstance(column, memoryview):
+                column.release()
+        self.offsets = self.weights = self.volumes = self.quantities = None
+        self.priorities = self.flags = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Снаружи еще живут массивы NumPy над файлом - mmap закроет сборщик мусора
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_bpc_reader(file_name):
+    """Возвращает читатель, подходящий под формат файла"""
+    if is_binary_bpc(file_name):
+        return BinaryBpcReader(file_name)
+    return BpcStreamReader(file_name)
+
+
+def load_bpc(file_name):
+    """Читает файл целиком и возвращает (header, items)"""
+    reader = open_bpc_reader(file_name)
+    try:
+        items = dict(reader)
+    finally:
+        reader.close()
+    return reader.header, items
@@ -0,0 +1,73 @@
+"""Загрузка .bpc по частям в цикле событий Qt."""
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from bpc_io import BinaryBpcReader, open_bpc_reader
+
+# Сколько времени один шаг загрузки может занимать поток интерфейса (с)
+SLICE_SECONDS = 0.01
+# Как часто внутри шага проверять, не вышло ли время
+CHECK_EVERY = 256
+
+
+class BpcLoader(QObject):
+    """Читает файл потоково и отдает предметы пачками.
+
+    Формат (JSON или двоичный) определяется по первым байтам файла.
+
+    Каждый шаг выполняется по таймеру и укладывается в SLICE_SECONDS,
+    поэтому окно остается отзывчивым даже на очень больших файлах.
+    """
+    batch_loaded = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_name, parent=None):
+        super().__init__(parent)
+        self.reader = open_bpc_reader(file_name)
+        self.binary = isinstance(self.reader, BinaryBpcReader)
+        self._items = iter(self.reader)
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._step)
+        self._cancelled = False
+
+    def start(self):
+        self.timer.start()
+
+    def cancel(self):
+        """Останавливает загрузку; после этого сигналы больше не приходят
+        (отменить можно и из обработчика batch_loaded)"""
+        self._cancelled = True
+        self.timer.stop()
+        self._items.close()
+        self.reader.close()
+
+    def _step(self):
+        deadline = time.perf_counter() + SLICE_SECONDS
+        batch = []
+        done = True
+        try:
+            for pair in self._items:
+                batch.append(pair)
+                if len(batch) % CHECK_EVERY == 0 and time.perf_counter() > deadline:
+                    done = False
+                    break
+        except Exception as e:
+            self.timer.stop()
+            self.reader.close()
+            self.failed.emit(str(e))
+            return
+        if batch:
+            self.batch_loaded.emit(batch)
+            if self._cancelled:
+                return
+        self.progress.emit(int(self.reader.progress * 100))
+        if self._cancelled:
+            return
+        if done:
+            self.timer.stop()
+            self.reader.close()
+            self.finished.emit(self.reader)
@@ -0,0 +1,169 @@
+"""Каталог готового снаряжения в SQLite с индексами и постраничными запросами.
+
+Пример импорта большого каталога:
+    python catalog.py import products.csv
+"""
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+from knapsack import VOLUME_KEY, WEIGHT_KEY, item_data, quantity
+
+PAGE_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL REFERENCES categories(name),
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    weight INTEGER NOT NULL,
+    volume REAL NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (category, name)
+);
+CREATE INDEX IF NOT EXISTS items_by_category ON items (category);
+CREATE INDEX IF NOT EXISTS items_by_name ON items (name_key);
+CREATE INDEX IF NOT EXISTS items_by_category_name ON items (category, name_key);
+CREATE INDEX IF NOT EXISTS items_by_weight ON items (weight);
+"""
+
+
+def default_catalog_file():
+    """Каталог лежит рядом с settings.json"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets.db")
+
+
+def name_key(name):
+    """Ключ для поиска без учета регистра; ё и е считаются одной буквой"""
+    return name.casefold().replace("ё", "е")
+
+
+class PresetCatalog:
+    """Каталог предметов по категориям.
+
+    Все выборки идут через индексы: по категории, по началу названия
+    и по диапазону веса, поэтому время запроса страницы не зависит от
+    размера каталога.
+    """
+
+    def __init__(self, file_name=":memory:"):
+        self.file_name = file_name
+        self.conn = sqlite3.connect(file_name)
+        self.conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(items)")]
+        if "quantity" not in columns:
+            # Каталог, созданный до появления количеств
+            with self.conn:
+                self.conn.execute("ALTER TABLE items ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1")
+
+    @classmethod
+    def open_default(cls, file_name=None):
+        """Открывает каталог программы, при первом запуске заполняя его встроенными наборами"""
+        catalog = cls(file_name or default_catalog_file())
+        if not catalog.categories():
+            from presets import PRESET_ITEMS
+            catalog.import_items(PRESET_ITEMS)
+        return catalog
+
+    def close(self):
+        self.conn.close()
+
+    def categories(self):
+        rows = self.conn.execute("SELECT name FROM categories ORDER BY position")
+        return [name for name, in rows]
+
+    def import_items(self, catalog):
+        """Добавляет {категория: {название: данные}}; существующие предметы обновляются"""
+        with self.conn:
+            position = self.conn.execute("SELECT COALESCE(MAX(position), -1) FROM categories").fetchone()[0]
+            for category, items in catalog.items():
+                if self.conn.execute("SELECT 1 FROM categories WHERE name = ?", (category,)).fetchone() is None:
+                    position += 1
+                    self.conn.execute("INSERT INTO categories (name, position) VALUES (?, ?)",
+                                      (category, position))
+                self.conn.executemany(
+                    "INSERT INTO items (category, name, name_key, weight, volume, quantity) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (category, name) DO UPDATE SET weight = excluded.weight, "
+                    "volume = excluded.volume, quantity = excluded.quantity",
+                    ((category, name, name_key(name), data[WEIGHT_KEY], data[VOLUME_KEY], quantity(data))
+                     for name, data in items.items())
+                )
+
+    def _where(self, category, prefix, min_weight, max_weight):
+        conditions = []
+        params = []
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        if prefix:
+            # Диапазон вместо LIKE, чтобы SQLite использовал индекс по name_key
+            key = name_key(prefix)
+            conditions.append("name_key >= ? AND name_key < ?")
+            params.extend((key, key + "\U0010ffff"))
+        if min_weight is not None:
+            conditions.append("weight >= ?")
+            params.append(min_weight)
+        if max_weight is not None:
+            conditions.append("weight <= ?")
+            params.append(max_weight)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where, params
+
+    def query(self, category=None, prefix=None, min_weight=None, max_weight=None,
+              offset=0, limit=PAGE_SIZE):
+        """Страница предметов [(название, данные)]; внутри категории - в порядке добавления"""
+        where, params = self._where(category, prefix, min_weight, max_weight)
+        order = "name_key" if prefix else "id"
+        rows = self.conn.execute(
+            f"SELECT name, weight, volume, quantity FROM items{where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        )
+        return [(name, item_data(weight, volume, count)) for name, weight, volume, count in rows]
+
+    def count(self, category=None, prefix=None, min_weight=None, max_weight=None):
+        where, params = self._where(category, prefix, min_weight, max_weight)
+        return self.conn.execute(f"SELECT COUNT(*) FROM items{where}", params).fetchone()[0]
+
+    def iter_all(self):
+        """Все предметы каталога: (категория, название, данные)"""
+        rows = self.conn.execute("SELECT category, name, weight, volume, quantity FROM items ORDER BY id")
+        for category, name, weight, volume, count in rows:
+            yield category, name, item_data(weight, volume, count)
+
+
+def read_catalog_file(file_name):
+    """Читает каталог из JSON {категория: {название: данные}} или CSV
+    со столбцами category, name, weight, volume и необязательным quantity"""
+    if file_name.lower().endswith(".csv"):
+        catalog = {}
+        with open(file_name, "r", encoding="utf-8-sig", newline="") as file:
+            for row in csv.DictReader(file):
+                catalog.setdefault(row["category"], {})[row["name"]] = item_data(
+                    int(row["weight"]), float(row["volume"]), int(row.get("quantity") or 1))
+        return catalog
+    with open(file_name, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] != "import":
+        print("Использование: python catalog.py import <файл.json|файл.csv>", file=sys.stderr)
+        return 2
+    catalog = PresetCatalog.open_default()
+    catalog.import_items(read_catalog_file(argv[1]))
+    print(f"В каталоге {catalog.count()} предметов")
+    catalog.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Список предметов рюкзака с инкрементально обновляемыми итогами."""
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+
+from item_store import ItemStore
+from knapsack import VOLUME_KEY, VOLUME_SCALE, WEIGHT_KEY, quantity, volume_units
+
+
+class Inventory(MutableMapping):
+    """Словарь предметов {название: {"вес": ..., "объем": ...}}.
+
+    Вместе со словарем поддерживаются суммарный вес, суммарный объем,
+    число предметов с учетом поля "количество" и индекс предметов по
+    убыванию веса, поэтому добавление, удаление и изменение предмета не
+    требуют пересчета итогов по всему списку. Позиция в индексе ищется
+    бинарным поиском за O(log n), но вставка и удаление в списке индекса
+    сдвигают его хвост - O(n), хотя это одно быстрое копирование памяти.
+
+    Подписчики (subscribe) получают события после каждого изменения:
+    ("add", name, data), ("remove", name, data),
+    ("replace", old_name, new_name, old_data, new_data), ("extend", pairs)
+    и ("reset", previous_state).
+
+    clear, load и restore не меняют старые структуры, а заменяют их
+    новыми, поэтому previous_state - это прежнее содержимое целиком,
+    полученное за O(1); его можно вернуть через restore.
+
+    Предметы лежат в колоночном ItemStore. inventory[name], items(),
+    snapshot() и данные в событиях - обычные словари, которые не зависят
+    от дальнейших изменений; row(name) дает легкое представление строки
+    без копирования для частого чтения (отрисовка списка).
+    """
+
+    def __init__(self, items=None):
+        self._items = ItemStore()
+        self._index = []
+        self._total_weight = 0
+        self._total_volume = 0  # в децилитрах, чтобы суммы не накапливали ошибку
+        self._total_count = 0
+        self._listeners = []
+        if items:
+            self.load(items)
+
+    # Подписка на изменения
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    def _notify(self, *event):
+        for listener in self._listeners:
+            listener(*event)
+
+    # Интерфейс словаря
+
+    def __getitem__(self, name):
+        return self._items.get_dict(name)
+
+    def row(self, name):
+        """Представление ItemRow; действительно до следующего изменения"""
+        return self._items.row(name)
+
+    def __setitem__(self, name, data):
+        if name in self._items:
+            self.replace(name, name, data)
+        else:
+            self.add(name, data)
+
+    def __delitem__(self, name):
+        self.remove(name)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, name):
+        return name in self._items
+
+    # Изменения
+
+    def add(self, name, data):
+        """Добавляет новый предмет; повторное название - KeyError"""
+        if name in self._items:
+            raise KeyError(name)
+        self._items.add(name, data)
+        self._account(name, data, 1)
+        self._notify("add", name, data)
+
+    def remove(self, name):
+        """Удаляет предмет и возвращает его данные"""
+        data = self._items.remove(name)
+        self._account(name, data, -1)
+        self._notify("remove", name, data)
+        return data
+
+    def replace(self, old_name, new_name, data):
+        """Заменяет предмет old_name на new_name с новыми данными"""
+        if new_name != old_name and new_name in self._items:
+            raise KeyError(new_name)
+        if new_name == old_name:
+            old_data = self._items.get_dict(old_name)
+            self._items.set(old_name, data)
+        else:
+            old_data = self._items.remove(old_name)
+            self._items.add(new_name, data)
+        self._account(old_name, old_data, -1)
+        self._account(new_name, data, 1)
+        self._notify("replace", old_name, new_name, old_data, data)
+
+    def extend(self, pairs):
+        """Добавляет пачку новых предметов; индекс досортировывается один раз"""
+        pairs = list(pairs)
+        names = {name for name, _ in pairs}
+        if len(names) != len(pairs):
+            raise KeyError("Повторяющиеся названия в пачке")
+        for name in names:
+            if name in self._items:
+                raise KeyError(name)
+        self._items.extend(pairs)
+        self._index.extend((-data[WEIGHT_KEY], name) for name, data in pairs)
+        self._index.sort()
+        for _, data in pairs:
+            count = quantity(data)
+            self._total_weight += count * data[WEIGHT_KEY]
+            self._total_volume += count * volume_units(data.get(VOLUME_KEY, 0))
+            self._total_count += count
+        self._notify("extend", pairs)
+
+    def clear(self):
+        previous = self._state()
+        self._items = ItemStore()
+        self._index = []
+        self._total_weight = 0
+        self._total_volume = 0
+        self._total_count = 0
+        self._notify("reset", previous)
+
+    def load(self, items):
+        """Заменяет содержимое целиком; индекс строится одной сортировкой"""
+        previous = self._state()
+        # Повторное название заменяет прежние данные, как при dict(items)
+        items = dict(items)
+        self._items = ItemStore(items.items())
+        self._index = sorted((-data[WEIGHT_KEY], name) for name, data in items.items())
+        self._total_weight = self._items.total_weight()
+        self._total_volume = self._items.total_volume_units()
+        self._total_count = self._items.total_count()
+        self._notify("reset", previous)
+
+    def restore(self, state):
+        """Возвращает содержимое из previous_state события reset; возвращает текущее"""
+        previous = self._state()
+        (self._items, self._index, self._total_weight, self._total_volume,
+         self._total_count) = state
+        self._notify("reset", previous)
+        return previous
+
+    def _state(self):
+        return self._items, self._index, self._total_weight, self._total_volume, self._total_count
+
+    def _account(self, name, data, sign):
+        key = (-data[WEIGHT_KEY], name)
+        if sign > 0:
+            insort(self._index, key)
+        else:
+            del self._index[bisect_left(self._index, key)]
+        count = sign * quantity(data)
+        self._total_weight += count * data[WEIGHT_KEY]
+        self._total_volume += count * volume_units(data.get(VOLUME_KEY, 0))
+        self._total_count += count
+
+    # Итоги и выборки
+
+    @property
+    def total_weight(self):
+        return self._total_weight
+
+    @property
+    def total_volume(self):
+        return self._total_volume / VOLUME_SCALE
+
+    @property
+    def total_count(self):
+        """Число предметов с учетом количества в каждой строке"""
+        return self._total_count
+
+    def sorted_names(self):
+        """Названия предметов по убыванию веса"""
+        return [name for _, name in self._index]
+
+    def snapshot(self):
+        """Копия словарями для передачи в фоновые задачи"""
+        return {row.name: row.to_dict() for row in self._items.rows()}
+
+    def to_dict(self):
+        return self.snapshot()
@@ -0,0 +1,227 @@
+"""Модели Qt для списков предметов."""
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt
+from PyQt6.QtGui import QColor
+
+from catalog import PAGE_SIZE
+from knapsack import VOLUME_KEY, WEIGHT_KEY, mandatory, priority, quantity
+
+NameRole = Qt.ItemDataRole.UserRole + 1
+WeightRole = Qt.ItemDataRole.UserRole + 2
+VolumeRole = Qt.ItemDataRole.UserRole + 3
+DataRole = Qt.ItemDataRole.UserRole + 4
+PriorityRole = Qt.ItemDataRole.UserRole + 5
+
+# Цвет предметов, которые не попали в оптимальную укладку
+EXCLUDED_COLOR = QColor(150, 150, 150)
+
+
+def counted_name(name, count):
+    """Название с числом штук, если их больше одной"""
+    return f"{name} ×{count}" if count != 1 else name
+
+
+def item_notes(data):
+    """Пометки о приоритете и обязательности для строки списка"""
+    notes = ""
+    if priority(data) != 1:
+        notes += f", приоритет {priority(data)}"
+    if mandatory(data):
+        notes += ", обязательный"
+    return notes
+
+
+def item_role_data(name, data, role):
+    """Общие структурные роли для строк с предметами"""
+    if role == NameRole:
+        return name
+    if role == WeightRole:
+        return data[WEIGHT_KEY]
+    if role == VolumeRole:
+        return data[VOLUME_KEY]
+    if role == DataRole:
+        return data
+    if role == PriorityRole:
+        return priority(data)
+    return None
+
+
+class InventoryListModel(QAbstractListModel):
+    """Список добавленных предметов поверх Inventory.
+
+    Модель хранит только порядок названий, данные берутся из Inventory
+    по ключу. Изменения приходят подпиской на события Inventory, поэтому
+    в модель не нужно ничего добавлять вручную. Строка удаляемого или
+    измененного предмета ищется в списке названий - O(n).
+    """
+
+    def __init__(self, inventory, parent=None):
+        super().__init__(parent)
+        self.inventory = inventory
+        self._names = list(inventory)
+        self._excluded = frozenset()
+        inventory.subscribe(self._on_inventory_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self._names[index.row()]
+        if role == DataRole:
+            return self.inventory[name]
+        # Представление строки без копирования: отрисовка спрашивает данные часто
+        data = self.inventory.row(name)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return (f"{counted_name(name, quantity(data))} = {data[WEIGHT_KEY]} гр., "
+                    f"{data[VOLUME_KEY]} л{item_notes(data)}")
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return EXCLUDED_COLOR if name in self._excluded else None
+        return item_role_data(name, data, role)
+
+    def name_at(self, row):
+        return self._names[row]
+
+    def index_of(self, name):
+        try:
+            return self.index(self._names.index(name))
+        except ValueError:
+            return QModelIndex()
+
+    def set_excluded(self, names):
+        """Помечает предметы, не вошедшие в оптимальную укладку"""
+        names = frozenset(names)
+        if names == self._excluded:
+            return
+        self._excluded = names
+        if self._names:
+            self.dataChanged.emit(self.index(0), self.index(len(self._names) - 1),
+                                  [Qt.ItemDataRole.ForegroundRole])
+
+    def _on_inventory_changed(self, event, *args):
+        if event == "add":
+            row = len(self._names)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._names.append(args[0])
+            self.endInsertRows()
+        elif event == "extend":
+            pairs = args[0]
+            if not pairs:
+                return
+            row = len(self._names)
+            self.beginInsertRows(QModelIndex(), row, row + len(pairs) - 1)
+            self._names.extend(name for name, _ in pairs)
+            self.endInsertRows()
+        elif event == "remove":
+            row = self._names.index(args[0])
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._names[row]
+            self.endRemoveRows()
+        elif event == "replace":
+            row = self._names.index(args[0])
+            self._names[row] = args[1]
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        elif event == "reset":
+            self.beginResetModel()
+            self._names = list(self.inventory)
+            self._excluded = frozenset()
+            self.endResetModel()
+
+
+class PresetListModel(QAbstractListModel):
+    """Список готовых предметов для выбора: строки (название, данные)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._packed = ()
+
+    def set_rows(self, rows, packed=()):
+        """packed - контейнер названий, уже лежащих в рюкзаке (например, Inventory)"""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._packed = packed
+        self.endResetModel()
+
+    def refresh_packed(self):
+        """Перерисовывает пометки после изменения содержимого packed"""
+        if self._packed and self._rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self._rows) - 1),
+                                  [Qt.ItemDataRole.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name, data = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            text = f"{counted_name(name, quantity(data))} ({data[WEIGHT_KEY]} гр., {data[VOLUME_KEY]} л)"
+            return f"{text} - в рюкзаке" if name in self._packed else text
+        return item_role_data(name, data, role)
+
+
+class ItemSortFilterProxyModel(QSortFilterProxyModel):
+    """Сортировка по названию, весу, объему или приоритету и фильтр по подстроке названия"""
+
+    SORT_ROLES = {
+        "name": NameRole,
+        "weight": WeightRole,
+        "volume": VolumeRole,
+        "priority": PriorityRole,
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFilterRole(NameRole)
+        self.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+
+    def sort_by(self, key, order=Qt.SortOrder.AscendingOrder):
+        """Сортирует по ключу из SORT_ROLES; None возвращает порядок добавления"""
+        if key is None:
+            self.sort(-1)
+            return
+        self.setSortRole(self.SORT_ROLES[key])
+        self.sort(0, order)
+
+
+class CatalogListModel(PresetListModel):
+    """Предметы из PresetCatalog, подгружаемые страницами по мере прокрутки"""
+
+    def __init__(self, catalog=None, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self._query = {}
+        self._exhausted = True
+
+    def set_query(self, **query):
+        """Новый запрос к каталогу (category, prefix, min_weight, max_weight)"""
+        self._query = query
+        page = self.catalog.query(**query) if self.catalog is not None else []
+        self._exhausted = len(page) < PAGE_SIZE
+        self.set_rows(page)
+
+    def set_search_results(self, rows, packed=()):
+        """Показывает готовый список (результаты поиска) без подгрузки из каталога"""
+        self._query = {}
+        self._exhausted = True
+        self.set_rows(rows, packed)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        page = self.catalog.query(offset=len(self._rows), **self._query)
+        self._exhausted = len(page) < PAGE_SIZE
+        if not page:
+            return
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
@@ -0,0 +1,260 @@
+"""Колоночное хранилище предметов.
+
+Вместо словаря на каждый предмет данные лежат столбцами array: веса
+int32, объемы float32 (и они же в целых децилитрах для точных сумм),
+количества, приоритеты и флаги, а названия - один список строк. Строка читается через ItemRow - легкое
+представление со __slots__, которое ведет себя как словарь предмета
+только для чтения. Суммы по столбцам считаются NumPy над буфером array
+без копирования, а без NumPy - встроенными функциями над array.
+
+Поля, которые нельзя без потерь положить в столбцы (дробный вес, целый
+или слишком точный объем, незнакомые ключи), хранятся отдельно для своей
+строки, поэтому данные предмета возвращаются такими, какими были
+добавлены.
+"""
+from array import array
+from collections.abc import Mapping
+from operator import mul
+
+from knapsack import (MANDATORY_KEY, PRIORITY_KEY, QUANTITY_KEY, VOLUME_KEY, WEIGHT_KEY, numpy_module,
+                      volume_units)
+
+# Знаков после запятой, до которых округляется объем из float32
+VOLUME_DIGITS = 3
+FLAG_MANDATORY = 1
+# Объем не был задан (отличается от явного 0)
+FLAG_NO_VOLUME = 2
+# Доля удаленных строк, после которой столбцы уплотняются
+COMPACT_RATIO = 0.5
+
+_INT32_MAX = 2 ** 31 - 1
+
+
+def _column_int(value):
+    """Значение для целого столбца: округленное и ограниченное int32"""
+    return max(-_INT32_MAX, min(_INT32_MAX, int(round(value))))
+
+
+class ItemRow(Mapping):
+    """Представление строки хранилища как словаря предмета.
+
+    Действительно до следующего изменения хранилища: после удаления
+    и уплотнения строка может занять другой предмет.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def name(self):
+        return self._store.names[self._row]
+
+    @property
+    def weight(self):
+        return self._store.weights[self._row]
+
+    @property
+    def volume(self):
+        return round(self._store.volumes[self._row], VOLUME_DIGITS)
+
+    @property
+    def quantity(self):
+        return self._store.quantities[self._row]
+
+    @property
+    def priority(self):
+        return self._store.priorities[self._row]
+
+    @property
+    def mandatory(self):
+        return bool(self._store.flags[self._row] & FLAG_MANDATORY)
+
+    def _column_fields(self):
+        """Поля из столбцов; необязательные - только если они не по умолчанию"""
+        yield WEIGHT_KEY, self.weight
+        if not self._store.flags[self._row] & FLAG_NO_VOLUME:
+            yield VOLUME_KEY, self.volume
+        if self.quantity != 1:
+            yield QUANTITY_KEY, self.quantity
+        if self.priority != 1:
+            yield PRIORITY_KEY, self.priority
+        if self.mandatory:
+            yield MANDATORY_KEY, True
+
+    def __getitem__(self, key):
+        extra = self._store.extras.get(self._row)
+        if extra is not None and key in extra:
+            return extra[key]
+        for field, value in self._column_fields():
+            if field == key:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def to_dict(self):
+        """Обычный словарь предмета, который не зависит от хранилища"""
+        data = dict(self._column_fields())
+        extra = self._store.extras.get(self._row)
+        if extra is not None:
+            data.update(extra)
+        return data
+
+    def __repr__(self):
+        return f"ItemRow({self.name!r}, {self.to_dict()!r})"
+
+
+class ItemStore:
+    """Предметы по столбцам; порядок строк - порядок добавления.
+
+    Удаленная строка остается дырой с нулевыми весом, объемом и
+    количеством (на суммы она не влияет) и переиспользуется только после
+    уплотнения, когда дыр становится больше COMPACT_RATIO.
+    """
+
+    def __init__(self, pairs=None):
+        self.names = []
+        self.weights = array("i")
+        self.volumes = array("f")
+        self.units = array("i")  # объемы в децилитрах, как knapsack.volume_units
+        self.quantities = array("I")
+        self.priorities = array("i")
+        self.flags = array("B")
+        self.extras = {}  # строка -> поля, не поместившиеся в столбцы
+        self._rows = {}  # название -> строка, в порядке добавления
+        self._holes = 0
+        if pairs:
+            self.extend(pairs)
+
+    # Словарный интерфейс
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def row(self, name):
+        return ItemRow(self, self._rows[name])
+
+    def rows(self):
+        """Представления всех строк в порядке добавления"""
+        return [ItemRow(self, row) for row in self._rows.values()]
+
+    def get_dict(self, name):
+        return ItemRow(self, self._rows[name]).to_dict()
+
+    # Изменения
+
+    def add(self, name, data):
+        if name in self._rows:
+            raise KeyError(name)
+        self._rows[name] = len(self.names)
+        self.names.append(name)
+        self.weights.append(0)
+        self.volumes.append(0.0)
+        self.units.append(0)
+        self.quantities.append(0)
+        self.priorities.append(0)
+        self.flags.append(0)
+        self._write(len(self.names) - 1, data)
+
+    def extend(self, pairs):
+        for name, data in pairs:
+            self.add(name, data)
+
+    def set(self, name, data):
+        """Меняет данные предмета, не меняя его места"""
+        self._write(self._rows[name], data)
+
+    def remove(self, name):
+        """Удаляет предмет и возвращает его данные обычным словарем"""
+        row = self._rows.pop(name)
+        data = ItemRow(self, row).to_dict()
+        self.names[row] = None
+        self.weights[row] = 0
+        self.volumes[row] = 0.0
+        self.units[row] = 0
+        self.quantities[row] = 0
+        self.extras.pop(row, None)
+        self._holes += 1
+        if self._holes > COMPACT_RATIO * len(self.names):
+            self.compact()
+        return data
+
+    def compact(self):
+        """Убирает дыры от удаленных строк; представления ItemRow устаревают"""
+        order = list(self._rows.values())
+        self.names = [self.names[row] for row in order]
+        for column in ("weights", "volumes", "units", "quantities", "priorities", "flags"):
+            old = getattr(self, column)
+            setattr(self, column, array(old.typecode, (old[row] for row in order)))
+        self.extras = {new: self.extras[old] for new, old in enumerate(order) if old in self.extras}
+        self._rows = {name: row for row, name in enumerate(self.names)}
+        self._holes = 0
+
+    def _write(self, row, data):
+        """Раскладывает данные по столбцам; то, что не читается из них обратно
+        тем же значением и типом, дополнительно кладется в extras"""
+        self.weights[row] = _column_int(data[WEIGHT_KEY])
+        volume = data.get(VOLUME_KEY, 0)
+        self.volumes[row] = float(volume)
+        self.units[row] = _column_int(volume_units(volume))
+        self.quantities[row] = max(0, _column_int(data.get(QUANTITY_KEY, 1)))
+        self.priorities[row] = _column_int(data.get(PRIORITY_KEY, 1))
+        flags = FLAG_MANDATORY if data.get(MANDATORY_KEY) else 0
+        if VOLUME_KEY not in data:
+            flags |= FLAG_NO_VOLUME
+        self.flags[row] = flags
+        self.extras.pop(row, None)
+        stored = ItemRow(self, row).to_dict()
+        extra = {key: value for key, value in data.items()
+                 if key not in stored or type(stored[key]) is not type(value) or stored[key] != value}
+        if extra:
+            self.extras[row] = extra
+
+    # Итоги по столбцам
+
+    def _dot(self, column):
+        """Сумма column * количество по всем строкам"""
+        np = numpy_module()
+        if np is None or not self.names:
+            return sum(map(mul, column, self.quantities))
+        # frombuffer не копирует столбцы; int64 - чтобы произведения не переполнились
+        values = np.frombuffer(column, dtype=np.int32).astype(np.int64)
+        counts = np.frombuffer(self.quantities, dtype=np.uint32).astype(np.int64)
+        return int(values @ counts)
+
+    def total_weight(self):
+        """Суммарный вес в граммах с учетом количеств"""
+        total = self._dot(self.weights)
+        for row, extra in self.extras.items():
+            # Дробный вес в столбце округлен, в сумму идет точный
+            if WEIGHT_KEY in extra:
+                total += (extra[WEIGHT_KEY] - self.weights[row]) * self.quantities[row]
+        return total
+
+    def total_volume_units(self):
+        """Суммарный объем в целых децилитрах с учетом количеств"""
+        return self._dot(self.units)
+
+    def total_count(self):
+        np = numpy_module()
+        if np is None or not self.names:
+            return sum(self.quantities)
+        return int(np.frombuffer(self.quantities, dtype=np.uint32).sum(dtype=np.int64))
+
+    def nbytes(self):
+        """Примерный размер столбцов в байтах (без строк названий)"""
+        columns = (self.weights, self.volumes, self.units, self.quantities, self.priorities, self.flags)
+        return sum(column.itemsize * len(column) for column in columns) + 8 * len(self.names)
@@ -0,0 +1,243 @@
+"""Журнал изменений рядом с файлом рюкзака и фоновое сохранение.
+
+Каждая правка дописывается строкой JSON в <файл>.bpc.journal, поэтому
+после сбоя несохраненные изменения восстанавливаются при открытии файла.
+Сжатие журнала - атомарная перезапись .bpc текущим состоянием и новый
+пустой журнал. Вся работа с диском идет в отдельном потоке по очереди
+заданий, поток интерфейса только ставит задания в очередь.
+"""
+import json
+import os
+import queue
+import threading
+
+from bpc_io import save_bpc
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_VERSION = 1
+
+
+def journal_file(file_name):
+    return file_name + JOURNAL_SUFFIX
+
+
+def _base_stamp(file_name):
+    """Отметка файла, к которому относится журнал: размер и время изменения"""
+    stat = os.stat(file_name)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def read_journal(file_name):
+    """Записи журнала для file_name или [], если журнала нет или он устарел.
+
+    Недописанная последняя строка (сбой посреди записи) пропускается.
+    """
+    try:
+        with open(journal_file(file_name), "r", encoding="utf-8") as file:
+            lines = file.read().split("\n")
+    except OSError:
+        return []
+    try:
+        header = json.loads(lines[0])
+        if header.get("journal") != JOURNAL_VERSION or header.get("base") != _base_stamp(file_name):
+            return []
+    except (ValueError, OSError, AttributeError):
+        return []
+    records = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+    return records
+
+
+def apply_records(records, inventory):
+    """Повторяет записи журнала над Inventory.
+
+    Возвращает словарь с последними значениями max_weight, max_volume и
+    bags из журнала (только те, что в нем встречались).
+    """
+    settings = {}
+    for record in records:
+        op = record.get("op")
+        if op == "add":
+            inventory.add(record["name"], record["data"])
+        elif op == "remove":
+            inventory.remove(record["name"])
+        elif op == "replace":
+            inventory.replace(record["old"], record["new"], record["data"])
+        elif op == "extend":
+            inventory.extend((name, data) for name, data in record["items"])
+        elif op == "reset":
+            inventory.load((name, data) for name, data in record["items"])
+        elif op == "settings":
+            settings.update(record["values"])
+    return settings
+
+
+def inventory_record(inventory, event, *args):
+    """Запись журнала для события Inventory"""
+    if event == "add":
+        return {"op": "add", "name": args[0], "data": args[1]}
+    if event == "remove":
+        return {"op": "remove", "name": args[0]}
+    if event == "replace":
+        return {"op": "replace", "old": args[0], "new": args[1], "data": args[3]}
+    if event == "extend":
+        return {"op": "extend", "items": list(args[0])}
+    # Содержимое после reset копируется здесь же: дальше его будут менять
+    return {"op": "reset", "items": list(inventory.items())}
+
+
+def _drop_partial_line(path):
+    """Обрезает недописанную после сбоя последнюю строку, чтобы дописывать с новой"""
+    with open(path, "r+b") as file:
+        data = file.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            file.truncate(end)
+
+
+class JournalWriter:
+    """Поток записи журнала и сохранений.
+
+    on_saved(file_name, error) вызывается из потока записи после каждого
+    сохранения (error - None или текст ошибки).
+    """
+
+    def __init__(self, on_saved=None):
+        self.on_saved = on_saved
+        self.file_name = None
+        self.pending = 0  # Записей с последнего сохранения (в потоке интерфейса)
+        self.paused = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+        self._file = None
+        self._journal_name = None  # Файл, в журнал которого пишет поток записи
+
+    # Вызовы из потока интерфейса
+
+    def open(self, file_name, pending=0):
+        """Продолжает журнал file_name (или начинает новый, если старый устарел);
+        pending - сколько записей в нем уже есть"""
+        self.file_name = file_name
+        self.pending = pending
+        self._queue.put(("open", file_name))
+
+    def record(self, record):
+        if self.file_name is None or self.paused:
+            return
+        self.pending += 1
+        self._queue.put(("record", record))
+
+    def follow(self, inventory):
+        """Записывает в журнал все изменения Inventory"""
+        def on_changed(event, *args):
+            if self.file_name is not None and not self.paused:
+                self.record(inventory_record(inventory, event, *args))
+        inventory.subscribe(on_changed)
+        return on_changed
+
+    def save(self, file_name, max_weight, max_volume, items, binary=False, bags=None):
+        """Атомарно сохраняет снимок и начинает для file_name новый журнал.
+
+        items должен быть снимком, который больше не изменится. Журнал
+        переключается на file_name только после успешной записи: если она
+        не удалась, правки по-прежнему пишутся в журнал прежнего файла.
+        """
+        self._queue.put(("save", (file_name, max_weight, max_volume, items, binary, bags,
+                                  self.file_name)))
+
+    def sync(self):
+        """Сбрасывает журнал на диск"""
+        self._queue.put(("sync", None))
+
+    def close(self):
+        """Дописывает очередь и останавливает поток"""
+        self._queue.put(("stop", None))
+        self._thread.join()
+
+    # Поток записи
+
+    def _run(self):
+        while True:
+            task, payload = self._queue.get()
+            try:
+                if task == "stop":
+                    self._close_file()
+                    return
+                getattr(self, "_do_" + task)(payload)
+            except Exception as e:
+                if task == "save" and self.on_saved is not None:
+                    # Журнал прежнего файла остается открытым
+                    self.on_saved(payload[0], str(e))
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _start_journal(self, file_name):
+        """Новый журнал с отметкой текущего состояния файла"""
+        self._close_file()
+        self._journal_name = file_name
+        self._file = open(journal_file(file_name), "w", encoding="utf-8")
+        header = {"journal": JOURNAL_VERSION, "base": _base_stamp(file_name)}
+        self._file.write(json.dumps(header) + "\n")
+        self._file.flush()
+
+    def _do_open(self, file_name):
+        self._close_file()
+        self._journal_name = file_name
+        if not file_name:
+            return
+        if self._journal_matches(file_name):
+            _drop_partial_line(journal_file(file_name))
+            self._file = open(journal_file(file_name), "a", encoding="utf-8")
+        else:
+            self._start_journal(file_name)
+
+    @staticmethod
+    def _journal_matches(file_name):
+        try:
+            with open(journal_file(file_name), "r", encoding="utf-8") as file:
+                header = json.loads(file.readline())
+            return header.get("journal") == JOURNAL_VERSION and header.get("base") == _base_stamp(file_name)
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def _do_record(self, record):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # Строка уходит в ОС сразу: после падения программы она не потеряется
+        self._file.flush()
+
+    def _do_sync(self, _):
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def _do_discard(self, file_name):
+        self._close_file()
+        try:
+            os.remove(journal_file(file_name))
+        except OSError:
+            pass
+
+    def _do_save(self, payload):
+        file_name, max_weight, max_volume, items, binary, bags, previous = payload
+        save_bpc(file_name, max_weight, max_volume, items, binary=binary, bags=bags)
+        if self._journal_name and self._journal_name != file_name:
+            # Изменения старого файла теперь лежат в новом
+            self._do_discard(self._journal_name)
+        self._start_journal(file_name)
+        if self.file_name == previous:
+            # Если за это время не открыли другой файл, правки пишутся в журнал нового
+            self.file_name = file_name
+            self.pending = 0
+        if self.on_saved is not None:
+            self.on_saved(file_name, None)
@@ -0,0 +1,792 @@
+"""Решатель задачи о рюкзаке с ограничениями по весу и объему.
+
+Модуль не зависит от PyQt6 и работает с предметами в том же виде,
+в каком их хранит BackpackCalculator.items: {"название": {"вес": гр., "объем": л}}.
+Необязательное поле "количество" задает число одинаковых предметов в строке;
+такие строки решаются как ограниченный рюкзак. Предметы с полем
+"обязательный" кладутся всегда, оптимизируется только остальное.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from math import gcd
+
+WEIGHT_KEY = "вес"
+VOLUME_KEY = "объем"
+# Число одинаковых предметов; без поля - один предмет
+QUANTITY_KEY = "количество"
+# Важность одной штуки предмета для пользователя; без поля - 1
+PRIORITY_KEY = "приоритет"
+# Предмет, который кладется в рюкзак в любом случае
+MANDATORY_KEY = "обязательный"
+
+# Объем считаем в децилитрах: шаг 0.1 л, как в полях ввода
+VOLUME_SCALE = 10
+
+# Ограничение памяти для таблицы динамического программирования (байт)
+DP_MEMORY_LIMIT = 64 * 1024 * 1024
+# Сколько обновлений ячеек разрешаем циклу на чистом Python
+DP_PURE_PYTHON_LIMIT = 5_000_000
+
+METHODS = ("auto", "dp", "bnb", "fptas", "greedy")
+
+# Точность приближенного решения по ценности по умолчанию: ответ не хуже
+# (1 - FPTAS_EPSILON) от оптимума
+FPTAS_EPSILON = 0.1
+# Сколько узлов ветвей и границ перебирается до перехода на FPTAS в режиме
+# auto с eps > 0: обычно перебор заканчивается гораздо раньше
+FPTAS_NODE_LIMIT = 200_000
+
+# Как часто (в узлах перебора) проверять запрос на остановку
+STOP_CHECK_INTERVAL = 1024
+
+
+class SolveCancelled(Exception):
+    """Решение прервано вызывающей стороной через should_stop"""
+
+
+_numpy = None
+_numpy_checked = False
+
+
+def numpy_module():
+    """NumPy или None, если он не установлен.
+
+    Импорт откладывается до первого обращения, чтобы не замедлять
+    запуск окна программы.
+    """
+    global _numpy, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+        except ImportError:  # NumPy необязателен, без него работает чистый Python
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def quantity(data):
+    """Сколько одинаковых предметов описывает строка"""
+    return int(data.get(QUANTITY_KEY, 1))
+
+
+def priority(data):
+    """Приоритет одной штуки предмета"""
+    return data.get(PRIORITY_KEY, 1)
+
+
+def mandatory(data):
+    return bool(data.get(MANDATORY_KEY, False))
+
+
+def item_data(weight, volume, count=1, priority=1, mandatory=False):
+    """Данные предмета; необязательные поля записываются, только если
+    они отличаются от значений по умолчанию"""
+    data = {WEIGHT_KEY: weight, VOLUME_KEY: volume}
+    if count != 1:
+        data[QUANTITY_KEY] = count
+    if priority != 1:
+        data[PRIORITY_KEY] = priority
+    if mandatory:
+        data[MANDATORY_KEY] = True
+    return data
+
+
+def with_quantity(data, count):
+    """Копия данных предмета с другим количеством"""
+    data = dict(data)
+    data.pop(QUANTITY_KEY, None)
+    if count != 1:
+        data[QUANTITY_KEY] = count
+    return data
+
+
+def total_count(items):
+    """Число предметов с учетом количества в каждой строке"""
+    return sum(quantity(data) for data in items.values())
+
+
+def split_quantity(count):
+    """Двоичное разбиение count одинаковых предметов на пачки 1, 2, 4, ..., остаток.
+
+    Из пачек набирается любое число от 0 до count, поэтому строка из count
+    предметов превращается в log2(count) предметов задачи 0/1, а не в count.
+    """
+    parts = []
+    size = 1
+    while count > 0:
+        part = min(size, count)
+        parts.append(part)
+        count -= part
+        size *= 2
+    return parts
+
+
+class Solution:
+    """Результат решения: выбранные предметы и их суммарные показатели.
+
+    counts - сколько штук каждого выбранного предмета уложено.
+    """
+    __slots__ = ("names", "weight", "volume", "value", "optimal", "method", "counts")
+
+    def __init__(self, names, weight, volume, value, optimal, method, counts=None):
+        self.names = names
+        self.weight = weight
+        self.volume = volume
+        self.value = value
+        self.optimal = optimal
+        self.method = method
+        self.counts = counts if counts is not None else dict.fromkeys(names, 1)
+
+    @property
+    def total_count(self):
+        return sum(self.counts.values())
+
+    def __repr__(self):
+        return (f"Solution({len(self.names)} предм., {self.weight} гр., "
+                f"{self.volume:.1f} л, method={self.method!r})")
+
+    def to_dict(self):
+        return {
+            "items": list(self.names),
+            "weight": self.weight,
+            "volume": round(self.volume, 3),
+            "value": self.value,
+            "optimal": self.optimal,
+            "method": self.method,
+            # Как в файлах рюкзака, записываются только количества больше одного
+            "counts": {name: count for name, count in self.counts.items() if count != 1},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        names = list(data["items"])
+        counts = dict.fromkeys(names, 1)
+        counts.update(data.get("counts", {}))
+        return cls(names, data["weight"], data["volume"],
+                   data["value"], data["optimal"], data["method"], counts)
+
+
+def volume_units(volume):
+    """Переводит объем в литрах в целые децилитры"""
+    return int(round(volume * VOLUME_SCALE))
+
+
+def weight_value(name, data):
+    """Ценность предмета по умолчанию - его вес, как в жадном проходе bbc.py"""
+    return data[WEIGHT_KEY]
+
+
+def priority_value(name, data):
+    """Ценность предмета - приоритет, заданный пользователем"""
+    return priority(data)
+
+
+def _prepare(items, max_weight, max_volume, value):
+    """Подготовленные предметы (название, вес, объем, ценность, штук).
+
+    Строки с количеством разбиваются на пачки split_quantity; штук в строке
+    оставляется не больше, чем влезает в пустой рюкзак, а предметы, которые
+    не влезут даже по одному, отбрасываются.
+    """
+    value = value or weight_value
+    volume_cap = None if max_volume is None else volume_units(max_volume)
+    prepared = []
+    for name, data in items.items():
+        w = int(data[WEIGHT_KEY])
+        v = volume_units(data.get(VOLUME_KEY, 0)) if volume_cap is not None else 0
+        count = quantity(data)
+        if w:
+            count = min(count, max_weight // w)
+        if v:
+            count = min(count, volume_cap // v)
+        val = int(value(name, data))
+        for part in split_quantity(count):
+            prepared.append((name, w * part, v * part, val * part, part))
+    return prepared, volume_cap
+
+
+def _make_solution(items, counts, method, optimal):
+    weight = sum(items[name][WEIGHT_KEY] * count for name, count in counts.items())
+    volume = sum(items[name].get(VOLUME_KEY, 0) * count for name, count in counts.items())
+    return Solution(list(counts), weight, volume, None, optimal, method, counts)
+
+
+def _finish(items, prepared, picked, method, optimal):
+    """Собирает Solution по индексам выбранных подготовленных предметов"""
+    counts = {}
+    for i in sorted(picked):
+        name = prepared[i][0]
+        counts[name] = counts.get(name, 0) + prepared[i][4]
+    solution = _make_solution(items, counts, method, optimal)
+    solution.value = sum(prepared[i][3] for i in picked)
+    return solution
+
+
+def dp_table_shape(prepared, max_weight, volume_cap):
+    """Размер таблицы ДП после сокращения на НОД весов и объемов предметов.
+
+    Любая сумма весов кратна НОД, поэтому емкость можно округлить вниз
+    до кратной ему без потери точности.
+    """
+    wg = 0
+    for _, w, _, _, _ in prepared:
+        wg = gcd(wg, w)
+    wg = wg or 1
+    if volume_cap is None:
+        return wg, 1, max_weight // wg + 1, 1
+    vg = 0
+    for _, _, v, _, _ in prepared:
+        vg = gcd(vg, v)
+    vg = vg or 1
+    return wg, vg, max_weight // wg + 1, volume_cap // vg + 1
+
+
+def dp_memory_estimate(prepared, max_weight, volume_cap):
+    """Оценка памяти ДП: таблица значений плюс по одному биту выбора на ячейку"""
+    _, _, rows, cols = dp_table_shape(prepared, max_weight, volume_cap)
+    cells = rows * cols
+    return cells * 8 + len(prepared) * ((cells + 7) // 8)
+
+
+def solve_greedy(items, max_weight, max_volume=None, value=None):
+    """Жадная укладка по убыванию ценности на единицу размера"""
+    prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+    order = _density_order(prepared, max_weight, volume_cap)
+    picked = _greedy_fill(prepared, order, max_weight, volume_cap)
+    return _finish(items, prepared, picked, "greedy", False)
+
+
+def _density_order(prepared, max_weight, volume_cap):
+    """Порядок предметов по убыванию ценности на долю занятой емкости"""
+    def size(i):
+        _, w, v, _, _ = prepared[i]
+        s = w / max_weight if max_weight else 0.0
+        if volume_cap:
+            s += v / volume_cap
+        return s
+
+    return sorted(range(len(prepared)),
+                  key=lambda i: -(prepared[i][3] / size(i)) if size(i) else float("-inf"))
+
+
+def _greedy_fill(prepared, order, max_weight, volume_cap):
+    picked = []
+    rem_w = max_weight
+    rem_v = volume_cap if volume_cap is not None else 0
+    for i in order:
+        _, w, v, _, _ = prepared[i]
+        if w <= rem_w and (volume_cap is None or v <= rem_v):
+            picked.append(i)
+            rem_w -= w
+            rem_v -= v
+    return picked
+
+
+def solve_dp(items, max_weight, max_volume=None, value=None, should_stop=None):
+    """Точное решение двумерным ДП по (вес, объем).
+
+    Таблица хранится компактно: одна плоская таблица значений (array или NumPy)
+    переиспользуется для всех предметов, а для восстановления ответа
+    на каждый предмет хранится только битовая маска решений.
+    """
+    prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+    picked = _dp_pick(prepared, max_weight, volume_cap, should_stop)
+    return _finish(items, prepared, picked, "dp", True)
+
+
+def _dp_pick(prepared, max_weight, volume_cap, should_stop=None):
+    table = DpTable(prepared, max_weight, volume_cap)
+    table.fill(should_stop)
+    return table.backtrack(max_weight, volume_cap)
+
+
+class DpTable:
+    """Таблица ДП по (вес, объем) с битами решений для восстановления ответа.
+
+    Ячейка (r, c) хранит лучшую ценность для рюкзака емкостью
+    r * weight_step граммов и c * volume_step децилитров, поэтому одна
+    заполненная таблица отвечает сразу на все емкости до максимальной.
+    """
+
+    def __init__(self, prepared, max_weight, volume_cap):
+        self.weight_step, self.volume_step, self.rows, self.cols = dp_table_shape(
+            prepared, max_weight, volume_cap)
+        self.has_volume = volume_cap is not None
+        self.scaled = []
+        self.decisions = []
+        self.values = None
+        self.np = numpy_module()
+        self.extend(prepared)
+
+    def fits(self, prepared):
+        """Можно ли добавить предметы в эту таблицу без смены шага"""
+        return all(w % self.weight_step == 0 and (not self.has_volume or v % self.volume_step == 0)
+                   for _, w, v, _, _ in prepared)
+
+    def extend(self, prepared):
+        """Добавляет слои предметов; значения для них досчитает fill"""
+        self.scaled.extend((w // self.weight_step, v // self.volume_step if self.has_volume else 0, val)
+                           for _, w, v, val, _ in prepared)
+
+    def copy_values(self):
+        """Копия таблицы значений после уже посчитанных слоев (None - пустая)"""
+        if self.values is None:
+            return None
+        return self.values.copy() if self.np is not None else array("q", self.values)
+
+    def rewind(self, layers, values):
+        """Возвращает таблицу к первым layers слоям; values - их copy_values"""
+        del self.scaled[layers:]
+        del self.decisions[layers:]
+        self.values = None if values is None else (
+            values.copy() if self.np is not None else array("q", values))
+
+    def fill(self, should_stop=None):
+        """Досчитывает слои, для которых еще нет битов решений.
+
+        Остановка через should_stop проверяется между слоями, поэтому
+        после SolveCancelled таблица соответствует посчитанным слоям.
+        """
+        if self.np is not None:
+            self._fill_numpy(should_stop)
+        else:
+            self._fill_python(should_stop)
+
+    def _fill_numpy(self, should_stop):
+        np = self.np
+        rows, cols = self.rows, self.cols
+        if self.values is None:
+            self.values = np.zeros((rows, cols), dtype=np.int64)
+        table = self.values
+        for w, v, val in self.scaled[len(self.decisions):]:
+            if should_stop is not None and should_stop():
+                raise SolveCancelled()
+            if w >= rows or v >= cols:
+                self.decisions.append(None)
+                continue
+            candidate = table[:rows - w, :cols - v] + val
+            target = table[w:, v:]
+            take = candidate > target
+            target[take] = candidate[take]
+            self.decisions.append(np.packbits(take, axis=None))
+
+    def _fill_python(self, should_stop):
+        rows, cols = self.rows, self.cols
+        cells = rows * cols
+        if self.values is None:
+            self.values = array("q", bytes(8 * cells))
+        table = self.values
+        for w, v, val in self.scaled[len(self.decisions):]:
+            if should_stop is not None and should_stop():
+                raise SolveCancelled()
+            bits = bytearray((cells + 7) // 8)
+            offset = w * cols + v
+            for row in range(rows - 1, w - 1, -1):
+                base = row * cols
+                for idx in range(base + cols - 1, base + v - 1, -1):
+                    candidate = table[idx - offset] + val
+                    if candidate > table[idx]:
+                        table[idx] = candidate
+                        bits[idx >> 3] |= 1 << (idx & 7)
+            self.decisions.append(bits)
+
+    def _taken(self, i, row, col):
+        bits = self.decisions[i]
+        if bits is None:
+            return False
+        if self.np is not None:
+            w, v, _ = self.scaled[i]
+            if row < w or col < v:
+                return False
+            pos = (row - w) * (self.cols - v) + (col - v)
+            return bool(bits[pos >> 3] & (0x80 >> (pos & 7)))
+        idx = row * self.cols + col
+        return bool(bits[idx >> 3] & (1 << (idx & 7)))
+
+    def cell(self, max_weight, volume_cap):
+        """Ячейка таблицы для емкости в граммах и децилитрах"""
+        row = min(max_weight // self.weight_step, self.rows - 1)
+        col = 0 if volume_cap is None else min(volume_cap // self.volume_step, self.cols - 1)
+        return row, col
+
+    def backtrack(self, max_weight, volume_cap):
+        """Индексы предметов лучшего набора для заданной емкости"""
+        row, col = self.cell(max_weight, volume_cap)
+        picked = []
+        for i in range(len(self.decisions) - 1, -1, -1):
+            if self._taken(i, row, col):
+                w, v, _ = self.scaled[i]
+                picked.append(i)
+                row -= w
+                col -= v
+        return picked
+
+
+def solve_bnb(items, max_weight, max_volume=None, value=None, node_limit=None,
+              should_stop=None):
+    """Точное решение методом ветвей и границ.
+
+    Память растет линейно от числа предметов и не зависит от емкости,
+    поэтому метод подходит для граммовой точности и больших рюкзаков.
+    Если задан node_limit и он исчерпан, возвращается лучший найденный
+    вариант с optimal=False.
+    """
+    prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+    picked, optimal = _bnb_pick(prepared, max_weight, volume_cap, node_limit, should_stop)
+    return _finish(items, prepared, picked, "bnb", optimal)
+
+
+def _surrogate_bound(prepared, max_weight, volume_cap, factor):
+    """Граница ЛП-релаксации для ограничения w + factor * v <= W + factor * V"""
+    capacity = max_weight + factor * (volume_cap or 0)
+    sized = sorted(((w + factor * v, val) for _, w, v, val, _ in prepared),
+                   key=lambda x: -x[1] / x[0] if x[0] else float("-inf"))
+    bound = 0.0
+    for size, val in sized:
+        if size <= capacity:
+            capacity -= size
+            bound += val
+        else:
+            bound += val * capacity / size
+            break
+    return bound
+
+
+def surrogate_factor(prepared, max_weight, volume_cap):
+    """Подбирает множитель, при котором суррогатная граница самая точная"""
+    if volume_cap is None or not volume_cap:
+        return 0.0
+    base = max_weight / volume_cap
+    candidates = [0.0] + [base * 2.0 ** p for p in range(-6, 7)]
+    return min(candidates, key=lambda f: _surrogate_bound(prepared, max_weight, volume_cap, f))
+
+
+def _bnb_pick(prepared, max_weight, volume_cap, node_limit=None, should_stop=None,
+              incumbent=None):
+    """incumbent - уже известный допустимый набор (индексы prepared), например
+    прошлый оптимум; перебор начинается с него, если он лучше жадного"""
+    search = _bnb_search(prepared, max_weight, volume_cap, node_limit, should_stop, incumbent)
+    while True:
+        try:
+            next(search)
+        except StopIteration as stop:
+            return stop.value
+
+
+def _bnb_search(prepared, max_weight, volume_cap, node_limit=None, should_stop=None,
+                incumbent=None):
+    """Ветви и границы как генератор: выдает индексы prepared каждого
+    нового рекорда, а по окончании возвращает (picked, optimal)"""
+    n = len(prepared)
+    factor = surrogate_factor(prepared, max_weight, volume_cap)
+    sizes = [w + factor * v for _, w, v, _, _ in prepared]
+    order = sorted(range(n), key=lambda i: -prepared[i][3] / sizes[i]
+                   if sizes[i] else float("-inf"))
+    ws = [prepared[i][1] for i in order]
+    vs = [prepared[i][2] for i in order]
+    vals = [prepared[i][3] for i in order]
+    ss = [sizes[i] for i in order]
+    no_volume = volume_cap is None
+
+    def bound(depth, rem_w, rem_v, val):
+        # Суррогатная релаксация: вес и объем сводятся в одно ограничение,
+        # а предметы, которые уже не влезают по отдельности, пропускаются
+        rem_s = rem_w + factor * rem_v
+        for k in range(depth, n):
+            if ws[k] > rem_w or vs[k] > rem_v:
+                continue
+            if ss[k] <= rem_s:
+                rem_s -= ss[k]
+                val += vals[k]
+            else:
+                return val + vals[k] * rem_s / ss[k]
+        return val
+
+    # Начальное решение - жадное, в порядке удельной ценности
+    best_val = 0
+    best_mask = 0
+    rem_w, rem_v = max_weight, volume_cap or 0
+    for k in range(n):
+        if ws[k] <= rem_w and (no_volume or vs[k] <= rem_v):
+            rem_w -= ws[k]
+            rem_v -= vs[k]
+            best_val += vals[k]
+            best_mask |= 1 << k
+    if incumbent is not None and sum(prepared[i][3] for i in incumbent) > best_val:
+        position = {i: k for k, i in enumerate(order)}
+        best_val = sum(prepared[i][3] for i in incumbent)
+        best_mask = 0
+        for i in incumbent:
+            best_mask |= 1 << position[i]
+
+    # Обход в глубину с явным стеком: (глубина, ост. вес, ост. объем, ценность, маска)
+    stack = [(0, max_weight, volume_cap or 0, 0, 0)]
+    nodes = 0
+    optimal = True
+    while stack:
+        depth, rem_w, rem_v, val, mask = stack.pop()
+        nodes += 1
+        if should_stop is not None and nodes % STOP_CHECK_INTERVAL == 0 and should_stop():
+            raise SolveCancelled()
+        if node_limit is not None and nodes > node_limit:
+            optimal = False
+            break
+        if val > best_val:
+            best_val, best_mask = val, mask
+            yield [order[k] for k in range(n) if mask >> k & 1]
+        if depth == n:
+            continue
+        if int(bound(depth, rem_w, rem_v, val)) <= best_val:
+            continue
+        # Сначала кладем ветку "не брать", чтобы первой раскрылась ветка "взять"
+        stack.append((depth + 1, rem_w, rem_v, val, mask))
+        if ws[depth] <= rem_w and (no_volume or vs[depth] <= rem_v):
+            stack.append((depth + 1, rem_w - ws[depth], rem_v - vs[depth],
+                          val + vals[depth], mask | (1 << depth)))
+
+    picked = [order[k] for k in range(n) if best_mask >> k & 1]
+    return picked, optimal
+
+
+def solve_fptas(items, max_weight, max_volume=None, value=None, eps=FPTAS_EPSILON,
+                should_stop=None):
+    """Приближенное решение ДП по округленной ценности.
+
+    Ценности делятся на шаг eps * LB / n (LB - ценность жадного ответа),
+    поэтому размер таблицы зависит от n / eps, а не от емкости в граммах,
+    и ответ не хуже (1 - eps) от оптимума.
+    """
+    prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+    picked, optimal = _fptas_pick(prepared, max_weight, volume_cap, eps, should_stop)
+    return _finish(items, prepared, picked, "fptas", optimal)
+
+
+def _insert_undominated(cell, node):
+    """Добавляет набор в ячейку, если в ней нет набора не тяжелее и не объемнее"""
+    w, v = node[0], node[1]
+    for other in cell:
+        if other[0] <= w and other[1] <= v:
+            return False
+    cell[:] = [other for other in cell if not (w <= other[0] and v <= other[1])]
+    cell.append(node)
+    return True
+
+
+def _prune_dominated(cells):
+    """Убирает наборы, для которых в ячейке с большей ценностью есть набор
+    не тяжелее и не объемнее: любое продолжение лучше делать с ним"""
+    # Ступенчатая граница уже пройденных наборов: веса по возрастанию,
+    # объемы по убыванию
+    stair_w = []
+    stair_v = []
+    for total in sorted(cells, reverse=True):
+        kept = []
+        for node in cells[total]:
+            k = bisect_right(stair_w, node[0]) - 1
+            if k < 0 or stair_v[k] > node[1]:
+                kept.append(node)
+        for node in kept:
+            w, v = node[0], node[1]
+            k = bisect_left(stair_w, w)
+            end = k
+            while end < len(stair_w) and stair_v[end] >= v:
+                end += 1
+            stair_w[k:end] = [w]
+            stair_v[k:end] = [v]
+        if kept:
+            cells[total] = kept
+        else:
+            del cells[total]
+
+
+def _fptas_pick(prepared, max_weight, volume_cap, eps, should_stop=None, incumbent=None):
+    """incumbent - уже найденный допустимый набор; он задает нижнюю оценку
+    (чем она выше, тем крупнее шаг округления) и возвращается, если лучше"""
+    n = len(prepared)
+    if not n:
+        return [], True
+    greedy = incumbent
+    if greedy is None:
+        greedy = _greedy_fill(prepared, _density_order(prepared, max_weight, volume_cap),
+                              max_weight, volume_cap)
+    greedy_value = sum(prepared[i][3] for i in greedy)
+    lower = max(greedy_value, max(p[3] for p in prepared))
+    if lower <= 0:
+        return greedy, True
+    # Шаг меньше единицы не нужен: ценности целые, округление и так точное
+    step = max(1.0, eps * lower / n)
+    scaled = [int(p[3] // step) for p in prepared]
+
+    # cells[ценность] - наборы с этой округленной ценностью, ни один из
+    # которых не тяжелее и не объемнее другого: (вес, объем, родитель, предмет)
+    cells = {0: [(0, 0, None, -1)]}
+    no_volume = volume_cap is None
+    checked = 0
+    for i, (_, w, v, _, _) in enumerate(prepared):
+        s = scaled[i]
+        # Обход по убыванию: новые наборы попадают в уже пройденные ячейки
+        # и не дополняются этим же предметом повторно
+        for total in sorted(cells, reverse=True):
+            target = cells.setdefault(total + s, [])
+            for node in tuple(cells[total]):
+                checked += 1
+                if should_stop is not None and checked % STOP_CHECK_INTERVAL == 0 and should_stop():
+                    raise SolveCancelled()
+                nw, nv = node[0] + w, node[1] + v
+                if nw <= max_weight and (no_volume or nv <= volume_cap):
+                    _insert_undominated(target, (nw, nv, node, i))
+            if not target:
+                del cells[total + s]
+        _prune_dominated(cells)
+
+    node = cells[max(cells)][0]
+    picked = []
+    while node[2] is not None:
+        picked.append(node[3])
+        node = node[2]
+    if sum(prepared[i][3] for i in picked) < greedy_value:
+        picked = greedy
+    return picked, step == 1.0
+
+
+def choose_method(prepared, max_weight, volume_cap):
+    """Выбирает ДП, если таблица помещается в память и считается быстро"""
+    if dp_memory_estimate(prepared, max_weight, volume_cap) > DP_MEMORY_LIMIT:
+        return "bnb"
+    _, _, rows, cols = dp_table_shape(prepared, max_weight, volume_cap)
+    if numpy_module() is None and rows * cols * len(prepared) > DP_PURE_PYTHON_LIMIT:
+        return "bnb"
+    return "dp"
+
+
+def solve(items, max_weight, max_volume=None, method="auto", value=None, eps=None,
+          should_stop=None):
+    """Находит лучший набор предметов, помещающийся в рюкзак.
+
+    max_weight задается в граммах, max_volume в литрах (None - без
+    ограничения по объему). По умолчанию максимизируется суммарный вес
+    уложенных предметов; value(name, data) задает другую ценность, например
+    priority_value. Если таблица ДП по граммам слишком велика, режим auto
+    перебирает ветви и границы; с eps > 0 перебор ограничен
+    FPTAS_NODE_LIMIT узлами, а затем ответ ищется приближенным FPTAS.
+    Обязательные предметы кладутся всегда; если они не помещаются сами по
+    себе - ValueError. should_stop - необязательная функция без
+    аргументов; если она вернет True, решение прерывается SolveCancelled.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод: {method}")
+    required = {name: data for name, data in items.items() if mandatory(data)}
+    if required:
+        return _solve_required(items, required, max_weight, max_volume, method, value, eps,
+                               should_stop)
+    if method == "greedy":
+        return solve_greedy(items, max_weight, max_volume, value)
+
+    prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+    if _all_fit(items, prepared, max_weight, volume_cap):
+        return _finish(items, prepared, range(len(prepared)), "all", True)
+
+    if method == "auto":
+        method = choose_method(prepared, max_weight, volume_cap)
+        if method == "bnb" and eps:
+            # Точный перебор с ограничением; если он не уложился, FPTAS
+            # гарантирует (1 - eps) и начинает с найденного перебором набора
+            picked, optimal = _bnb_pick(prepared, max_weight, volume_cap, FPTAS_NODE_LIMIT, should_stop)
+            if optimal:
+                return _finish(items, prepared, picked, "bnb", True)
+            picked, optimal = _fptas_pick(prepared, max_weight, volume_cap, eps, should_stop, picked)
+            return _finish(items, prepared, picked, "fptas", optimal)
+    if method == "dp":
+        picked = _dp_pick(prepared, max_weight, volume_cap, should_stop)
+        return _finish(items, prepared, picked, "dp", True)
+    if method == "fptas":
+        picked, optimal = _fptas_pick(prepared, max_weight, volume_cap, eps or FPTAS_EPSILON,
+                                      should_stop)
+        return _finish(items, prepared, picked, "fptas", optimal)
+    picked, optimal = _bnb_pick(prepared, max_weight, volume_cap, should_stop=should_stop)
+    return _finish(items, prepared, picked, "bnb", optimal)
+
+
+def _all_fit(items, prepared, max_weight, volume_cap):
+    """Помещаются ли все штуки всех предметов сразу"""
+    return (sum(p[4] for p in prepared) == total_count(items)
+            and sum(p[1] for p in prepared) <= max_weight
+            and (volume_cap is None or sum(p[2] for p in prepared) <= volume_cap))
+
+
+def _solve_required(items, required, max_weight, max_volume, method, value, eps, should_stop,
+                    solve_rest=None):
+    """Кладет обязательные предметы и решает задачу для остатка емкости.
+
+    solve_rest - функция с параметрами solve для остатка (по умолчанию solve).
+    """
+    rest_weight, rest_volume = _rest_capacity(required, max_weight, max_volume)
+    optional = {name: data for name, data in items.items() if name not in required}
+    rest = (solve_rest or solve)(optional, rest_weight, rest_volume, method, value, eps,
+                                 should_stop)
+    return _with_required(items, required, rest, value)
+
+
+def _rest_capacity(required, max_weight, max_volume):
+    """Вес и объем, которые остаются после обязательных предметов"""
+    weight = sum(data[WEIGHT_KEY] * quantity(data) for data in required.values())
+    volume = sum(volume_units(data.get(VOLUME_KEY, 0)) * quantity(data) for data in required.values())
+    if weight > max_weight or (max_volume is not None and volume > volume_units(max_volume)):
+        raise ValueError("Обязательные предметы не помещаются в рюкзак")
+    rest_volume = None if max_volume is None else (volume_units(max_volume) - volume) / VOLUME_SCALE
+    return max_weight - weight, rest_volume
+
+
+def _required_value(required, value):
+    value = value or weight_value
+    return sum(int(value(name, data)) * quantity(data) for name, data in required.items())
+
+
+def _with_required(items, required, rest, value):
+    """Решение для всех items: обязательные предметы плюс решение rest для остальных"""
+    counts = {}
+    for name, data in items.items():
+        count = quantity(data) if name in required else rest.counts.get(name, 0)
+        if count:
+            counts[name] = count
+    solution = _make_solution(items, counts, rest.method, rest.optimal)
+    solution.value = rest.value + _required_value(required, value)
+    return solution
+
+
+def capacity_sweep(items, weights, volumes=None, value=None, should_stop=None):
+    """Решает задачу сразу для всех сочетаний емкостей.
+
+    weights - емкости по весу в граммах, volumes - по объему в литрах
+    (None - без ограничения по объему). Если таблица ДП для наибольшей
+    емкости помещается в память, все ответы восстанавливаются из одного
+    ее заполнения; иначе каждая емкость решается отдельно.
+    Возвращает словарь {(вес, объем): Solution}.
+    """
+    weights = sorted(set(weights))
+    volumes = sorted(set(volumes)) if volumes else [None]
+    max_weight, max_volume = weights[-1], volumes[-1]
+    if any(mandatory(data) for data in items.values()):
+        # Остаток емкости после обязательных предметов у каждой емкости свой
+        results = {}
+        for w in weights:
+            for v in volumes:
+                try:
+                    results[(w, v)] = solve(items, w, v, value=value, should_stop=should_stop)
+                except ValueError:
+                    pass
+        return results
+    prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+    if choose_method(prepared, max_weight, volume_cap) != "dp":
+        return {(w, v): solve(items, w, v, value=value, should_stop=should_stop)
+                for w in weights for v in volumes}
+
+    table = DpTable(prepared, max_weight, volume_cap)
+    table.fill(should_stop)
+    results = {}
+    for w in weights:
+        for v in volumes:
+            picked = table.backtrack(w, None if v is None else volume_units(v))
+            results[(w, v)] = _finish(items, prepared, picked, "dp", True)
+    return results
@@ -0,0 +1,160 @@
+"""Нагрузочный тест сервиса solve_service.
+
+Несколько клиентов по постоянным соединениям шлют POST /solve со
+случайными наборами из --distinct разных рюкзаков (чем их меньше, тем
+больше склеенных запросов и попаданий в кэш), затем печатаются
+пропускная способность, процентили задержки и /metrics сервиса.
+
+Примеры:
+    python load_test.py --spawn --duration 10
+    python load_test.py --port 8765 --concurrency 64 --distinct 1000 --items 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from benchmark import make_items
+from perf import percentile
+from solve_service import DEFAULT_HOST, DEFAULT_PORT
+
+# Сколько ждать запуска сервиса с --spawn (с)
+SPAWN_TIMEOUT = 10
+
+
+def make_payloads(distinct, items, seed=0):
+    """Тела запросов: разные наборы предметов и емкости рюкзака"""
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(distinct):
+        payload = {
+            "max_weight": rng.randint(5, 20),
+            "max_volume": rng.randint(20, 80),
+            "items": make_items(items, seed=seed * 100003 + i),
+        }
+        payloads.append(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    return payloads
+
+
+async def open_connection(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def request(reader, writer, method, path, body=b""):
+    """Один запрос по открытому соединению; возвращает (статус, тело)"""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: {DEFAULT_HOST}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+                 .encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(args, payloads, deadline, latencies, failures):
+    rng = random.Random()
+    reader, writer = await open_connection(args)
+    try:
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/solve", rng.choice(payloads))
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                failures.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    payloads = make_payloads(args.distinct, args.items, args.seed)
+    latencies, failures = [], []
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(args, payloads, deadline, latencies, failures)
+                           for _ in range(args.concurrency)))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    print(f"Запросов: {len(latencies)} за {elapsed:.1f} с, "
+          f"{len(latencies) / elapsed:.1f} в секунду, ошибок: {len(failures)}")
+    print("Задержка, мс: " + ", ".join(
+        f"{name} {percentile(latencies, fraction) * 1000:.2f}"
+        for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)) if latencies))
+
+    reader, writer = await open_connection(args)
+    try:
+        _, body = await request(reader, writer, "GET", "/metrics")
+    finally:
+        writer.close()
+    print("Метрики сервиса:")
+    print(json.dumps(json.loads(body), ensure_ascii=False, indent=4))
+    return 1 if failures else 0
+
+
+async def probe(args):
+    _, writer = await open_connection(args)
+    writer.close()
+    await writer.wait_closed()
+
+
+def spawn_service(args):
+    """Запускает локальный сервис и ждет, пока он начнет принимать соединения"""
+    command = [sys.executable, "solve_service.py", "--host", args.host, "--port", str(args.port)]
+    if args.unix:
+        command = [sys.executable, "solve_service.py", "--unix", args.unix]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+    process = subprocess.Popen(command, cwd=sys.path[0] or None)
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(probe(args))
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Сервис не запустился")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса подбора укладки")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="ПУТЬ", help="Unix-сокет сервиса вместо TCP")
+    parser.add_argument("--spawn", action="store_true", help="запустить локальный сервис на время теста")
+    parser.add_argument("--workers", type=int, help="число процессов сервиса с --spawn")
+    parser.add_argument("--concurrency", type=int, default=32, help="одновременных клиентов")
+    parser.add_argument("--duration", type=float, default=10, metavar="С")
+    parser.add_argument("--distinct", type=int, default=200, help="разных тел запроса")
+    parser.add_argument("--items", type=int, default=30, help="предметов в запросе")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    process = spawn_service(args) if args.spawn else None
+    try:
+        return asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
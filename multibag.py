@@ -0,0 +1,496 @@
+"""Распределение общего снаряжения по нескольким рюкзакам.
+
+У каждого рюкзака свой предел веса и объема. Цель - уложить как можно
+больше (по ценности, по умолчанию - по весу), а при равной ценности -
+выровнять загрузку, чтобы самый загруженный рюкзак был загружен как
+можно меньше. Модуль не зависит от PyQt, как и knapsack.
+
+Строки с полем "количество" разбиваются на пачки так же, как в knapsack,
+поэтому одинаковые предметы одной строки могут разойтись по разным рюкзакам.
+"""
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from knapsack import (STOP_CHECK_INTERVAL, VOLUME_KEY, WEIGHT_KEY, SolveCancelled, quantity,
+                      split_quantity, total_count, volume_units, weight_value)
+
+METHODS = ("auto", "exact", "heuristic")
+# Точный перебор в режиме auto - только для стольких предметов
+EXACT_MAX_ITEMS = 12
+EXACT_NODE_LIMIT = 2_000_000
+# Число перезапусков эвристики со случайно возмущенным порядком
+DEFAULT_RESTARTS = 32
+# Меньше этого (предметы * перезапуски) процессы не запускаются:
+# их старт дороже самого расчета
+PARALLEL_MIN_WORK = 5_000
+# Доля случайного шума в ключе сортировки при перезапусках
+ORDER_NOISE = 0.3
+# Загрузка считается выровненной, если самый загруженный рюкзак отстает
+# от идеально ровного распределения не больше чем на эту долю емкости
+BALANCE_TOLERANCE = 0.005
+
+
+class BagSpec:
+    """Рюкзак участника: max_weight в граммах, max_volume в литрах (None - без ограничения)"""
+
+    __slots__ = ("name", "max_weight", "max_volume")
+
+    def __init__(self, name, max_weight, max_volume=None):
+        self.name = name
+        self.max_weight = max_weight
+        self.max_volume = max_volume
+
+    def to_dict(self):
+        """Запись для .bpc: вес в кг, как max_weight в заголовке файла"""
+        return {"name": self.name, "max_weight": self.max_weight / 1000, "max_volume": self.max_volume}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], int(round(data["max_weight"] * 1000)), data.get("max_volume"))
+
+    def __repr__(self):
+        return f"BagSpec({self.name!r}, {self.max_weight}, {self.max_volume})"
+
+
+class MultiBagSolution:
+    """bags - списки названий по рюкзакам в порядке BagSpec.
+
+    counts - по словарю {название: штук} на каждый рюкзак,
+    unassigned_counts - сколько штук каждого предмета не поместилось.
+    """
+
+    __slots__ = ("bags", "unassigned", "weights", "volumes", "value", "optimal", "method",
+                 "counts", "unassigned_counts")
+
+    def __init__(self, bags, unassigned, weights, volumes, value, optimal, method,
+                 counts=None, unassigned_counts=None):
+        self.bags = bags
+        self.unassigned = unassigned
+        self.counts = counts if counts is not None else [dict.fromkeys(names, 1) for names in bags]
+        self.unassigned_counts = (unassigned_counts if unassigned_counts is not None
+                                  else dict.fromkeys(unassigned, 1))
+        self.weights = weights
+        self.volumes = volumes
+        self.value = value
+        self.optimal = optimal
+        self.method = method
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Problem:
+    """Предметы и рюкзаки в целых единицах (граммы, децилитры)"""
+
+    def __init__(self, prepared, bags):
+        self.items = prepared  # [(название, вес, объем, ценность)]
+        self.counts = []  # штук в каждой пачке items
+        self.weight_caps = [bag.max_weight for bag in bags]
+        self.volume_caps = [None if bag.max_volume is None else volume_units(bag.max_volume)
+                            for bag in bags]
+
+    def fits(self, b, w, v, load_w, load_v):
+        cap_v = self.volume_caps[b]
+        return load_w + w <= self.weight_caps[b] and (cap_v is None or load_v + v <= cap_v)
+
+    def ratio(self, b, load_w, load_v):
+        """Загрузка рюкзака: наибольшая доля по весу или объему"""
+        ratio = load_w / self.weight_caps[b] if self.weight_caps[b] else 0.0
+        cap_v = self.volume_caps[b]
+        if cap_v:
+            ratio = max(ratio, load_v / cap_v)
+        return ratio
+
+
+class _State:
+    """Текущее распределение: bag_of[i] - индекс рюкзака или -1"""
+
+    def __init__(self, problem, bag_of=None):
+        self.problem = problem
+        count = len(problem.weight_caps)
+        self.bag_of = bag_of or [-1] * len(problem.items)
+        self.load_w = [0] * count
+        self.load_v = [0] * count
+        self.value = 0
+        for i, b in enumerate(self.bag_of):
+            if b >= 0:
+                _, w, v, val = problem.items[i]
+                self.load_w[b] += w
+                self.load_v[b] += v
+                self.value += val
+
+    def fits(self, b, i, without=None):
+        _, w, v, _ = self.problem.items[i]
+        load_w = self.load_w[b]
+        load_v = self.load_v[b]
+        if without is not None:
+            load_w -= self.problem.items[without][1]
+            load_v -= self.problem.items[without][2]
+        return self.problem.fits(b, w, v, load_w, load_v)
+
+    def move(self, i, b):
+        _, w, v, val = self.problem.items[i]
+        old = self.bag_of[i]
+        if old >= 0:
+            self.load_w[old] -= w
+            self.load_v[old] -= v
+            self.value -= val
+        if b >= 0:
+            self.load_w[b] += w
+            self.load_v[b] += v
+            self.value += val
+        self.bag_of[i] = b
+
+    def ratio(self, b):
+        return self.problem.ratio(b, self.load_w[b], self.load_v[b])
+
+    def ratio_with(self, b, delta_w, delta_v):
+        return self.problem.ratio(b, self.load_w[b] + delta_w, self.load_v[b] + delta_v)
+
+    def max_ratio(self):
+        return max((self.ratio(b) for b in range(len(self.load_w))), default=0.0)
+
+    def ideal_ratio(self):
+        """Нижняя граница загрузки самого загруженного рюкзака при тех же предметах"""
+        problem = self.problem
+        ratio = sum(self.load_w) / (sum(problem.weight_caps) or 1)
+        if all(problem.volume_caps):
+            ratio = max(ratio, sum(self.load_v) / sum(problem.volume_caps))
+        return ratio
+
+    def balanced(self):
+        return self.max_ratio() <= self.ideal_ratio() + BALANCE_TOLERANCE
+
+    def score(self):
+        """Чем больше, тем лучше: сначала ценность, затем равномерность"""
+        return self.value, -self.max_ratio()
+
+
+def _prepare(items, bags, value, units=False):
+    """Отбрасывает предметы, которые не влезут ни в один пустой рюкзак.
+
+    Строка с количеством разбивается на пачки: штук оставляется не больше,
+    чем влезает во все пустые рюкзаки вместе, а пачка не больше, чем
+    влезает в самый вместительный из них. С units=True каждая штука -
+    отдельный предмет: пачки нельзя делить между рюкзаками, поэтому точный
+    перебор по пачкам мог бы пропустить лучшее распределение.
+    """
+    value = value or weight_value
+    problem = _Problem([], bags)
+    for name, data in items.items():
+        w = int(data[WEIGHT_KEY])
+        v = volume_units(data.get(VOLUME_KEY, 0))
+        val = int(value(name, data))
+        fit = [_fit_count(problem, b, w, v) for b in range(len(bags))]
+        largest = 1 if units else max(fit)
+        for part in split_quantity(min(quantity(data), sum(fit))):
+            while part > 0:
+                piece = min(part, largest)
+                problem.items.append((name, w * piece, v * piece, val * piece))
+                problem.counts.append(piece)
+                part -= piece
+    return problem
+
+
+def _fit_count(problem, b, w, v):
+    """Сколько штук предмета влезает в пустой рюкзак b"""
+    if not problem.fits(b, w, v, 0, 0):
+        return 0
+    count = problem.weight_caps[b] // w if w else None
+    cap_v = problem.volume_caps[b]
+    if v and cap_v is not None:
+        count = cap_v // v if count is None else min(count, cap_v // v)
+    # Невесомый предмет без объема влезает в любом количестве
+    return float("inf") if count is None else count
+
+
+def _size_keys(problem):
+    """Размер предмета относительно средней емкости рюкзака"""
+    count = len(problem.weight_caps)
+    avg_w = sum(problem.weight_caps) / count or 1
+    caps_v = [cap for cap in problem.volume_caps if cap]
+    avg_v = sum(caps_v) / len(caps_v) if caps_v else 0
+    return [w / avg_w + (v / avg_v if avg_v else 0) for _, w, v, _ in problem.items]
+
+
+def first_fit_decreasing(problem, order):
+    """Каждый предмет по порядку кладется в первый рюкзак, где он помещается"""
+    state = _State(problem)
+    bags = sorted(range(len(problem.weight_caps)), key=lambda b: -problem.weight_caps[b])
+    for i in order:
+        for b in bags:
+            if state.fits(b, i):
+                state.move(i, b)
+                break
+    return state
+
+
+def worst_fit_decreasing(problem, order):
+    """Каждый предмет по порядку кладется туда, где загрузка после него будет меньше"""
+    state = _State(problem)
+    count = len(problem.weight_caps)
+    for i in order:
+        _, w, v, _ = problem.items[i]
+        fitting = [b for b in range(count) if state.fits(b, i)]
+        if fitting:
+            state.move(i, min(fitting, key=lambda b: state.ratio_with(b, w, v)))
+    return state
+
+
+def _improve_value(state):
+    """Пытается уложить неуложенные предметы: напрямую, обменом или
+    переносом мешающего предмета в другой рюкзак"""
+    problem = state.problem
+    count = len(state.load_w)
+    improved = False
+    outside = sorted((i for i, b in enumerate(state.bag_of) if b < 0),
+                     key=lambda i: -problem.items[i][3])
+    for i in outside:
+        val_i = problem.items[i][3]
+        fitting = [b for b in range(count) if state.fits(b, i)]
+        if fitting:
+            _, w, v, _ = problem.items[i]
+            state.move(i, min(fitting, key=lambda b: state.ratio_with(b, w, v)))
+            improved = True
+            continue
+        for j, b in enumerate(state.bag_of):
+            if b < 0 or not state.fits(b, i, without=j):
+                continue
+            # Переносим j в другой рюкзак, если там есть место, иначе
+            # меняем на i, если i ценнее
+            target = next((c for c in range(count) if c != b and state.fits(c, j)), None)
+            if target is not None:
+                state.move(j, target)
+            elif problem.items[j][3] < val_i:
+                state.move(j, -1)
+            else:
+                continue
+            state.move(i, b)
+            improved = True
+            break
+    return improved
+
+
+def _improve_balance(state):
+    """Перекладывает предметы из самого загруженного рюкзака, пока это снижает его загрузку"""
+    problem = state.problem
+    count = len(state.load_w)
+    if count < 2:
+        return False
+    improved = False
+    while not state.balanced():
+        top = max(range(count), key=state.ratio)
+        top_ratio = state.ratio(top)
+        best = None
+        members = [i for i, b in enumerate(state.bag_of) if b == top]
+        others = [i for i, b in enumerate(state.bag_of) if 0 <= b != top]
+        for i in members:
+            _, w, v, _ = problem.items[i]
+            for c in range(count):
+                if c == top or not state.fits(c, i):
+                    continue
+                worst = max(state.ratio_with(top, -w, -v), state.ratio_with(c, w, v))
+                if worst < top_ratio - 1e-12 and (best is None or worst < best[0]):
+                    best = (worst, i, None, c)
+            for j in others:
+                c = state.bag_of[j]
+                _, wj, vj, _ = problem.items[j]
+                if wj >= w and vj >= v:
+                    continue  # Обмен на не меньший предмет загрузку не снизит
+                if not (problem.fits(top, wj, vj, state.load_w[top] - w, state.load_v[top] - v)
+                        and problem.fits(c, w, v, state.load_w[c] - wj, state.load_v[c] - vj)):
+                    continue
+                worst = max(state.ratio_with(top, wj - w, vj - v), state.ratio_with(c, w - wj, v - vj))
+                if worst < top_ratio - 1e-12 and (best is None or worst < best[0]):
+                    best = (worst, i, j, c)
+        if best is None:
+            break
+        _, i, j, c = best
+        if j is None:
+            state.move(i, c)
+        else:
+            state.move(j, -1)
+            state.move(i, c)
+            state.move(j, top)
+        improved = True
+    return improved
+
+
+def local_search(state, max_passes=50):
+    for _ in range(max_passes):
+        changed = _improve_value(state)
+        changed = _improve_balance(state) or changed
+        if not changed:
+            break
+    return state
+
+
+def _heuristic_run(problem, run, seed):
+    """Прогон номер run: четные начинают с FFD (плотнее при нехватке места),
+    нечетные - с выравнивающей раскладки; с третьего порядок возмущается"""
+    keys = _size_keys(problem)
+    if run >= 2:
+        rng = random.Random(seed * 1_000_003 + run)
+        keys = [key * (1 + ORDER_NOISE * rng.random()) for key in keys]
+    order = sorted(range(len(problem.items)), key=lambda i: -keys[i])
+    construct = first_fit_decreasing if run % 2 == 0 else worst_fit_decreasing
+    return local_search(construct(problem, order))
+
+
+def _restart_worker(task):
+    """Серия перезапусков в дочернем процессе; возвращает лучшее распределение"""
+    problem, runs, seed = task
+    best = None
+    for run in runs:
+        state = _heuristic_run(problem, run, seed)
+        if best is None or state.score() > best.score():
+            best = state
+    return best.bag_of
+
+
+def _heuristic(problem, restarts, jobs, seed, should_stop):
+    total = sum(item[3] for item in problem.items)
+    runs = list(range(restarts))
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(problem.items) * restarts >= PARALLEL_MIN_WORK:
+        # Первые два прогона без шума часто уже дают ответ - проверяем их сразу
+        best = None
+        for run in runs[:2]:
+            state = _heuristic_run(problem, run, seed)
+            if best is None or state.score() > best.score():
+                best = state
+        if best.value == total and best.balanced():
+            return best
+        chunks = [runs[2 + k::jobs] for k in range(jobs) if runs[2 + k::jobs]]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            futures = [executor.submit(_restart_worker, (problem, chunk, seed)) for chunk in chunks]
+            for future in futures:
+                if should_stop is not None and should_stop():
+                    for other in futures:
+                        other.cancel()
+                    raise SolveCancelled()
+                state = _State(problem, future.result())
+                if state.score() > best.score():
+                    best = state
+        return best
+    best = None
+    for run in runs:
+        if should_stop is not None and should_stop():
+            raise SolveCancelled()
+        state = _heuristic_run(problem, run, seed)
+        if best is None or state.score() > best.score():
+            best = state
+        if best.value == total and best.balanced():
+            break  # Все уложено и выровнено - перезапуски ничего не дадут
+    return best
+
+
+class _NodeLimit(Exception):
+    pass
+
+
+def _exact(problem, incumbent, node_limit, should_stop):
+    """Перебор с отсечением по ценности: оптимум по ценности для малых задач.
+
+    Возвращает (распределение, доказан ли оптимум).
+    """
+    items = problem.items
+    count = len(problem.weight_caps)
+    order = sorted(range(len(items)), key=lambda i: -items[i][3])
+    suffix = [0] * (len(order) + 1)
+    for k in range(len(order) - 1, -1, -1):
+        suffix[k] = suffix[k + 1] + items[order[k]][3]
+
+    best = [incumbent.value, list(incumbent.bag_of)]
+    bag_of = [-1] * len(items)
+    load_w = [0] * count
+    load_v = [0] * count
+    nodes = 0
+
+    def visit(k, value):
+        nonlocal nodes
+        nodes += 1
+        if nodes % STOP_CHECK_INTERVAL == 0 and should_stop is not None and should_stop():
+            raise SolveCancelled()
+        if node_limit is not None and nodes > node_limit:
+            raise _NodeLimit()
+        if value + suffix[k] <= best[0]:
+            return  # Даже все оставшиеся предметы не дадут улучшения
+        if k == len(order):
+            best[0] = value
+            best[1] = list(bag_of)
+            return
+        i = order[k]
+        _, w, v, val = items[i]
+        # Одинаковые пустые рюкзаки взаимозаменяемы - пробуем только один из них
+        tried_empty = set()
+        for b in range(count):
+            if load_w[b] == 0 and load_v[b] == 0:
+                caps = (problem.weight_caps[b], problem.volume_caps[b])
+                if caps in tried_empty:
+                    continue
+                tried_empty.add(caps)
+            if problem.fits(b, w, v, load_w[b], load_v[b]):
+                bag_of[i] = b
+                load_w[b] += w
+                load_v[b] += v
+                visit(k + 1, value + val)
+                load_w[b] -= w
+                load_v[b] -= v
+                bag_of[i] = -1
+        visit(k + 1, value)
+
+    try:
+        visit(0, 0)
+    except _NodeLimit:
+        return best[1], False
+    return best[1], True
+
+
+def _build_solution(problem, state, items, method, optimal):
+    counts = [{} for _ in problem.weight_caps]
+    left = {name: quantity(data) for name, data in items.items()}
+    for i, b in enumerate(state.bag_of):
+        if b >= 0:
+            name = problem.items[i][0]
+            counts[b][name] = counts[b].get(name, 0) + problem.counts[i]
+            left[name] -= problem.counts[i]
+    bags = [list(bag) for bag in counts]
+    unassigned_counts = {name: count for name, count in left.items() if count > 0}
+    weights = [sum(items[name][WEIGHT_KEY] * count for name, count in bag.items()) for bag in counts]
+    volumes = [round(sum(items[name].get(VOLUME_KEY, 0) * count for name, count in bag.items()), 3)
+               for bag in counts]
+    return MultiBagSolution(bags, list(unassigned_counts), weights, volumes, state.value, optimal,
+                            method, counts, unassigned_counts)
+
+
+def solve_multibag(items, bags, method="auto", value=None, restarts=DEFAULT_RESTARTS,
+                   jobs=None, seed=1, node_limit=EXACT_NODE_LIMIT, should_stop=None):
+    """Распределяет items ({название: данные}) по рюкзакам bags (список BagSpec).
+
+    method: "heuristic" - FFD и локальный поиск с перезапусками (параллельно
+    в jobs процессах), "exact" - перебор с отсечениями, "auto" - перебор
+    для не более EXACT_MAX_ITEMS предметов, иначе эвристика.
+    optimal в ответе означает доказанный максимум ценности.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод: {method}")
+    if not bags:
+        raise ValueError("Нужен хотя бы один рюкзак")
+    exact = method == "exact" or (method == "auto" and total_count(items) <= EXACT_MAX_ITEMS)
+    problem = _prepare(items, bags, value, units=exact)
+    state = _heuristic(problem, max(1, restarts), jobs, seed, should_stop)
+    total = sum(item[3] for item in problem.items)
+    if state.value == total and sum(problem.counts) == total_count(items):
+        return _build_solution(problem, state, items, "heuristic", True)
+
+    if exact:
+        bag_of, optimal = _exact(problem, state, node_limit, should_stop)
+        exact_state = _State(problem, bag_of)
+        if exact_state.value > state.value or (optimal and exact_state.value == state.value):
+            # Ценность доказанно лучшая; равномерность доводим локальным поиском
+            _improve_balance(exact_state)
+            return _build_solution(problem, exact_state, items, "exact", optimal)
+        return _build_solution(problem, state, items, "heuristic", optimal)
+    return _build_solution(problem, state, items, "heuristic", state.value == total)
@@ -0,0 +1,190 @@
+"""Фронт Парето укладок по весу, объему и приоритету.
+
+Точка фронта - набор предметов, помещающийся в рюкзак, для которого нет
+другого набора не тяжелее, не объемнее и с не меньшим суммарным
+приоритетом. Фронт строится добавлением предметов по одному: к каждой
+точке прежнего фронта пробуется добавить предмет, после чего
+доминируемые точки отбрасываются.
+
+Чтобы фронт оставался обозримым и для сотен предметов, плоскость
+(вес, объем) делится на FRONT_GRID x FRONT_GRID клеток и в каждой клетке
+остается одна точка; доминирование проверяется между клетками. Точность
+по весу и объему - размер клетки.
+
+ParetoExplorer хранит фронт после каждого добавленного предмета, поэтому
+при изменении списка пересчитываются только слои после первого
+изменившегося предмета.
+"""
+from knapsack import (STOP_CHECK_INTERVAL, VOLUME_KEY, VOLUME_SCALE, WEIGHT_KEY, SolveCancelled,
+                      priority, quantity, split_quantity, volume_units)
+
+# Клеток сетки по каждой оси
+FRONT_GRID = 48
+
+# Узел точки фронта: (вес, объем в дл, приоритет, родитель, название, штук).
+# Набор предметов восстанавливается по цепочке родителей.
+_EMPTY = (0, 0, 0, None, None, 0)
+
+
+class ParetoPoint:
+    """Точка фронта: суммарные вес (гр.), объем (л) и приоритет набора"""
+
+    __slots__ = ("weight", "volume", "priority", "_node")
+
+    def __init__(self, node):
+        self.weight = node[0]
+        self.volume = node[1] / VOLUME_SCALE
+        self.priority = node[2]
+        self._node = node
+
+    @property
+    def counts(self):
+        """Набор точки: {название: штук}"""
+        counts = {}
+        node = self._node
+        while node[3] is not None:
+            counts[node[4]] = counts.get(node[4], 0) + node[5]
+            node = node[3]
+        # Цепочка идет от последнего предмета к первому
+        return dict(reversed(list(counts.items())))
+
+    def __repr__(self):
+        return f"ParetoPoint({self.weight} гр., {self.volume:.1f} л, приоритет {self.priority})"
+
+
+def _item_key(data):
+    """Все, от чего зависит вклад предмета во фронт"""
+    return data[WEIGHT_KEY], volume_units(data.get(VOLUME_KEY, 0)), priority(data), quantity(data)
+
+
+class _Prefix:
+    """Максимум на префиксе (дерево Фенвика) для проверки доминирования"""
+
+    def __init__(self, size):
+        self.tree = [None] * (size + 1)
+
+    def query(self, j):
+        best = None
+        j += 1
+        tree = self.tree
+        while j > 0:
+            value = tree[j]
+            if value is not None and (best is None or value > best):
+                best = value
+            j -= j & -j
+        return best
+
+    def update(self, j, value):
+        j += 1
+        tree = self.tree
+        while j < len(tree):
+            if tree[j] is None or tree[j] < value:
+                tree[j] = value
+            j += j & -j
+
+
+class ParetoExplorer:
+    """Инкрементально поддерживаемый фронт Парето для меняющегося списка предметов"""
+
+    def __init__(self, grid=FRONT_GRID):
+        self.grid = grid
+        self._limits = None
+        self._keys = []  # (название, ключ предмета) в порядке добавления слоев
+        self._layers = [[_EMPTY]]  # фронт после 0, 1, 2... предметов
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, items, max_weight, max_volume=None, should_stop=None):
+        """Приводит фронт к items ({название: данные}) и емкости рюкзака.
+
+        max_weight в граммах, max_volume в литрах (None - без ограничения).
+        Слои для предметов, которые не изменились, переиспользуются; при
+        отмене через should_stop уже посчитанные слои сохраняются.
+        Возвращает список ParetoPoint по возрастанию веса.
+        """
+        limits = (max_weight, None if max_volume is None else volume_units(max_volume))
+        if limits != self._limits:
+            self._limits = limits
+            self._keys = []
+            self._layers = [[_EMPTY]]
+
+        # Оставляем самый длинный префикс прежних слоев, все предметы
+        # которого по-прежнему на месте, и досчитываем остальные. Точный
+        # фронт от порядка не зависит, но прореживание по сетке FRONT_GRID
+        # накапливает округление по слоям в порядке добавления, поэтому
+        # результат совпадает с расчетом с нуля только при том же порядке
+        wanted = {}
+        for name, data in items.items():
+            wanted[name] = _item_key(data)
+        kept = 0
+        for name, key in self._keys:
+            if wanted.get(name) != key:
+                break
+            kept += 1
+        del self._keys[kept:]
+        del self._layers[kept + 1:]
+        done = {name for name, _ in self._keys}
+
+        for name, key in wanted.items():
+            if name in done:
+                continue
+            if should_stop is not None and should_stop():
+                raise SolveCancelled()
+            self._layers.append(self._extend(self._layers[-1], name, key, should_stop))
+            self._keys.append((name, key))
+        return self.front()
+
+    def front(self):
+        """Текущий фронт: список ParetoPoint по возрастанию веса"""
+        return [ParetoPoint(node) for node in sorted(self._layers[-1])]
+
+    def _cell(self, w, v):
+        max_weight, volume_cap = self._limits
+        grid = self.grid
+        row = w * grid // (max_weight + 1)
+        col = v * grid // (volume_cap + 1) if volume_cap is not None else 0
+        return row, col
+
+    def _extend(self, front, name, key, should_stop=None):
+        """Фронт после добавления предмета: каждая пачка - шаг задачи 0/1"""
+        w, v, p, count = key
+        max_weight, volume_cap = self._limits
+        for part in split_quantity(count):
+            pw, pv, pp = w * part, v * part, p * part
+            if pw > max_weight or (volume_cap is not None and pv > volume_cap):
+                break
+            candidates = list(front)
+            for i, node in enumerate(front):
+                if should_stop is not None and i % STOP_CHECK_INTERVAL == 0 and should_stop():
+                    raise SolveCancelled()
+                nw, nv = node[0] + pw, node[1] + pv
+                if nw <= max_weight and (volume_cap is None or nv <= volume_cap):
+                    candidates.append((nw, nv, node[2] + pp, node, name, part))
+            front = self._prune(candidates)
+        return front
+
+    def _prune(self, candidates):
+        """Одна точка на клетку, затем отбрасываются клетки, над которыми
+        есть клетка не правее, не выше и с не меньшим приоритетом"""
+        cells = {}
+        for node in candidates:
+            cell = self._cell(node[0], node[1])
+            best = cells.get(cell)
+            if best is None or node[2] > best[2] or (
+                    node[2] == best[2] and node[0] + node[1] < best[0] + best[1]):
+                cells[cell] = node
+        prefix = _Prefix(self.grid)
+        front = []
+        for (row, col), node in sorted(cells.items()):
+            best = prefix.query(col)
+            if best is not None and best >= node[2]:
+                continue
+            prefix.update(col, node[2])
+            front.append(node)
+        return front
+
+
+def pareto_front(items, max_weight, max_volume=None, grid=FRONT_GRID, should_stop=None):
+    """Фронт Парето для items без сохранения промежуточных слоев"""
+    return ParetoExplorer(grid).update(items, max_weight, max_volume, should_stop)
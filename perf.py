@@ -0,0 +1,222 @@
+"""Замеры времени горячих путей программы.
+
+Функции и методы для замера регистрируются через register (для решателей
+- register_solvers), а включаются на ходу: enable() подменяет их на
+обертки, которые пишут время вызова в кольцевой буфер, disable()
+возвращает исходные. Выключенные замеры поэтому ничего не стоят: в
+программе работают те же функции, что и без этого модуля.
+
+Функция-генератор (например, anytime.solve_anytime) замеряется целиком:
+от первого шага до конца, отмены или закрытия, вместе с паузами между
+шагами.
+
+Важно: обертка видна только тем, кто берет функцию через модуль или
+класс в момент вызова. Связанный метод, заранее переданный в
+signal.connect, или функция, импортированная через from ... import,
+останутся без замера.
+
+Из буфера считаются процентили по каждому участку (stats) и
+выгружается трасса для chrome://tracing и Perfetto (export_chrome_trace).
+"""
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+from array import array
+from time import perf_counter
+
+from bpc_io import atomic_write
+
+# Сколько последних вызовов хранит кольцевой буфер
+RING_SIZE = 1 << 16
+
+
+def percentile(values, fraction):
+    """Процентиль по отсортированному списку (ближайший ранг)"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class RingBuffer:
+    """Последние size замеров в заранее выделенных столбцах array.
+
+    Место под запись выдает itertools.count, следующий номер которого
+    берется атомарно под GIL, поэтому писать можно из любого потока.
+    """
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.labels = array("H", bytes(2 * size))
+        self.starts = array("d", bytes(8 * size))
+        self.durations = array("d", bytes(8 * size))
+        self.threads = array("Q", bytes(8 * size))
+        self.clear()
+
+    def clear(self):
+        self._counter = itertools.count()
+        self.total = 0  # Сколько замеров записано с последней очистки
+
+    def record(self, label, start, duration):
+        i = next(self._counter)
+        j = i % self.size
+        self.labels[j] = label
+        self.starts[j] = start
+        self.durations[j] = duration
+        self.threads[j] = threading.get_ident()
+        self.total = i + 1
+
+    def samples(self):
+        """Замеры (участок, начало, длительность, поток) от старых к новым"""
+        total = self.total
+        count = min(total, self.size)
+        first = total - count
+        return [(self.labels[j], self.starts[j], self.durations[j], self.threads[j])
+                for j in (i % self.size for i in range(first, total))]
+
+
+class _Probe:
+    """Зарегистрированная точка замера: owner.attribute"""
+
+    __slots__ = ("owner", "attribute", "label_id", "original")
+
+    def __init__(self, owner, attribute, label_id):
+        self.owner = owner
+        self.attribute = attribute
+        self.label_id = label_id
+        self.original = None
+
+
+buffer = RingBuffer()
+_labels = []  # номер участка -> название
+_probes = {}  # (id(owner), attribute) -> _Probe
+_enabled = False
+
+
+def _timed(function, label_id):
+    if inspect.isgeneratorfunction(function):
+        return _timed_generator(function, label_id)
+    record = buffer.record
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(label_id, start, perf_counter() - start)
+    return timed
+
+
+def _timed_generator(function, label_id):
+    record = buffer.record
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return (yield from function(*args, **kwargs))
+        finally:
+            record(label_id, start, perf_counter() - start)
+    return timed
+
+
+def _install(probe):
+    probe.original = vars(probe.owner)[probe.attribute]
+    setattr(probe.owner, probe.attribute, _timed(probe.original, probe.label_id))
+
+
+def _uninstall(probe):
+    setattr(probe.owner, probe.attribute, probe.original)
+    probe.original = None
+
+
+def register(owner, attribute, label=None):
+    """Добавляет функцию модуля или метод класса owner в замеры.
+
+    Повторная регистрация того же атрибута ничего не меняет. Если замеры
+    уже включены, обертка ставится сразу.
+    """
+    key = (id(owner), attribute)
+    if key in _probes:
+        return
+    if attribute not in vars(owner):
+        raise AttributeError(f"{owner.__name__}.{attribute} не определен")
+    _labels.append(label or f"{owner.__name__}.{attribute}")
+    probe = _probes[key] = _Probe(owner, attribute, len(_labels) - 1)
+    if _enabled:
+        _install(probe)
+
+
+def register_solvers(module, prefix="solve"):
+    """Регистрирует все функции модуля, имена которых начинаются с prefix,
+    поэтому новые решатели попадают в замеры без отдельной строки"""
+    for name, value in list(vars(module).items()):
+        if (name.startswith(prefix) and callable(value)
+                and getattr(value, "__module__", None) == module.__name__):
+            register(module, name)
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    if not _enabled:
+        for probe in _probes.values():
+            _install(probe)
+        _enabled = True
+
+
+def disable():
+    global _enabled
+    if _enabled:
+        for probe in _probes.values():
+            _uninstall(probe)
+        _enabled = False
+
+
+def clear():
+    buffer.clear()
+
+
+def stats():
+    """{участок: {"count", "mean", "p50", "p95", "p99", "max"}} в миллисекундах
+    по замерам, которые еще лежат в буфере"""
+    durations = {}
+    for label, _, duration, _ in buffer.samples():
+        durations.setdefault(_labels[label], []).append(duration * 1000)
+    result = {}
+    for label, values in sorted(durations.items()):
+        values.sort()
+        result[label] = {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1],
+        }
+    return result
+
+
+def export_chrome_trace(file_name):
+    """Сохраняет буфер в формате Trace Event (chrome://tracing, Perfetto)"""
+    samples = buffer.samples()
+    origin = min((start for _, start, _, _ in samples), default=0.0)
+    pid = os.getpid()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    events = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": names[tid]}}
+        for tid in sorted({sample[3] for sample in samples}) if tid in names
+    ]
+    events.extend(
+        {"name": _labels[label], "cat": "backpack", "ph": "X", "pid": pid, "tid": tid,
+         "ts": round((start - origin) * 1e6, 3), "dur": round(duration * 1e6, 3)}
+        for label, start, duration, tid in samples
+    )
+    with atomic_write(file_name, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, ensure_ascii=False)
@@ -0,0 +1,44 @@
+"""Встроенные наборы снаряжения, которыми заполняется каталог при первом запуске."""
+
+PRESET_ITEMS = {
+    "Базовое снаряжение": {
+        "Документы, билеты, деньги": {"вес": 100, "объем": 0.2},
+        "Чехол от дождя для рюкзака": {"вес": 200, "объем": 0.3},
+        "Спальный мешок -10°C": {"вес": 1800, "объем": 8.0},
+        "Средства личной гигиены": {"вес": 400, "объем": 1.5},
+        "Крем от солнца SF 70-110": {"вес": 150, "объем": 0.2},
+        "Гигиеническая помада SF": {"вес": 20, "объем": 0.1},
+        "Фонарик налобный": {"вес": 150, "объем": 0.3},
+        "Очки солнцезащитные": {"вес": 150, "объем": 0.5},
+        "Треккинговые палки": {"вес": 500, "объем": 1.0}
+    },
+    "Одежда": {
+        "Треккинговые ботинки": {"вес": 1200, "объем": 4.0},
+        "Кроссовки легкие": {"вес": 800, "объем": 3.0},
+        "Пуховка": {"вес": 800, "объем": 4.0},
+        "Штормовка": {"вес": 400, "объем": 2.0},
+        "Футболка": {"вес": 150, "объем": 0.5},
+        "Носки треккинговые": {"вес": 100, "объем": 0.2, "количество": 2},
+        "Носки обычные": {"вес": 75, "объем": 0.15, "количество": 2},
+        "Нижнее бельё (комплект)": {"вес": 200, "объем": 0.5},
+        "Флисовая кофта": {"вес": 400, "объем": 2.0},
+        "Термобелье верх": {"вес": 250, "объем": 0.8},
+        "Термобелье низ": {"вес": 250, "объем": 0.8},
+        "Штаны ходовые": {"вес": 400, "объем": 1.5},
+        "Шорты": {"вес": 200, "объем": 0.7},
+        "Шапка тёплая": {"вес": 100, "объем": 0.3},
+        "Панамка": {"вес": 100, "объем": 0.3},
+        "Перчатки флисовые": {"вес": 150, "объем": 0.3},
+        "Перчатки виндстопер": {"вес": 100, "объем": 0.3},
+        "Баф": {"вес": 50, "объем": 0.2},
+        "Дождевик": {"вес": 300, "объем": 1.0}
+    },
+    "Электроника": {
+        "Телефон": {"вес": 200, "объем": 0.3},
+        "Зарядное устройство": {"вес": 150, "объем": 0.2},
+        "Повербанк": {"вес": 350, "объем": 0.4},
+        "GPS навигатор": {"вес": 250, "объем": 0.3},
+        "Рация": {"вес": 300, "объем": 0.4},
+        "Запасные батарейки": {"вес": 100, "объем": 0.2}
+    }
+}
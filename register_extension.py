@@ -1,9 +1,12 @@
-import winreg
 import os
 import sys
-import shutil
 
 def register_file_type():
+    # Ассоциация файлов через реестр есть только в Windows
+    if sys.platform != "win32":
+        return False
+    import winreg
+    
     file_ext = '.bpc'
     file_type = 'Backpack Calculator'
     file_desc = 'Backpack Calculator Datafile'
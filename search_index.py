@@ -0,0 +1,234 @@
+"""Инкрементальный поисковый индекс по названиям предметов.
+
+Названия нормализуются (регистр, ё -> е) и раскладываются на триграммы;
+для запросов короче трех символов используются начала слов. Индекс
+обновляется по одному названию, без перестройки.
+"""
+import heapq
+import re
+from collections import defaultdict
+
+from catalog import name_key
+from knapsack import STOP_CHECK_INTERVAL, SolveCancelled
+
+# Сколько результатов возвращать по умолчанию
+RESULT_LIMIT = 200
+# Пересечение списков триграмм прекращается, когда кандидатов осталось
+# столько - их дешевле проверить подстрокой
+CANDIDATES_ENOUGH = 64
+
+_WORDS = re.compile(r"\w+")
+
+
+def _normalize(text):
+    """Ключ поиска: нормализованные слова через один пробел"""
+    return " ".join(_WORDS.findall(name_key(text)))
+
+
+def _trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+def _prefixes(key):
+    """Начала слов длиной 1 и 2 - для коротких запросов"""
+    words = key.split()
+    return {word[:1] for word in words} | {word[:2] for word in words}
+
+
+def _has_word_prefix(key, token):
+    return key.startswith(token) or " " + token in key
+
+
+class SearchIndex:
+    """Индекс названий одного источника: название -> данные предмета"""
+
+    def __init__(self):
+        self._keys = []  # id -> нормализованное название или None
+        self._names = []  # id -> исходное название
+        self._data = []  # id -> данные
+        self._ids = {}  # название -> id
+        self._free = []
+        self._trigrams = defaultdict(set)
+        self._prefixes = defaultdict(set)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def add(self, name, data):
+        """Добавляет название или обновляет его данные"""
+        item_id = self._ids.get(name)
+        if item_id is not None:
+            self._data[item_id] = data
+            return
+        key = _normalize(name)
+        if self._free:
+            item_id = self._free.pop()
+            self._keys[item_id] = key
+            self._names[item_id] = name
+            self._data[item_id] = data
+        else:
+            item_id = len(self._keys)
+            self._keys.append(key)
+            self._names.append(name)
+            self._data.append(data)
+        self._ids[name] = item_id
+        trigrams = self._trigrams
+        for gram in _trigrams(key):
+            trigrams[gram].add(item_id)
+        prefixes = self._prefixes
+        for gram in _prefixes(key):
+            prefixes[gram].add(item_id)
+
+    def add_many(self, pairs):
+        for name, data in pairs:
+            self.add(name, data)
+
+    def remove(self, name):
+        item_id = self._ids.pop(name, None)
+        if item_id is None:
+            return
+        key = self._keys[item_id]
+        for gram in _trigrams(key):
+            self._discard(self._trigrams, gram, item_id)
+        for gram in _prefixes(key):
+            self._discard(self._prefixes, gram, item_id)
+        self._keys[item_id] = self._names[item_id] = self._data[item_id] = None
+        self._free.append(item_id)
+
+    @staticmethod
+    def _discard(postings, gram, item_id):
+        ids = postings[gram]
+        ids.discard(item_id)
+        if not ids:
+            del postings[gram]
+
+    def clear(self):
+        self.__init__()
+
+    def _postings(self, token):
+        """Множества id, в каждом из которых обязано быть подходящее название"""
+        if len(token) < 3:
+            return [self._prefixes.get(token, set())]
+        return [self._trigrams.get(gram, set()) for gram in _trigrams(token)]
+
+    def search_ranked(self, text, limit=RESULT_LIMIT):
+        """Список (ранг, название, данные), отсортированный по рангу.
+
+        Ранг: 0 - точное совпадение, 1 - название начинается с запроса,
+        2 - каждое слово запроса начинает какое-то слово названия,
+        3 - длинные слова запроса встречаются внутри названия.
+        """
+        query = _normalize(text)
+        tokens = set(query.split())
+        if not tokens:
+            return []
+        postings = sorted((ids for token in tokens for ids in self._postings(token)), key=len)
+        candidates = postings[0]
+        for ids in postings[1:]:
+            if len(candidates) <= CANDIDATES_ENOUGH:
+                break
+            candidates = candidates & ids
+        if not candidates:
+            return []
+
+        keys = self._keys
+        buckets = ([], [], [], [])
+        if len(tokens) == 1 and len(query) < 3:
+            # Одно короткое слово: кандидаты уже точно начинают слово с него
+            for item_id in candidates:
+                key = keys[item_id]
+                buckets[0 if key == query else 1 if key.startswith(query) else 2].append(item_id)
+        elif len(tokens) == 1:
+            spaced = " " + query
+            for item_id in candidates:
+                key = keys[item_id]
+                if key.startswith(query):
+                    buckets[0 if key == query else 1].append(item_id)
+                elif spaced in key:
+                    buckets[2].append(item_id)
+                elif query in key:
+                    buckets[3].append(item_id)
+        else:
+            short = [token for token in tokens if len(token) < 3]
+            long = [token for token in tokens if len(token) >= 3]
+            for item_id in candidates:
+                key = keys[item_id]
+                if key == query:
+                    buckets[0].append(item_id)
+                elif key.startswith(query):
+                    buckets[1].append(item_id)
+                elif not all(_has_word_prefix(key, token) for token in short):
+                    continue
+                elif all(_has_word_prefix(key, token) for token in long):
+                    buckets[2].append(item_id)
+                elif all(token in key for token in long):
+                    buckets[3].append(item_id)
+
+        # Внутри ранга - сначала короткие названия; сортируется только нужная часть
+        def order(item_id):
+            return len(keys[item_id]), keys[item_id]
+        result = []
+        for rank, ids in enumerate(buckets):
+            need = limit - len(result)
+            if need <= 0:
+                break
+            chosen = heapq.nsmallest(need, ids, key=order) if len(ids) > need else sorted(ids, key=order)
+            result.extend(((rank,) + order(item_id), self._names[item_id], self._data[item_id])
+                          for item_id in chosen)
+        return result
+
+    def search(self, text, limit=RESULT_LIMIT):
+        """Список (название, данные) по убыванию релевантности"""
+        return [(name, data) for _, name, data in self.search_ranked(text, limit)]
+
+    def follow(self, inventory):
+        """Заполняет индекс из Inventory и дальше обновляет его по событиям"""
+        self.add_many(inventory.items())
+
+        def on_changed(event, *args):
+            if event == "add":
+                self.add(args[0], args[1])
+            elif event == "extend":
+                self.add_many(args[0])
+            elif event == "remove":
+                self.remove(args[0])
+            elif event == "replace":
+                self.remove(args[0])
+                self.add(args[1], args[3])
+            elif event == "reset":
+                self.clear()
+                self.add_many(inventory.items())
+        inventory.subscribe(on_changed)
+        return on_changed
+
+
+def build_index(pairs, should_stop=None):
+    """Строит индекс по списку (название, данные); подходит для BackgroundSolver.submit"""
+    index = SearchIndex()
+    for i, (name, data) in enumerate(pairs):
+        if should_stop is not None and i % STOP_CHECK_INTERVAL == 0 and should_stop():
+            raise SolveCancelled()
+        index.add(name, data)
+    return index
+
+
+def search_all(indexes, text, limit=RESULT_LIMIT):
+    """Поиск сразу по нескольким индексам {источник: SearchIndex}.
+
+    Возвращает список (название, {источник: данные}); название, найденное
+    в нескольких источниках, встречается один раз.
+    """
+    merged = {}
+    for source, index in indexes.items():
+        for order, name, data in index.search_ranked(text, limit):
+            if name in merged:
+                best, sources = merged[name]
+                sources[source] = data
+                merged[name] = (min(best, order), sources)
+            else:
+                merged[name] = (order, {source: data})
+    ranked = heapq.nsmallest(limit, merged.items(), key=lambda item: item[1][0])
+    return [(name, sources) for name, (_, sources) in ranked]
@@ -0,0 +1,410 @@
+"""HTTP-сервис подбора укладки без интерфейса.
+
+POST /solve принимает JSON в формате файла .bpc
+({"max_weight": кг, "max_volume": л, "items": {...}}) и необязательные
+"method", "goal" ("weight" или "priority") и "eps", а возвращает
+выбранные предметы и итоги. Поле "bags" пока не учитывается: решается
+один рюкзак. GET /metrics - очередь, задержки и счетчики, GET /health -
+проверка, что сервис жив.
+
+Одинаковые одновременные запросы решаются один раз: ключ - fingerprint
+из solver_cache, а недавние ответы берутся из SolverCache. Маленькие
+задачи собираются в пачки и уходят в пул процессов одной отправкой,
+большие отправляются по одной.
+
+Пример:
+    python solve_service.py --port 8765 --workers 4
+    python solve_service.py --unix /tmp/backpack.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import knapsack
+from batch_solve import DEFAULT_MAX_VOLUME, DEFAULT_MAX_WEIGHT
+from knapsack import PRIORITY_KEY, QUANTITY_KEY, VOLUME_KEY, WEIGHT_KEY
+from perf import percentile
+from solver_cache import SolverCache, fingerprint
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Задачи не больше стольких штук предметов собираются в пачки
+SMALL_JOB_ITEMS = 200
+# Наибольший размер пачки и время ожидания ее заполнения (с)
+BATCH_SIZE = 32
+BATCH_WINDOW = 0.002
+# Сколько последних ответов хранится в кэше
+CACHE_ENTRIES = 1024
+# Сколько последних задержек учитывается в процентилях
+LATENCY_WINDOW = 4096
+# Наибольший размер тела запроса (байт)
+MAX_BODY = 16 * 1024 * 1024
+
+# Функции ценности по цели подбора, как в выпадающем списке окна программы
+GOALS = {"weight": None, "priority": knapsack.priority_value}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _valid_item(item, goal):
+    """Проверяет сырые поля предмета, не приводя их к числу: 2.7 штуки
+    иначе молча стали бы двумя"""
+    if not isinstance(item, dict) or not _is_count(item.get(WEIGHT_KEY)):
+        return False
+    volume = item.get(VOLUME_KEY, 0)
+    if not _is_number(volume) or volume < 0 or not _is_count(item.get(QUANTITY_KEY, 1)):
+        return False
+    return goal != "priority" or _is_number(item.get(PRIORITY_KEY, 1))
+
+
+def parse_request(data):
+    """Проверяет тело запроса и возвращает задачу
+    (items, вес в граммах, объем в литрах или None, method, goal, eps)"""
+    if not isinstance(data, dict) or not isinstance(data.get("items"), dict):
+        raise ValueError("Ожидается объект с полем items")
+    goal = data.get("goal", "weight")
+    if goal not in GOALS:
+        raise ValueError(f"Неизвестная цель: {goal}")
+    items = data["items"]
+    for name, item in items.items():
+        if not _valid_item(item, goal):
+            raise ValueError(f"Неверные данные предмета {name!r}")
+    max_weight = data.get("max_weight", DEFAULT_MAX_WEIGHT)
+    max_volume = data.get("max_volume", DEFAULT_MAX_VOLUME)
+    if not _is_number(max_weight) or max_weight < 0:
+        raise ValueError("Неверный max_weight")
+    if max_volume is not None and (not _is_number(max_volume) or max_volume < 0):
+        raise ValueError("Неверный max_volume")
+    method = data.get("method", "auto")
+    if method not in knapsack.METHODS:
+        raise ValueError(f"Неизвестный метод: {method}")
+    eps = data.get("eps")
+    if eps is not None and (not _is_number(eps) or not 0 <= eps < 1):
+        raise ValueError("eps должен быть от 0 до 1")
+    return items, int(round(max_weight * 1000)), max_volume, method, goal, eps or None
+
+
+def solve_job(job):
+    """Решает одну задачу (выполняется в дочернем процессе)"""
+    items, max_weight, max_volume, method, goal, eps = job
+    return knapsack.solve(items, max_weight, max_volume, method, GOALS[goal], eps)
+
+
+def solve_batch(jobs):
+    """Решает пачку задач; ошибка одной задачи не мешает остальным.
+    Возвращает список пар (Solution или None, исключение или None)"""
+    results = []
+    for job in jobs:
+        try:
+            results.append((solve_job(job), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
+def solution_payload(solution, items):
+    """Ответ /solve: решение и итоги"""
+    payload = solution.to_dict()
+    payload["items_total"] = knapsack.total_count(items)
+    payload["packed_count"] = solution.total_count
+    return payload
+
+
+class ServiceMetrics:
+    """Счетчики и окно последних задержек"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.solved = 0
+        self.batches = 0
+        self.queue_depth = 0  # задачи в пачке или в пуле процессов
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self, cache):
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "uptime": round(uptime, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "solved": self.solved,
+            "solves_per_second": round(self.solved / uptime, 2) if uptime else 0.0,
+            "batches": self.batches,
+            "mean_batch": round(self.solved / self.batches, 2) if self.batches else 0.0,
+            "queue_depth": self.queue_depth,
+            "latency_ms": {
+                name: None if value is None else round(value * 1000, 3)
+                for name, value in (("p50", percentile(latencies, 0.50)),
+                                    ("p95", percentile(latencies, 0.95)),
+                                    ("p99", percentile(latencies, 0.99)))
+            },
+            "cache": cache.stats(),
+        }
+
+
+class SolveService:
+    """Склейка одинаковых запросов, пачки маленьких задач и пул процессов"""
+
+    def __init__(self, workers=None, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW,
+                 cache_entries=CACHE_ENTRIES):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.cache = SolverCache(cache_entries)
+        self.metrics = ServiceMetrics()
+        self._inflight = {}  # ключ -> задача asyncio, которую ждут одинаковые запросы
+        self._batch = []  # (задача, future) ждущие отправки пачкой
+        self._flush_handle = None
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def solve(self, data):
+        """Решение для тела запроса /solve; ValueError - неверный запрос"""
+        job = parse_request(data)
+        items, max_weight, max_volume, method, goal, eps = job
+        key = fingerprint(items, max_weight, max_volume, [method, goal, eps])
+        solution = self.cache.get(key)
+        if solution is not None:
+            self.metrics.cache_hits += 1
+        else:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._run(key, job))
+                # Ошибку забирают ждущие запросы; если все они отключились - здесь
+                task.add_done_callback(lambda done: done.cancelled() or done.exception())
+                self._inflight[key] = task
+            else:
+                self.metrics.coalesced += 1
+            # shield: отключение одного клиента не отменяет решение для остальных
+            solution = await asyncio.shield(task)
+        return solution_payload(solution, items)
+
+    async def _run(self, key, job):
+        self.metrics.queue_depth += 1
+        try:
+            if knapsack.total_count(job[0]) <= SMALL_JOB_ITEMS:
+                solution, error = await self._enqueue(job)
+            else:
+                loop = asyncio.get_running_loop()
+                solution, error = (await loop.run_in_executor(self.pool, solve_batch, [job]))[0]
+                self.metrics.batches += 1
+        finally:
+            self.metrics.queue_depth -= 1
+            del self._inflight[key]
+        self.metrics.solved += 1
+        if error is not None:
+            raise error
+        self.cache.put(key, solution)
+        return solution
+
+    def _enqueue(self, job):
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((job, future))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        """Отправляет накопленную пачку в пул одной задачей"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        self.metrics.batches += 1
+        done = asyncio.wrap_future(self.pool.submit(solve_batch, [job for job, _ in batch]))
+
+        def on_done(done):
+            if done.cancelled():
+                error = RuntimeError("Пул процессов остановлен")
+            else:
+                error = done.exception()
+            for i, (_, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[i])
+        done.add_done_callback(on_done)
+
+    # HTTP
+
+    async def handle_client(self, reader, writer):
+        """Обслуживает одно соединение; HTTP/1.1 держит соединение открытым"""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as e:
+                    writer.write(_response(e.status, {"error": str(e)}, False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, keep_alive, body = request
+                status, payload = await self.dispatch(method, path, body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        """(статус, тело ответа) для запроса"""
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            return 200, self.metrics.to_dict(self.cache)
+        if path != "/solve":
+            return 404, {"error": f"Нет такого адреса: {path}"}
+        if method != "POST":
+            return 405, {"error": "Ожидается POST"}
+
+        started = time.perf_counter()
+        self.metrics.requests += 1
+        try:
+            payload = await self.solve(json.loads(body))
+            status = 200
+        except ValueError as e:  # и неверный JSON
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        if status != 200:
+            self.metrics.errors += 1
+        self.metrics.latencies.append(time.perf_counter() - started)
+        return status, payload
+
+
+async def _read_request(reader):
+    """(метод, путь, keep_alive, тело) или None, если клиент закрыл соединение"""
+    try:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HttpError(400, "Неверная строка запроса")
+        method, path, version = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+    except ValueError:  # строка длиннее буфера StreamReader
+        raise HttpError(400, "Слишком длинный заголовок")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Неверный Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, "Слишком большой запрос")
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+    return method, path, keep_alive, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, workers=None,
+                       batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW):
+    """Запускает сервис; возвращает (server asyncio, SolveService).
+
+    При остановке нужно закрыть оба: server.close() и service.close().
+    """
+    service = SolveService(workers, batch_size, batch_window)
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_client, unix_path)
+    else:
+        server = await asyncio.start_server(service.handle_client, host, port)
+    return server, service
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="HTTP-сервис подбора укладки рюкзака")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="ПУТЬ", help="слушать Unix-сокет вместо TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="число процессов решателя (по умолчанию все ядра)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW, metavar="С")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    server, service = await start_server(args.host, args.port, args.unix, args.workers,
+                                         args.batch_size, args.batch_window)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Сервис подбора укладки слушает {where}", file=sys.stderr, flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop.set)
+        except NotImplementedError:  # Windows: остановка через KeyboardInterrupt
+            pass
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        # Процессы пула завершаются вместе с сервисом
+        service.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
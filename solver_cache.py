@@ -0,0 +1,91 @@
+"""Кэш решений с вытеснением давно не использованных записей (LRU)."""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from knapsack import Solution
+
+CACHE_VERSION = 1
+DEFAULT_MAX_ENTRIES = 256
+
+
+def default_cache_file():
+    """Файл кэша лежит рядом с settings.json"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver_cache.json")
+
+
+def fingerprint(items, max_weight, max_volume, method="auto"):
+    """Стабильный между запусками ключ набора предметов и емкости рюкзака.
+
+    В ключ входят все поля предметов, а не только вес и объем, чтобы
+    новые поля тоже различали решения.
+    """
+    payload = json.dumps([items, max_weight, max_volume, method],
+                         ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SolverCache:
+    """LRU-кэш {ключ: Solution} с ограничением размера и счетчиками попаданий"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, file_name=None):
+        self.max_entries = max_entries
+        self.file_name = file_name
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        solution = self.entries.get(key)
+        if solution is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return solution
+
+    def put(self, key, solution):
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+        }
+
+    def load(self):
+        """Загружает кэш из файла; поврежденный или старый файл пропускается"""
+        if not self.file_name or not os.path.exists(self.file_name):
+            return
+        try:
+            with open(self.file_name, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != CACHE_VERSION:
+                return
+            for key, solution in data["entries"]:
+                self.put(key, Solution.from_dict(solution))
+        except (OSError, ValueError, KeyError, TypeError):
+            self.entries.clear()
+
+    def save(self):
+        if not self.file_name:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "entries": [[key, solution.to_dict()] for key, solution in self.entries.items()],
+        }
+        with open(self.file_name, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
@@ -0,0 +1,143 @@
+"""Фоновый подбор укладки рюкзака вне потока интерфейса."""
+import inspect
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+import knapsack
+
+# Задержка перед запуском решения, чтобы не считать на каждое нажатие (мс)
+DEBOUNCE_INTERVAL = 150
+
+
+class SolveSignals(QObject):
+    progress = pyqtSignal(int, object)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class SolveJob(QRunnable):
+    """Одна задача решения: function(*args, should_stop=...) над снимком данных.
+
+    Если function - генератор (как anytime.solve_anytime), выданные им
+    значения идут в сигнал progress, а возвращенное - в finished.
+    """
+
+    def __init__(self, job_id, function, args):
+        super().__init__()
+        self.job_id = job_id
+        self.function = function
+        self.args = args
+        self.signals = SolveSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        if self.cancel_event.is_set():
+            return
+        try:
+            solution = self.function(*self.args, should_stop=self.cancel_event.is_set)
+            if inspect.isgenerator(solution):
+                solution = self._run_steps(solution)
+        except knapsack.SolveCancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, str(e))
+            return
+        if not self.cancel_event.is_set():
+            self.signals.finished.emit(self.job_id, solution)
+
+    def _run_steps(self, steps):
+        while True:
+            try:
+                step = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            if self.cancel_event.is_set():
+                steps.close()
+                raise knapsack.SolveCancelled()
+            self.signals.progress.emit(self.job_id, step)
+
+
+class BackgroundSolver(QObject):
+    """Запускает решение в пуле потоков и отбрасывает устаревшие результаты.
+
+    request() можно вызывать на каждое изменение: частые вызовы
+    склеиваются таймером, а при новых входных данных текущая задача
+    отменяется. В сигнал solved попадает только результат последнего
+    запроса, в progress - только его промежуточные шаги.
+    """
+    started = pyqtSignal()
+    progress = pyqtSignal(object)
+    solved = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DEBOUNCE_INTERVAL)
+        self.timer.timeout.connect(self._start_job)
+        self.job_id = 0
+        self.current_job = None
+        self.pending = None
+
+    def request(self, items, max_weight, max_volume):
+        """Ставит решение в очередь; items - снимок, который больше не изменится"""
+        self.submit(knapsack.solve, items, max_weight, max_volume)
+
+    def submit(self, function, *args):
+        """Ставит в очередь произвольную функцию решателя с аргументом should_stop"""
+        self.pending = (function, args)
+        self.job_id += 1
+        self._cancel_current()
+        self.timer.start()
+
+    def cancel(self):
+        """Отменяет отложенный и выполняющийся запросы"""
+        self.timer.stop()
+        self.pending = None
+        self.job_id += 1
+        self._cancel_current()
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def _cancel_current(self):
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.current_job = None
+
+    def _start_job(self):
+        if self.pending is None:
+            return
+        function, args = self.pending
+        self.pending = None
+        job = SolveJob(self.job_id, function, args)
+        job.signals.progress.connect(self._on_progress)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        self.current_job = job
+        self.started.emit()
+        self.pool.start(job)
+
+    def _on_progress(self, job_id, step):
+        if job_id == self.job_id:
+            self.progress.emit(step)
+
+    def _on_finished(self, job_id, solution):
+        if job_id != self.job_id:
+            return
+        self.current_job = None
+        self.solved.emit(solution)
+
+    def _on_failed(self, job_id, message):
+        if job_id != self.job_id:
+            return
+        self.current_job = None
+        self.failed.emit(message)
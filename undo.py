@@ -0,0 +1,114 @@
+"""История правок списка предметов для отмены и повтора.
+
+Команды записываются из событий Inventory и хранят только изменение
+(предмет до и после), а не копию списка. Очистка и загрузка хранят
+прежнее содержимое целиком: Inventory заменяет структуры, а не меняет
+их, поэтому снимок ничего не стоит.
+"""
+from collections import deque
+
+# Сколько последних правок можно отменить
+UNDO_LIMIT = 500
+
+
+def describe(command):
+    """Короткое описание команды для пунктов меню"""
+    event = command[0]
+    if event == "add":
+        return f"добавление «{command[1]}»"
+    if event == "remove":
+        return f"удаление «{command[1]}»"
+    if event == "replace":
+        return f"изменение «{command[2]}»"
+    if event == "extend":
+        return f"добавление {len(command[1])} предм."
+    return "очистку списка"
+
+
+class UndoLog:
+    """Стеки отмены и повтора для Inventory ограниченной длины.
+
+    Пока paused, изменения не записываются (например, пачки предметов
+    при загрузке файла - отменяется она целиком через запись reset).
+    """
+
+    def __init__(self, inventory, limit=UNDO_LIMIT):
+        self.inventory = inventory
+        self._undo = deque(maxlen=limit)
+        self._redo = deque(maxlen=limit)
+        self._replaying = False
+        self.paused = False
+        inventory.subscribe(self._on_inventory_changed)
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_text(self):
+        return describe(self._undo[-1]) if self._undo else ""
+
+    def redo_text(self):
+        return describe(self._redo[-1]) if self._redo else ""
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    def undo(self):
+        """Отменяет последнюю правку; False, если отменять нечего"""
+        if not self._undo:
+            return False
+        self._redo.append(self._replay(self._undo.pop(), forward=False))
+        return True
+
+    def rollback(self):
+        """Отменяет последнюю правку без записи в стек повтора (например,
+        очистку перед прерванной загрузкой файла)"""
+        if self._undo:
+            self._replay(self._undo.pop(), forward=False)
+
+    def redo(self):
+        if not self._redo:
+            return False
+        self._undo.append(self._replay(self._redo.pop(), forward=True))
+        return True
+
+    def _on_inventory_changed(self, event, *args):
+        if self._replaying or self.paused:
+            return
+        self._undo.append((event,) + args)
+        self._redo.clear()
+
+    def _replay(self, command, forward):
+        """Применяет команду вперед или назад и возвращает ее для другого стека"""
+        inventory = self.inventory
+        event = command[0]
+        self._replaying = True
+        try:
+            if event == "reset":
+                # Обмен содержимым симметричен: то, что было, становится командой обратного хода
+                return ("reset", inventory.restore(command[1]))
+            if event == "add" or event == "remove":
+                _, name, data = command
+                if (event == "add") == forward:
+                    inventory.add(name, data)
+                else:
+                    inventory.remove(name)
+            elif event == "replace":
+                _, old_name, new_name, old_data, new_data = command
+                if forward:
+                    inventory.replace(old_name, new_name, new_data)
+                else:
+                    inventory.replace(new_name, old_name, old_data)
+            elif event == "extend":
+                pairs = command[1]
+                if forward:
+                    inventory.extend(pairs)
+                else:
+                    for name, _ in reversed(pairs):
+                        inventory.remove(name)
+        finally:
+            self._replaying = False
+        return command
@@ -0,0 +1,200 @@
+"""Подбор укладки с теплым стартом от прошлого вызова.
+
+После правки одного предмета не нужно решать всю задачу заново:
+
+- ДП: таблица хранится вместе со списком слоев (подготовленных пачек в
+  порядке добавления) и копиями значений после некоторых слоев. Неизменный
+  префикс слоев переиспользуется, а измененные и новые предметы
+  досчитываются в конец. Поэтому добавление предмета и повторная правка
+  последнего измененного стоят по одному слою на пачку, а правка
+  предмета в середине - слоев от ближайшей копии до конца.
+- Ветви и границы: прошлый оптимум, поправленный под новый список и
+  дополненный жадно, становится стартовым рекордом перебора, и перебору
+  остается в основном доказать, что лучше нет.
+"""
+from collections import Counter
+
+from knapsack import (FPTAS_NODE_LIMIT, DpTable, SolveCancelled, _all_fit, _bnb_pick,
+                      _density_order, _finish, _fptas_pick, _prepare, _solve_required,
+                      choose_method, mandatory)
+
+# Память под копии таблицы ДП, к которым можно откатиться (байт)
+WARM_MEMORY_LIMIT = 64 * 1024 * 1024
+
+
+class WarmStartSolver:
+    """Решатель, который помнит таблицу ДП и прошлый оптимум между вызовами.
+
+    solve принимает те же параметры, что knapsack.solve в режиме auto.
+    Вызовы должны идти по одному (в окне программы - в единственном
+    потоке BackgroundSolver). Отмена через should_stop оставляет
+    состояние согласованным: посчитанные слои сохраняются.
+    """
+
+    def __init__(self, memory_limit=WARM_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self.reset()
+
+    def reset(self):
+        self._table = None
+        self._table_key = None  # (функция ценности, есть ли ограничение объема)
+        self._layers = []  # подготовленные пачки в порядке слоев таблицы
+        self._checkpoints = {}  # число слоев -> copy_values таблицы после них
+        self._counts = None  # прошлый оптимум {название: штук}
+        self._value = None
+        # Слоев ДП, взятых из прошлого состояния и посчитанных в последнем вызове
+        self.reused_layers = 0
+        self.computed_layers = 0
+
+    def solve(self, items, max_weight, max_volume=None, value=None, eps=None, should_stop=None):
+        """Лучший набор для items, как knapsack.solve(..., method="auto")"""
+        required = {name: data for name, data in items.items() if mandatory(data)}
+        if required:
+            return _solve_required(items, required, max_weight, max_volume, "auto", value, eps,
+                                   should_stop, self._solve_rest)
+        return self._solve_free(items, max_weight, max_volume, value, eps, should_stop)
+
+    def _solve_rest(self, items, max_weight, max_volume, method, value, eps, should_stop):
+        return self._solve_free(items, max_weight, max_volume, value, eps, should_stop)
+
+    def _solve_free(self, items, max_weight, max_volume, value, eps, should_stop):
+        self.reused_layers = self.computed_layers = 0
+        prepared, volume_cap = _prepare(items, max_weight, max_volume, value)
+        if _all_fit(items, prepared, max_weight, volume_cap):
+            solution = _finish(items, prepared, range(len(prepared)), "all", True)
+        elif choose_method(prepared, max_weight, volume_cap) == "dp":
+            picked = self._dp_pick(prepared, max_weight, volume_cap, value, should_stop)
+            solution = _finish(items, self._layers, picked, "dp", True)
+        else:
+            incumbent = self._incumbent(prepared, max_weight, volume_cap, value)
+            picked, optimal = _bnb_pick(prepared, max_weight, volume_cap,
+                                        FPTAS_NODE_LIMIT if eps else None, should_stop, incumbent)
+            method = "bnb"
+            if not optimal and eps:
+                picked, optimal = _fptas_pick(prepared, max_weight, volume_cap, eps, should_stop, picked)
+                method = "fptas"
+            solution = _finish(items, prepared, picked, method, optimal)
+        self._counts = solution.counts
+        self._value = value
+        return solution
+
+    # Ветви и границы
+
+    def _incumbent(self, prepared, max_weight, volume_cap, value):
+        """Прошлый оптимум в индексах prepared: его пачки, пока хватает штук и
+        места, затем жадное дополнение; None, если прошлого оптимума нет"""
+        if self._counts is None or value is not self._value:
+            return None
+        remaining = dict(self._counts)
+        chosen = set()
+        rem_w, rem_v = max_weight, volume_cap or 0
+
+        def take(i):
+            nonlocal rem_w, rem_v
+            _, w, v, _, _ = prepared[i]
+            if w > rem_w or (volume_cap is not None and v > rem_v):
+                return False
+            chosen.add(i)
+            rem_w -= w
+            rem_v -= v
+            return True
+
+        # Крупные пачки первыми: так любое прежнее число штук набирается из пачек split_quantity
+        for i in sorted(range(len(prepared)), key=lambda i: -prepared[i][4]):
+            name, part = prepared[i][0], prepared[i][4]
+            if part <= remaining.get(name, 0) and take(i):
+                remaining[name] -= part
+        for i in _density_order(prepared, max_weight, volume_cap):
+            if i not in chosen:
+                take(i)
+        return sorted(chosen)
+
+    # ДП
+
+    def _dp_pick(self, prepared, max_weight, volume_cap, value, should_stop):
+        """Индексы self._layers лучшего набора; таблица досчитывается от прошлой"""
+        if not self._table_fits(prepared, max_weight, volume_cap, value):
+            self._table = DpTable(prepared, max_weight, volume_cap)
+            self._table.rewind(0, None)
+            self._table_key = (value, volume_cap is not None)
+            self._layers = []
+            self._checkpoints = {}
+
+        # Самый длинный префикс слоев, все пачки которого по-прежнему есть
+        wanted = Counter(prepared)
+        kept = 0
+        for piece in self._layers:
+            if wanted[piece] <= 0:
+                break
+            wanted[piece] -= 1
+            kept += 1
+        # Оставшиеся прежние пачки идут раньше новых и измененных: тогда
+        # следующая правка того же предмета снова затронет только конец
+        old, new = [], []
+        for pieces, target in ((self._layers[kept:], old), (prepared, new)):
+            for piece in pieces:
+                if wanted[piece] > 0:
+                    wanted[piece] -= 1
+                    target.append(piece)
+
+        for layers in [c for c in self._checkpoints if c > kept]:
+            del self._checkpoints[layers]
+        start = kept
+        if kept < len(self._layers):
+            start = max((c for c in self._checkpoints), default=0)
+            self._table.rewind(start, self._checkpoints.get(start))
+            old = self._layers[start:kept] + old
+            del self._layers[start:]
+        self.reused_layers = start
+        self.computed_layers = len(old) + len(new)
+
+        # Копии значений - через каждые stride слоев и перед новыми пачками
+        pieces = old + new
+        stride = max(1, (len(self._layers) + len(pieces)) // self._checkpoint_limit())
+        k = 0
+        while k < len(pieces):
+            end = min(len(pieces), k + stride)
+            if k < len(old) < end:
+                end = len(old)
+            self._save_checkpoint()
+            self._fold(pieces[k:end], should_stop)
+            k = end
+        return self._table.backtrack(max_weight, volume_cap)
+
+    def _table_fits(self, prepared, max_weight, volume_cap, value):
+        """Подходит ли прошлая таблица: та же ценность, тот же шаг и емкость не
+        больше таблицы (но и не намного меньше, чтобы не считать лишние ячейки)"""
+        table = self._table
+        if table is None or self._table_key != (value, volume_cap is not None) or not table.fits(prepared):
+            return False
+        rows = max_weight // table.weight_step + 1
+        cols = 1 if volume_cap is None else volume_cap // table.volume_step + 1
+        return rows <= table.rows and cols <= table.cols and table.rows * table.cols <= 2 * rows * cols
+
+    def _fold(self, pieces, should_stop):
+        self._layers.extend(pieces)
+        self._table.extend(pieces)
+        try:
+            self._table.fill(should_stop)
+        except SolveCancelled:
+            # Оставляем только посчитанные слои
+            done = len(self._table.decisions)
+            del self._layers[done:]
+            del self._table.scaled[done:]
+            raise
+
+    def _checkpoint_limit(self):
+        return max(2, self.memory_limit // (self._table.rows * self._table.cols * 8))
+
+    def _save_checkpoint(self):
+        layers = len(self._layers)
+        if not layers or layers in self._checkpoints:
+            return
+        self._checkpoints[layers] = self._table.copy_values()
+        limit = self._checkpoint_limit()
+        while len(self._checkpoints) > limit:
+            # Убираем копию, ближе всех стоящую к предыдущей (кроме последней):
+            # оставшиеся покрывают список равномернее
+            keys = sorted(self._checkpoints)
+            gaps = [(keys[k] - keys[k - 1], keys[k]) for k in range(1, len(keys) - 1)]
+            del self._checkpoints[min(gaps)[1] if gaps else keys[0]]